@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+import httpx
+
+# ===== PRIORITIES & BUDGETS =====
+
+# Lower value runs first: a user waiting on a page beats background work
+INTERACTIVE = 0
+BATCH = 1
+
+# SEMrush bills phrase_these at 10 API units per returned line
+SEMRUSH_UNITS_PER_KEYWORD = 10
+
+MARKET_DATABASES = {
+    "Netherlands (NL)": "nl",
+    "Belgium (BE)": "be",
+    "Germany (DE)": "de",
+}
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+class RateBudget:
+    """Sliding one-minute window over request count and token spend"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute, window=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._events = deque()  # (timestamp, tokens)
+        self._tokens_in_window = 0
+
+    def _expire(self, now):
+        while self._events and self._events[0][0] <= now - self.window:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def delay_for(self, tokens):
+        """Seconds until a call costing `tokens` fits in both budgets (0 if now)"""
+        now = time.monotonic()
+        self._expire(now)
+        # A single call larger than the whole token budget runs on an empty window
+        tokens = min(tokens, self.tokens_per_minute)
+
+        count, spent = len(self._events), self._tokens_in_window
+        if count < self.requests_per_minute and spent + tokens <= self.tokens_per_minute:
+            return 0.0
+        # Otherwise wait until enough of the oldest calls have left the window
+        for timestamp, event_tokens in self._events:
+            count -= 1
+            spent -= event_tokens
+            if count < self.requests_per_minute and spent + tokens <= self.tokens_per_minute:
+                return max(0.0, timestamp + self.window - now)
+        return 0.0
+
+    def record(self, tokens):
+        self._events.append((time.monotonic(), tokens))
+        self._tokens_in_window += tokens
+
+# ===== SCHEDULER =====
+
+class ApiScheduler:
+    """Runs API calls in priority order within a RateBudget, deduping identical in-flight calls"""
+
+    def __init__(self, budget, concurrency=4):
+        self.budget = budget
+        self.concurrency = concurrency
+        self._queue = None
+        self._slots = None
+        self._dispatcher = None
+        self._inflight = {}
+        self._queued = {}  # key -> its live queue entry while waiting for dispatch
+        self._order = itertools.count()
+        self.stats = {"submitted": 0, "deduped": 0, "executed": 0}
+
+    def _ensure_started(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._queue = asyncio.PriorityQueue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def submit(self, key, cost, call, priority=INTERACTIVE):
+        """Schedule `call()` (a coroutine factory) and return its result.
+
+        Calls sharing a `key` while one is queued or running share that result;
+        joining a queued call at a higher priority moves it up the queue.
+        """
+        self.stats["submitted"] += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["deduped"] += 1
+            queued = self._queued.get(key)
+            if queued is not None and priority < queued[0]:
+                # The entry left behind is no longer live, so the dispatcher skips it
+                self._queued[key] = (priority, next(self._order)) + queued[2:]
+                self._queue.put_nowait(self._queued[key])
+            return await asyncio.shield(future)
+
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._queued[key] = (priority, next(self._order), key, cost, call, future)
+        self._queue.put_nowait(self._queued[key])
+        return await asyncio.shield(future)
+
+    async def _dispatch(self):
+        while True:
+            item = await self._queue.get()
+            priority, order, key, cost, call, future = item
+            if self._queued.get(key) is not item:
+                # Superseded by a higher-priority copy, or already dispatched
+                continue
+            delay = self.budget.delay_for(cost)
+            if delay > 0:
+                # Put it back so a higher-priority call can overtake while we wait
+                self._queue.put_nowait(item)
+                await asyncio.sleep(delay)
+                continue
+
+            await self._slots.acquire()
+            del self._queued[key]
+            self.budget.record(cost)
+            asyncio.get_running_loop().create_task(self._run(key, call, future))
+
+    async def _run(self, key, call, future):
+        try:
+            result = await call()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self.stats["executed"] += 1
+            self._inflight.pop(key, None)
+            self._slots.release()
+
+async def send_with_retry(http, method, url, attempts=3, **kwargs):
+    """Send a request, backing off on 429/503 as told by Retry-After"""
+    for attempt in range(attempts):
+        response = await http.request(method, url, **kwargs)
+        if response.status_code not in (429, 503) or attempt == attempts - 1:
+            response.raise_for_status()
+            return response
+        await asyncio.sleep(float(response.headers.get("retry-after", 2 ** attempt)))
+
+def create_http_client(max_connections=10, timeout=30.0, transport=None, base_url=""):
+    """Pooled async HTTP client shared by every call of one API client"""
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        transport=transport
+    )
+
+# ===== SEMRUSH =====
+
+class SemrushClient:
+    """Keyword volume lookups, coalesced into multi-keyword phrase_these calls"""
+
+    def __init__(self, api_key, base_url="https://api.semrush.com", scheduler=None,
+                 batch_size=100, batch_window=0.02, transport=None):
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.scheduler = scheduler or ApiScheduler(RateBudget(requests_per_minute=600, tokens_per_minute=100_000))
+        self.http = create_http_client(transport=transport, base_url=base_url)
+        self._pending = {}  # (database, priority) -> {keyword: future}
+        self._waiting = {}  # (database, keyword) -> future, until its batch resolves
+        self._flush_handles = {}
+
+    async def keyword_volumes(self, keywords, database="nl", priority=INTERACTIVE):
+        """Return {keyword: monthly volume or None} for `keywords`"""
+        keywords = list(dict.fromkeys(" ".join(kw.lower().split()) for kw in keywords if kw.strip()))
+        futures = [self._enqueue(kw, database, priority) for kw in keywords]
+        volumes = await asyncio.gather(*[asyncio.shield(f) for f in futures])
+        return dict(zip(keywords, volumes))
+
+    def _enqueue(self, keyword, database, priority):
+        # A keyword already queued or in flight shares that lookup's result
+        if (database, keyword) in self._waiting:
+            return self._waiting[(database, keyword)]
+
+        slot = (database, priority)
+        batch = self._pending.setdefault(slot, {})
+        future = asyncio.get_running_loop().create_future()
+        batch[keyword] = future
+        self._waiting[(database, keyword)] = future
+
+        if len(batch) >= self.batch_size:
+            self._flush(slot)
+        elif slot not in self._flush_handles:
+            self._flush_handles[slot] = asyncio.get_running_loop().call_later(self.batch_window, self._flush, slot)
+        return future
+
+    def _flush(self, slot):
+        handle = self._flush_handles.pop(slot, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._pending.pop(slot, None)
+        if batch:
+            asyncio.get_running_loop().create_task(self._lookup_batch(slot, batch))
+
+    async def _lookup_batch(self, slot, batch):
+        database, priority = slot
+        keywords = sorted(batch)
+        key = "semrush:" + database + ":" + ";".join(keywords)
+        try:
+            volumes = await self.scheduler.submit(
+                key,
+                SEMRUSH_UNITS_PER_KEYWORD * len(keywords),
+                lambda: self._phrase_these(keywords, database),
+                priority
+            )
+        except Exception as e:
+            volumes, error = {}, e
+        else:
+            error = None
+        for keyword, future in batch.items():
+            self._waiting.pop((database, keyword), None)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(volumes.get(keyword))
+
+    async def _phrase_these(self, keywords, database):
+        response = await send_with_retry(self.http, "GET", "/", params={
+            "type": "phrase_these",
+            "key": self.api_key,
+            "phrase": ";".join(keywords),
+            "database": database,
+            "export_columns": "Ph,Nq"
+        })
+        return parse_semrush_volumes(response.text)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+def parse_semrush_volumes(text):
+    """Parse a `Keyword;Search Volume` CSV report into {keyword: volume}"""
+    if text.startswith("ERROR"):
+        # "ERROR 50 :: NOTHING FOUND" is an empty result, anything else is a failure
+        if text.startswith("ERROR 50 "):
+            return {}
+        raise RuntimeError(f"SEMrush error: {text.strip()}")
+    volumes = {}
+    for line in text.strip().splitlines()[1:]:
+        phrase, _, volume = line.rpartition(";")
+        if phrase:
+            volumes[" ".join(phrase.lower().split())] = int(volume or 0)
+    return volumes
+
+# ===== LLM =====
+
+class LlmClient:
+    """Text completions against a Messages-style API, within token budgets"""
+
+    def __init__(self, api_key, model, base_url="https://api.anthropic.com", scheduler=None,
+                 transport=None, timeout=120.0):
+        self.api_key = api_key
+        self.model = model
+        self.scheduler = scheduler or ApiScheduler(RateBudget(requests_per_minute=50, tokens_per_minute=40_000), concurrency=2)
+        self.http = create_http_client(max_connections=4, timeout=timeout, transport=transport, base_url=base_url)
+
+    async def complete(self, prompt, max_tokens=1024, system="", priority=INTERACTIVE):
+        """Return the completion text for `prompt`"""
+        cost = estimate_tokens(system + prompt) + max_tokens
+        key = "llm:" + hashlib.sha256(json.dumps([self.model, system, prompt, max_tokens]).encode("utf-8")).hexdigest()
+        return await self.scheduler.submit(key, cost, lambda: self._messages(prompt, max_tokens, system), priority)
+
+    async def _messages(self, prompt, max_tokens, system):
+        body = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if system:
+            body["system"] = system
+        response = await send_with_retry(self.http, "POST", "/v1/messages", json=body, headers={
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01"
+        })
+        return "".join(block.get("text", "") for block in response.json()["content"])
+
+    async def aclose(self):
+        await self.http.aclose()
+
+# ===== CONFIGURATION =====
+
+def per_worker(env_name, default):
+    """A per-minute account budget split across WEB_CONCURRENCY worker processes"""
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return max(1, int(os.getenv(env_name, default)) // workers)
+
+def semrush_client_from_env(transport=None):
+    """SEMrush client configured from SEMRUSH_* environment variables"""
+    return SemrushClient(
+        os.getenv("SEMRUSH_API_KEY", ""),
+        base_url=os.getenv("SEMRUSH_BASE_URL", "https://api.semrush.com"),
+        scheduler=ApiScheduler(
+            RateBudget(
+                requests_per_minute=per_worker("SEMRUSH_REQUESTS_PER_MINUTE", "600"),
+                tokens_per_minute=per_worker("SEMRUSH_UNITS_PER_MINUTE", "100000")
+            ),
+            concurrency=int(os.getenv("SEMRUSH_CONCURRENCY", "4"))
+        ),
+        transport=transport
+    )
+
+def llm_client_from_env(transport=None):
+    """LLM client configured from LLM_* environment variables"""
+    return LlmClient(
+        os.getenv("LLM_API_KEY", ""),
+        os.getenv("LLM_MODEL", ""),
+        base_url=os.getenv("LLM_BASE_URL", "https://api.anthropic.com"),
+        scheduler=ApiScheduler(
+            RateBudget(
+                requests_per_minute=per_worker("LLM_REQUESTS_PER_MINUTE", "50"),
+                tokens_per_minute=per_worker("LLM_TOKENS_PER_MINUTE", "40000")
+            ),
+            concurrency=int(os.getenv("LLM_CONCURRENCY", "2"))
+        ),
+        transport=transport
+    )
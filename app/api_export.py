@@ -0,0 +1,117 @@
+"""NDJSON streams behind the /api/v1 routes.
+
+Each stream runs one SQLite query on its own read-only connection and
+pulls rows through the cursor `BATCH_ROWS` at a time, serializing and
+sending every batch before fetching the next. Memory stays flat however
+many rows match, and the open statement keeps reading one consistent
+WAL snapshot while other workers write.
+
+Rows come in primary-key order; a client that stops part-way resumes
+with `after=<key of the last record>` (for briefs: its campaign id).
+"""
+import json
+from datetime import datetime, timezone
+
+from app.profiling import run_in_threadpool
+from app.revisions import revision_key
+from app.shared_state import connect_shared
+
+BATCH_ROWS = 500
+NDJSON = "application/x-ndjson"
+
+def ndjson_line(record):
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+def _paged(sql):
+    """Keyset pagination: `sql` selects a `key` column and filters on `key > ?`"""
+    return sql + " ORDER BY key LIMIT ?"
+
+def _limit(limit):
+    return limit if limit > 0 else -1  # SQLite: negative LIMIT means no limit
+
+async def stream_query(path, sql, params, to_records):
+    """Yield NDJSON lines for a query, `to_records(rows)` turning each batch into records.
+
+    `to_records` runs in the threadpool, so it may do blocking lookups.
+    """
+    db = connect_shared(path, readonly=True)
+    try:
+        cursor = await run_in_threadpool(db.execute, sql, params)
+        while True:
+            rows = await run_in_threadpool(cursor.fetchmany, BATCH_ROWS)
+            if not rows:
+                break
+            records = await run_in_threadpool(to_records, rows)
+            yield b"".join(ndjson_line(record) for record in records)
+    finally:
+        db.close()
+
+# ===== RESOURCES =====
+
+def campaign_record(session_id, updated, state):
+    state = json.loads(state)
+    research = state.get("research", {})
+    return {
+        "id": session_id,
+        "short_id": session_id[:8].upper(),
+        "updated": iso_time(updated),
+        "mode": research.get("mode"),
+        "keywords": research.get("keywords", []),
+        "market": research.get("market"),
+        "product_group": research.get("product_group"),
+        "page_url": research.get("page_url") or None,
+        "competitors": research.get("competitors", []),
+        "brief_key": state.get("brief_key")
+    }
+
+def campaigns_stream(sessions_db, after="", limit=0):
+    """Saved wizard sessions, one campaign each"""
+    sql = _paged("SELECT session_id AS key, updated, state FROM wizard_sessions WHERE session_id > ?")
+    return stream_query(sessions_db, sql, (after, _limit(limit)), lambda rows: [campaign_record(*row) for row in rows])
+
+def brief_record(brief_key, revision_store, brief_cache, campaign=None):
+    """{"key", "campaign", "revision", "brief"}, or None when it is gone from every store.
+
+    With a campaign, its saved edits are applied; without one (or before its
+    first save) the brief is the generated text from the cache.
+    """
+    latest = revision_store.latest(revision_key(campaign, brief_key), remember=False) if campaign else None
+    rev, brief = latest if latest is not None else (None, brief_cache.lookup(brief_key, remember=False)[0])
+    if brief is None:
+        return None
+    return {"key": brief_key, "campaign": campaign, "revision": rev, "brief": brief}
+
+def briefs_stream(sessions_db, revision_store, brief_cache, after="", limit=0):
+    """The brief of every saved campaign that generated one, with that campaign's edits"""
+    sql = _paged(
+        "SELECT session_id AS key, updated, json_extract(state, '$.brief_key') AS brief_key FROM wizard_sessions "
+        "WHERE brief_key IS NOT NULL AND session_id > ?"
+    )
+
+    def to_records(rows):
+        records = []
+        for session_id, updated, brief_key in rows:
+            record = brief_record(brief_key, revision_store, brief_cache, campaign=session_id)
+            if record is not None:
+                records.append({**record, "updated": iso_time(updated)})
+        return records
+
+    return stream_query(sessions_db, sql, (after, _limit(limit)), to_records)
+
+def keywords_stream(precomputed_db, after="", limit=0, product_group=None):
+    """Nightly keyword metrics: latest monthly volume, YoY growth, cluster"""
+    sql = "SELECT keyword AS key, product_group, volume, yoy, cluster FROM keyword_stats WHERE keyword > ?"
+    params = [after]
+    if product_group:
+        sql += " AND product_group = ?"
+        params.append(product_group)
+    return stream_query(
+        precomputed_db, _paged(sql), (*params, _limit(limit)),
+        lambda rows: [
+            {"keyword": keyword, "product_group": group, "volume": volume, "yoy": yoy, "cluster": cluster}
+            for keyword, group, volume, yoy, cluster in rows
+        ]
+    )
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# ===== CANONICAL INPUTS =====
+
+BRIEF_INPUT_FIELDS = (
+    "keywords",
+    "market",
+    "product_group",
+    "research_depth",
+    "sections",
+    "competitors",
+    "funnel_stage",
+    "page_type",
+    "page_url",
+)
+
+def canonical_brief_inputs(inputs):
+    """Normalize brief inputs so equivalent requests produce the same key"""
+    keywords = []
+    for kw in inputs.get("keywords", []):
+        kw = " ".join(str(kw).lower().split())
+        if kw and kw not in keywords:
+            keywords.append(kw)
+
+    return {
+        # Order matters for keywords: the first one is the focus keyword
+        "keywords": keywords,
+        "market": str(inputs.get("market", "")).strip(),
+        "product_group": str(inputs.get("product_group", "")).strip(),
+        "research_depth": int(inputs.get("research_depth") or 2),
+        "sections": sorted(set(inputs.get("sections", []))),
+        "competitors": sorted({str(c).strip().lower().rstrip("/") for c in inputs.get("competitors", [])}),
+        "funnel_stage": str(inputs.get("funnel_stage", "")).strip(),
+        "page_type": str(inputs.get("page_type", "")).strip(),
+        "page_url": str(inputs.get("page_url", "")).strip().lower().rstrip("/"),
+    }
+
+def brief_cache_key(inputs):
+    """Content hash of the canonical brief inputs"""
+    payload = json.dumps(canonical_brief_inputs(inputs), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# ===== TWO-TIER CACHE =====
+
+# Invalidation-bus channel; keys are normalized keywords, None drops everything
+INVALIDATION_CHANNEL = "brief-cache"
+
+class BriefCache:
+    """Generated-brief cache: in-memory LRU in front of a JSON-file disk tier with TTL.
+
+    The disk tier is shared by every worker process. With an `InvalidationBus`
+    (app.shared_state), invalidations in one process also drop the other
+    processes' memory tiers before their next lookup.
+    """
+
+    def __init__(self, directory, max_entries=128, ttl_seconds=7 * 24 * 3600, bus=None):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _expired(self, entry):
+        return time.time() - entry["created"] > self.ttl_seconds
+
+    def lookup(self, key, remember=True):
+        """Return (brief, tier) for a cache key, or (None, None) on a miss.
+
+        Bulk readers pass `remember=False` so disk hits do not evict the
+        memory tier's hot entries.
+        """
+        if self.bus is not None:
+            self.bus.sync()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry):
+                    self._memory.move_to_end(key)
+                    return entry["brief"], "memory"
+                del self._memory[key]
+
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None, None
+        if self._expired(entry):
+            path.unlink(missing_ok=True)
+            return None, None
+
+        if remember:
+            self._remember(key, entry)
+        return entry["brief"], "disk"
+
+    def store(self, key, inputs, brief):
+        """Store a brief in both tiers"""
+        entry = {
+            "created": time.time(),
+            "keywords": canonical_brief_inputs(inputs)["keywords"],
+            "brief": brief,
+        }
+        self._remember(key, entry)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self._path(key))
+
+    def get_or_generate(self, inputs, generate):
+        """Return (key, brief, hit), calling `generate(inputs)` only on a miss"""
+        key = brief_cache_key(inputs)
+        brief, _ = self.lookup(key)
+        if brief is not None:
+            return key, brief, True
+
+        brief = generate(inputs)
+        self.store(key, inputs, brief)
+        return key, brief, False
+
+    def _drop_memory(self, changed):
+        with self._lock:
+            for key in [k for k, e in self._memory.items() if changed.intersection(e["keywords"])]:
+                del self._memory[key]
+
+    def _on_invalidation(self, keyword):
+        if keyword is None:
+            with self._lock:
+                self._memory.clear()
+        else:
+            self._drop_memory({keyword})
+
+    def invalidate_keywords(self, keywords):
+        """Drop every cached brief built on any of `keywords` (their data changed)"""
+        changed = {" ".join(str(kw).lower().split()) for kw in keywords}
+        self._drop_memory(changed)
+        if self.bus is not None and changed:
+            self.bus.publish(INVALIDATION_CHANNEL, sorted(changed))
+
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*.json"):
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if changed.intersection(entry.get("keywords", [])):
+                path.unlink(missing_ok=True)
+
+    def clear(self):
+        """Drop all entries from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self.bus is not None:
+            self.bus.publish(INVALIDATION_CHANNEL)
+        if self.directory.exists():
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
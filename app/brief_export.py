@@ -0,0 +1,80 @@
+"""DOCX export of a generated brief.
+
+A .docx is a ZIP of WordprocessingML parts; the brief only needs headings
+and plain paragraphs, so the three required parts are written directly
+instead of pulling in a document library.
+"""
+import io
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+# (heading, brief field) in document order
+DOCX_SECTIONS = [
+    ("Focus Keyword", "focus_keyword"),
+    ("URL", "url"),
+    ("Page Type", "page_type"),
+    ("Funnel Stage", "funnel_stage"),
+    ("Target Audience", "audience"),
+    ("Page Title", "page_title"),
+    ("Meta Description", "meta_description"),
+    ("H1", "h1"),
+    ("H2 Headers", "h2_headers"),
+    ("Content Guidelines", "content_guidelines"),
+    ("Content Gaps", "content_gaps"),
+    ("Differentiation Strategy", "differentiation"),
+    ("FAQ", "faq"),
+    ("Internal Links", "internal_links"),
+]
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+def _paragraph(text, bold=False, size=None):
+    props = ("<w:b/>" if bold else "") + (f'<w:sz w:val="{size}"/>' if size else "")
+    run_props = f"<w:rPr>{props}</w:rPr>" if props else ""
+    return f'<w:p><w:r>{run_props}<w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+def brief_docx(brief, title="Content Brief"):
+    """The brief as .docx bytes: one bold heading and its lines per field"""
+    paragraphs = [_paragraph(title, bold=True, size=36)]
+    for heading, field in DOCX_SECTIONS:
+        value = brief.get(field)
+        if not value:
+            continue
+        paragraphs.append(_paragraph(heading, bold=True, size=28))
+        paragraphs.extend(_paragraph(line) for line in str(value).splitlines())
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{_W_NS}"><w:body>{"".join(paragraphs)}</w:body></w:document>'
+    )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        docx.writestr("_rels/.rels", _RELS)
+        docx.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+def export_filename(brief, product_group, when=None):
+    """`ZakelijkeVerzekeringen_bedrijfsaansprakelijkheid_20241201.docx`-style name"""
+    when = when or datetime.now()
+    group = re.sub(r"[^A-Za-z0-9]", "", product_group.title())
+    keyword = re.sub(r"[^a-z0-9]+", "-", brief["focus_keyword"].lower()).strip("-")
+    return f"{group}_{keyword}_{when:%Y%m%d}.docx"
+
+def export_folder(product_group, when=None):
+    """Document-library folder that briefs of a product group are filed under"""
+    return f"/{product_group}/Content Briefs/{(when or datetime.now()).year}"
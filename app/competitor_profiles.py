@@ -0,0 +1,240 @@
+"""Incremental content-gap analysis for the Step 3 competitor list.
+
+Each crawled page is reduced once to a profile (its topic-term counts)
+and kept per URL in a shared SQLite table, so a page is never crawled
+again for another session, worker or research pipeline run. `GapAggregate` holds the per-term
+sums the gap scores depend on (how many competitors use a term, and their
+summed length-normalized frequency). Adding or removing a competitor only
+adds or subtracts that one profile, and the scores are read off the
+running sums without rebuilding the term matrix of app.content_gaps.
+"""
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from html.parser import HTMLParser
+
+from app.api_clients import create_http_client
+from app.content_gaps import topic_terms
+from app.shared_state import connect_shared
+
+# Terms kept per profile; the long tail never reaches a top-10 gap list
+PROFILE_TERMS = 3000
+PROFILE_TTL = 7 * 24 * 3600
+# Unreachable pages are retried after this, not on every edit
+FAILURE_TTL = 15 * 60
+FETCH_TIMEOUT = 8.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_profiles (
+    url TEXT PRIMARY KEY,
+    fetched REAL NOT NULL,
+    profile TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+# ===== EXTRACTION =====
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "noscript", "svg", "nav", "footer", "header"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping and data.strip():
+            self.parts.append(data.strip())
+
+def extract_text(html):
+    """Visible body text of an HTML page"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    return " ".join(parser.parts)
+
+def normalize_url(url):
+    return url if "://" in url else f"https://{url}"
+
+# ===== PROFILES =====
+
+def page_profile(text, max_terms=PROFILE_TERMS):
+    """{"terms": {term: count}, "total": term count} of a page's visible text"""
+    counts = Counter(topic_terms(text))
+    return {"terms": dict(counts.most_common(max_terms)), "total": sum(counts.values())}
+
+class ProfileStore:
+    """Page profiles per URL, shared by every worker process"""
+
+    def __init__(self, path, ttl_seconds=PROFILE_TTL):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = connect_shared(path)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    def get_many(self, urls):
+        """{url: profile} for the URLs with a fresh profile (or a recent failure)"""
+        urls = list(urls)
+        if not urls:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT url, fetched, profile FROM page_profiles WHERE url IN ({','.join('?' * len(urls))})", urls
+            ).fetchall()
+        now, profiles = time.time(), {}
+        for url, fetched, profile in rows:
+            profile = json.loads(profile)
+            if now - fetched < (FAILURE_TTL if "error" in profile else self.ttl_seconds):
+                profiles[url] = profile
+        return profiles
+
+    def put(self, url, profile):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO page_profiles (url, fetched, profile) VALUES (?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET fetched = excluded.fetched, profile = excluded.profile",
+                (url, time.time(), json.dumps(profile, ensure_ascii=False))
+            )
+            self._db.commit()
+
+    async def fetch(self, urls, timeout=FETCH_TIMEOUT, transport=None, http=None):
+        """Profiles for `urls`, crawling only the ones not stored yet (through `http` when given)"""
+        profiles = self.get_many(urls)
+        missing = [url for url in dict.fromkeys(urls) if url not in profiles]
+        if not missing:
+            return profiles
+
+        async def crawl(http, url):
+            try:
+                response = await http.get(normalize_url(url), timeout=timeout, follow_redirects=True)
+                response.raise_for_status()
+                text = await asyncio.to_thread(extract_text, response.text)
+                profile = await asyncio.to_thread(page_profile, text)
+            except Exception as e:
+                profile = {"error": type(e).__name__}
+            await asyncio.to_thread(self.put, url, profile)
+            return url, profile
+
+        if http is not None:
+            profiles.update(await asyncio.gather(*[crawl(http, url) for url in missing]))
+            return profiles
+        async with create_http_client(max_connections=8, transport=transport) as http:
+            profiles.update(await asyncio.gather(*[crawl(http, url) for url in missing]))
+        return profiles
+
+# ===== AGGREGATES =====
+
+class GapAggregate:
+    """Running per-term sums over a set of competitor profiles"""
+
+    def __init__(self, ing_profile=None):
+        self.ing_terms = (ing_profile or {}).get("terms", {})
+        self.ing_total = max((ing_profile or {}).get("total", 0), 1)
+        self.profiles = {}  # url -> profile currently summed in
+        self.failed = set()
+        self.coverage = Counter()  # term -> competitors using it
+        self.frequency = {}  # term -> summed length-normalized frequency
+
+    @property
+    def urls(self):
+        return set(self.profiles) | self.failed
+
+    def add(self, url, profile):
+        if url in self.urls:
+            return
+        if profile is None or "error" in profile:
+            self.failed.add(url)
+            return
+        self.profiles[url] = profile
+        total = max(profile["total"], 1)
+        self.coverage.update(profile["terms"].keys())
+        for term, count in profile["terms"].items():
+            self.frequency[term] = self.frequency.get(term, 0.0) + count / total
+
+    def remove(self, url):
+        self.failed.discard(url)
+        profile = self.profiles.pop(url, None)
+        if profile is None:
+            return
+        total = max(profile["total"], 1)
+        self.coverage.subtract(profile["terms"].keys())
+        for term, count in profile["terms"].items():
+            if self.coverage[term] <= 0:
+                del self.coverage[term]
+                del self.frequency[term]
+            else:
+                self.frequency[term] -= count / total
+
+    def sync(self, urls, profiles):
+        """Bring the aggregate to exactly `urls`; `profiles` covers the URLs being added"""
+        urls = set(urls)
+        for url in self.urls - urls:
+            self.remove(url)
+        for url in urls - self.urls:
+            self.add(url, profiles.get(url))
+
+    def gaps(self, keyword_volumes=None, top_n=10, min_share=0.3, max_strength_share=0.2):
+        """The scoring of app.content_gaps.analyze_content_gaps, read off the running sums"""
+        n = len(self.profiles)
+        if not n:
+            return {"gaps": [], "strengths": [], "competitors": 0, "terms": 0}
+        volumes = Counter()
+        for keyword, volume in (keyword_volumes or {}).items():
+            for term in set(topic_terms(keyword)):
+                volumes[term] += volume or 0
+
+        def item(term, share, score):
+            return {"topic": term, "competitor_share": share, "volume": volumes[term], "score": score}
+
+        gaps = []
+        for term, covered in self.coverage.items():
+            share = covered / n
+            if share >= min_share and term not in self.ing_terms:
+                weight = 1.0 + math.log1p(volumes[term])
+                gaps.append(item(term, share, share * weight + self.frequency[term] / n))
+
+        strengths = []
+        for term, count in self.ing_terms.items():
+            share = self.coverage.get(term, 0) / n
+            if share <= max_strength_share:
+                weight = 1.0 + math.log1p(volumes[term])
+                strengths.append(item(term, share, count / self.ing_total * weight * (1.0 - share)))
+
+        def top(items):
+            return sorted((i for i in items if i["score"] > 0), key=lambda i: -i["score"])[:top_n]
+
+        return {"gaps": top(gaps), "strengths": top(strengths), "competitors": n, "terms": len(self.coverage)}
+
+class AggregateCache:
+    """Small LRU of live aggregates, one per session and ING page"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            aggregate = self._entries.get(key)
+            if aggregate is not None:
+                self._entries.move_to_end(key)
+            return aggregate
+
+    def put(self, key, aggregate):
+        with self._lock:
+            self._entries[key] = aggregate
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
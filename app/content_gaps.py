@@ -0,0 +1,92 @@
+"""Competitor content-gap analysis over a term/topic matrix.
+
+The ING page and every competitor page become rows of one dense NumPy
+matrix over a shared vocabulary of words and word bigrams. Coverage, gap
+and strength scores are then computed for all topics at once.
+"""
+from collections import Counter
+
+import numpy as np
+
+from app.internal_links import tokenize
+
+def topic_terms(text):
+    """Words and word bigrams of `text`, skipping pure numbers"""
+    tokens = [t for t in tokenize(text) if not t.isdigit()]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+def term_matrix(texts, max_terms=10000):
+    """(vocabulary, docs x terms count matrix) over the most widespread topics"""
+    counters = [Counter(topic_terms(text)) for text in texts]
+    document_frequency = Counter()
+    for counts in counters:
+        document_frequency.update(counts.keys())
+    vocabulary = [term for term, _ in document_frequency.most_common(max_terms)]
+    index = {term: i for i, term in enumerate(vocabulary)}
+
+    matrix = np.zeros((len(texts), len(vocabulary)), dtype=np.float32)
+    for row, counts in enumerate(counters):
+        cols = [index[t] for t in counts if t in index]
+        matrix[row, cols] = [counts[vocabulary[c]] for c in cols]
+    return vocabulary, matrix
+
+def term_volumes(vocabulary, keyword_volumes):
+    """Search volume per topic: the summed volume of keywords containing it"""
+    volumes = np.zeros(len(vocabulary), dtype=np.float64)
+    if not keyword_volumes:
+        return volumes
+    index = {term: i for i, term in enumerate(vocabulary)}
+    rows, values = [], []
+    for keyword, volume in keyword_volumes.items():
+        for term in set(topic_terms(keyword)):
+            if term in index:
+                rows.append(index[term])
+                values.append(volume or 0)
+    np.add.at(volumes, np.asarray(rows, dtype=np.int64), np.asarray(values, dtype=np.float64))
+    return volumes
+
+def analyze_content_gaps(ing_text, competitor_texts, keyword_volumes=None,
+                         max_terms=10000, top_n=10, min_share=0.3, max_strength_share=0.2):
+    """Topics competitors cover that ING does not, and the reverse.
+
+    Returns {"gaps": [...], "strengths": [...], "competitors": n, "terms": v}
+    where each item is {"topic", "competitor_share", "volume", "score"}.
+    Gaps are weighted by keyword volume so high-demand topics come first.
+    """
+    if not competitor_texts:
+        return {"gaps": [], "strengths": [], "competitors": 0, "terms": 0}
+
+    vocabulary, matrix = term_matrix([ing_text, *competitor_texts], max_terms)
+    ing, competitors = matrix[0], matrix[1:]
+
+    covered = competitors > 0
+    share = covered.mean(axis=0)
+    # Length-normalized frequency so one very long page does not dominate
+    frequency = competitors / np.maximum(competitors.sum(axis=1, keepdims=True), 1.0)
+    volumes = term_volumes(vocabulary, keyword_volumes)
+    weight = 1.0 + np.log1p(volumes)
+
+    # Mean frequency (< 1) only breaks ties between equally widespread topics
+    gap_scores = np.where((ing == 0) & (share >= min_share), share * weight + frequency.mean(axis=0), 0.0)
+    ing_frequency = ing / max(ing.sum(), 1.0)
+    strength_scores = np.where((ing > 0) & (share <= max_strength_share), ing_frequency * weight * (1.0 - share), 0.0)
+
+    def top(scores):
+        order = np.argsort(-scores)[:top_n]
+        return [
+            {
+                "topic": vocabulary[i],
+                "competitor_share": float(share[i]),
+                "volume": int(volumes[i]),
+                "score": float(scores[i])
+            }
+            for i in order
+            if scores[i] > 0
+        ]
+
+    return {
+        "gaps": top(gap_scores),
+        "strengths": top(strength_scores),
+        "competitors": len(competitor_texts),
+        "terms": len(vocabulary)
+    }
@@ -0,0 +1,237 @@
+"""Local stand-in for the SEMrush, LLM and SharePoint upload APIs.
+
+Serves the same request/response shapes as the real services, with
+deterministic data, configurable latency and per-minute request limits, so
+the clients in app.api_clients and app.sharepoint can be exercised and
+benchmarked offline:
+
+    python -m app.fake_apis            # serve on http://127.0.0.1:8765
+    python -m app.fake_apis bench      # in-process throughput benchmark
+    python -m app.fake_apis upload     # chunked upload with injected failures
+
+Point SHAREPOINT_DRIVE_URL at http://127.0.0.1:8765/drive to upload exports
+to the stand-in.
+"""
+import asyncio
+import hashlib
+import random
+import sys
+import time
+import uuid
+from collections import deque
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from app.api_clients import (
+    BATCH, INTERACTIVE, ApiScheduler, LlmClient, RateBudget, SemrushClient
+)
+from app.sharepoint import FAILED, SharePointUploader
+
+def fake_volume(keyword, database):
+    """Stable pseudo-random monthly volume for a keyword"""
+    digest = hashlib.md5(f"{database}:{keyword}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:2], "big") % 5000 + 10
+
+def _remaining_ranges(received, size):
+    """Graph-style nextExpectedRanges for the gaps between received byte ranges"""
+    ranges, position = [], 0
+    for start, end in sorted(received):
+        if start > position:
+            ranges.append(f"{position}-{start - 1}")
+        position = max(position, end)
+    if position < size:
+        ranges.append(f"{position}-")
+    return ranges
+
+def create_fake_api_app(latency=0.05, requests_per_minute=600, upload_failure_rate=0.0, seed=0):
+    """Starlette app implementing SEMrush phrase_these, a Messages endpoint
+    and Graph-style upload sessions (failing `upload_failure_rate` of chunk PUTs)"""
+    recent = deque()
+    stats = {
+        "semrush_calls": 0, "semrush_keywords": 0, "llm_calls": 0, "rejected": 0,
+        "upload_chunks": 0, "upload_bytes": 0, "upload_failures": 0
+    }
+    sessions = {}  # session id -> {"path", "size", "data", "received"}
+    files = {}  # path -> bytes of completed uploads
+    failures = random.Random(seed)
+
+    def over_limit():
+        now = time.monotonic()
+        while recent and recent[0] <= now - 60:
+            recent.popleft()
+        if len(recent) >= requests_per_minute:
+            stats["rejected"] += 1
+            return True
+        recent.append(now)
+        return False
+
+    async def semrush(request):
+        if over_limit():
+            return PlainTextResponse("ERROR 132 :: API UNITS BALANCE IS ZERO", status_code=429, headers={"retry-after": "1"})
+        params = request.query_params
+        if params.get("type") != "phrase_these":
+            return PlainTextResponse("ERROR 40 :: MANDATORY PARAMETER 'type' NOT SET OR EMPTY")
+        phrases = [p for p in params.get("phrase", "").split(";") if p]
+        if not phrases:
+            return PlainTextResponse("ERROR 50 :: NOTHING FOUND")
+
+        await asyncio.sleep(latency)
+        stats["semrush_calls"] += 1
+        stats["semrush_keywords"] += len(phrases)
+        database = params.get("database", "nl")
+        rows = [f"{p};{fake_volume(p, database)}" for p in phrases]
+        return PlainTextResponse("Keyword;Search Volume\r\n" + "\r\n".join(rows))
+
+    async def messages(request):
+        if over_limit():
+            return JSONResponse({"type": "error", "error": {"type": "rate_limit_error"}}, status_code=429, headers={"retry-after": "1"})
+        body = await request.json()
+        await asyncio.sleep(latency)
+        stats["llm_calls"] += 1
+        prompt = body["messages"][-1]["content"]
+        text = f"[fake completion for {len(prompt)} prompt chars]"
+        return JSONResponse({
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", ""),
+            "content": [{"type": "text", "text": text}],
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+        })
+
+    async def create_upload_session(request):
+        session_id = uuid.uuid4().hex
+        sessions[session_id] = {"path": request.path_params["path"], "size": None, "data": None, "received": []}
+        return JSONResponse({
+            "uploadUrl": f"{request.base_url}upload/{session_id}",
+            "expirationDateTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600)),
+            "nextExpectedRanges": ["0-"]
+        })
+
+    async def upload_session(request):
+        session = sessions.get(request.path_params["session_id"])
+        if session is None:
+            return JSONResponse({"error": {"code": "itemNotFound"}}, status_code=404)
+        if request.method == "DELETE":
+            sessions.pop(request.path_params["session_id"])
+            return Response(status_code=204)
+        if request.method == "GET":
+            return JSONResponse({"nextExpectedRanges": _remaining_ranges(session["received"], session["size"] or 0) or ["0-"]})
+
+        # PUT: "Content-Range: bytes start-end/total"
+        byte_range, _, total = request.headers["content-range"].removeprefix("bytes ").partition("/")
+        start, end = (int(x) for x in byte_range.split("-"))
+        body = await request.body()
+        await asyncio.sleep(latency)
+        if failures.random() < upload_failure_rate:
+            stats["upload_failures"] += 1
+            return JSONResponse({"error": {"code": "serviceNotAvailable"}}, status_code=500)
+        if len(body) != end - start + 1:
+            return JSONResponse({"error": {"code": "invalidRange"}}, status_code=400)
+
+        if session["data"] is None:
+            session["size"], session["data"] = int(total), bytearray(int(total))
+        session["data"][start:end + 1] = body
+        session["received"].append((start, end + 1))
+        stats["upload_chunks"] += 1
+        stats["upload_bytes"] += len(body)
+
+        remaining = _remaining_ranges(session["received"], session["size"])
+        if remaining:
+            return JSONResponse({"nextExpectedRanges": remaining}, status_code=202)
+        files[session["path"]] = bytes(session["data"])
+        sessions.pop(request.path_params["session_id"])
+        return JSONResponse({
+            "id": hashlib.md5(session["path"].encode("utf-8")).hexdigest()[:16],
+            "name": session["path"].rsplit("/", 1)[-1],
+            "size": session["size"],
+            "webUrl": f"{request.base_url}sites/content/{session['path']}"
+        }, status_code=201)
+
+    async def get_stats(request):
+        return JSONResponse(stats)
+
+    app = Starlette(routes=[
+        Route("/", semrush),
+        Route("/v1/messages", messages, methods=["POST"]),
+        Route("/drive/root:/{path:path}:/createUploadSession", create_upload_session, methods=["POST"]),
+        Route("/upload/{session_id}", upload_session, methods=["GET", "PUT", "DELETE"]),
+        Route("/_stats", get_stats),
+    ])
+    app.state.stats = stats
+    app.state.files = files
+    return app
+
+async def benchmark(keyword_count=5000, lookups=20000, latency=0.05):
+    """Fire overlapping interactive and batch lookups through the fake server"""
+    import httpx
+
+    fake = create_fake_api_app(latency=latency, requests_per_minute=100_000)
+    transport = httpx.ASGITransport(app=fake)
+    semrush = SemrushClient(
+        "fake-key",
+        base_url="http://fake",
+        scheduler=ApiScheduler(RateBudget(requests_per_minute=100_000, tokens_per_minute=10**9), concurrency=8),
+        transport=transport
+    )
+    llm = LlmClient("fake-key", "fake-model", base_url="http://fake", transport=transport)
+
+    keywords = [f"zakelijke verzekering {i}" for i in range(keyword_count)]
+    started = time.perf_counter()
+    # Many small overlapping requests, as concurrent users and batch jobs would make
+    requests = [
+        semrush.keyword_volumes(keywords[i % keyword_count:i % keyword_count + 10], priority=INTERACTIVE if i % 4 == 0 else BATCH)
+        for i in range(0, lookups, 10)
+    ]
+    requests += [llm.complete("Schrijf een brief over zakelijke verzekeringen", max_tokens=256) for _ in range(50)]
+    await asyncio.gather(*requests)
+    elapsed = time.perf_counter() - started
+
+    await semrush.aclose()
+    await llm.aclose()
+    stats = fake.state.stats
+    print(f"{lookups} keyword lookups + 50 completions in {elapsed:.2f}s")
+    print(f"  SEMrush calls: {stats['semrush_calls']} ({stats['semrush_keywords']} keywords sent)")
+    print(f"  LLM calls: {stats['llm_calls']} (deduped {llm.scheduler.stats['deduped']})")
+    print(f"  Lookups/second: {lookups / elapsed:,.0f}")
+
+async def upload_benchmark(size=20 * 1024 * 1024, failure_rate=0.2, latency=0.02):
+    """Upload one large export through injected chunk failures, resuming until done"""
+    import httpx
+    import tempfile
+
+    fake = create_fake_api_app(latency=latency, upload_failure_rate=failure_rate)
+    uploader = SharePointUploader(
+        "http://fake/drive", "fake-token", tempfile.mkdtemp(), attempts=1,
+        # The stand-in accepts ranges in any order, unlike Graph
+        concurrency=4, transport=httpx.ASGITransport(app=fake)
+    )
+    data = random.Random(1).randbytes(size)
+    started = time.perf_counter()
+    job_id = uploader.submit("export.zip", "/Content Briefs", data)
+    resumes = 0
+    while True:
+        await asyncio.gather(*uploader._tasks.values())
+        job = uploader.status(job_id)
+        if job["status"] != FAILED:
+            break
+        resumes += 1
+        uploader.resume(job_id)
+    elapsed = time.perf_counter() - started
+    await uploader.aclose()
+
+    stats = fake.state.stats
+    print(f"{size / 2**20:.0f} MiB in {elapsed:.2f}s with {resumes} resumes ({job['status']})")
+    print(f"  Chunks accepted: {stats['upload_chunks']}, failed: {stats['upload_failures']}")
+    print(f"  Bytes sent: {stats['upload_bytes']:,} for a {size:,} byte file")
+    print(f"  Content intact: {fake.state.files.get('Content Briefs/export.zip') == data}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["bench"]:
+        asyncio.run(benchmark())
+    elif sys.argv[1:] == ["upload"]:
+        asyncio.run(upload_benchmark())
+    else:
+        import uvicorn
+        uvicorn.run(create_fake_api_app(), host="127.0.0.1", port=8765)
@@ -0,0 +1,176 @@
+"""Internal-link suggestions from a TF-IDF index over the ING site.
+
+The index is built once from a sitemap or page dump and saved as plain .npy
+arrays (a CSR matrix of L2-normalized TF-IDF rows), which are memory-mapped
+on load so the web process shares them through the page cache:
+
+    python -m app.internal_links build sitemap.xml data/link-index
+    python -m app.internal_links build pages.jsonl data/link-index
+    python -m app.internal_links query data/link-index "bedrijfsaansprakelijkheid"
+"""
+import json
+import re
+import sys
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_RE = re.compile(r"[a-z0-9à-ÿ]+")
+
+STOPWORDS = frozenset("""
+de het een en van in op te is dat die voor met als zijn er aan om ook je jouw
+uw we wij ons onze of bij door naar over tot uit dan maar wat hoe waar wie niet
+nog meer kan kunt hebben heeft wordt worden deze dit the and for with www https
+http nl html
+""".split())
+
+# ===== PAGES =====
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords and single characters"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+def url_text(url):
+    """Searchable text from a URL path (`/zakelijk/verzekeringen/avb` -> words)"""
+    return " ".join(re.split(r"[/\-_.]+", urlparse(url).path))
+
+def read_pages(path):
+    """Read pages from a sitemap XML or a JSON-lines page dump.
+
+    Page dumps hold one {"url", "title", "text"} object per line; sitemap
+    entries only have a URL, so their text comes from the path.
+    """
+    path = Path(path)
+    if path.suffix in (".jsonl", ".ndjson"):
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    page = json.loads(line)
+                    yield {"url": page["url"], "title": page.get("title", ""), "text": page.get("text", "")}
+        return
+
+    for _, element in ET.iterparse(path):
+        if element.tag.rsplit("}", 1)[-1] == "loc" and element.text:
+            url = element.text.strip()
+            slug = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+            yield {"url": url, "title": slug.replace("-", " ").capitalize(), "text": ""}
+        element.clear()
+
+# ===== INDEX =====
+
+def build_link_index(pages, out_dir):
+    """Build the TF-IDF matrix for `pages` and write it to `out_dir`"""
+    vocabulary = {}
+    rows, cols, counts, meta = [], [], [], []
+
+    for row, page in enumerate(pages):
+        # Titles and URL paths say most about what a page is for: count them twice
+        tokens = tokenize(" ".join([page["title"], page["title"], url_text(page["url"]), url_text(page["url"]), page["text"]]))
+        for token, count in Counter(tokens).items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+            counts.append(count)
+        meta.append({"url": page["url"], "title": page["title"]})
+
+    n_pages, n_terms = len(meta), len(vocabulary)
+    tf = sparse.csr_matrix(
+        (1.0 + np.log(np.asarray(counts, dtype=np.float32)), (rows, cols)),
+        shape=(n_pages, n_terms),
+        dtype=np.float32
+    )
+    df = np.bincount(tf.indices, minlength=n_terms)
+    idf = (np.log((1.0 + n_pages) / (1.0 + df)) + 1.0).astype(np.float32)
+
+    tfidf = tf.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    tfidf = sparse.diags(1.0 / norms).dot(tfidf).tocsr().astype(np.float32)
+    tfidf.sort_indices()
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    np.save(out_dir / "data.npy", tfidf.data)
+    # Same index dtype scipy picks on load, so neither array is copied out of the mmap
+    index_dtype = np.int32 if tfidf.nnz < 2**31 else np.int64
+    np.save(out_dir / "indices.npy", tfidf.indices.astype(index_dtype))
+    np.save(out_dir / "indptr.npy", tfidf.indptr.astype(index_dtype))
+    np.save(out_dir / "idf.npy", idf)
+    (out_dir / "vocabulary.json").write_text(json.dumps(vocabulary, ensure_ascii=False), encoding="utf-8")
+    (out_dir / "pages.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return n_pages, n_terms
+
+class LinkIndex:
+    """Memory-mapped TF-IDF index answering top-k related-page queries"""
+
+    def __init__(self, matrix, idf, vocabulary, pages):
+        self.matrix = matrix
+        self.idf = idf
+        self.vocabulary = vocabulary
+        self.pages = pages
+
+    @classmethod
+    def load(cls, directory):
+        directory = Path(directory)
+        data = np.load(directory / "data.npy", mmap_mode="r")
+        indices = np.load(directory / "indices.npy", mmap_mode="r")
+        indptr = np.load(directory / "indptr.npy", mmap_mode="r")
+        idf = np.load(directory / "idf.npy", mmap_mode="r")
+        vocabulary = json.loads((directory / "vocabulary.json").read_text(encoding="utf-8"))
+        pages = json.loads((directory / "pages.json").read_text(encoding="utf-8"))
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(pages), len(vocabulary)), copy=False)
+        return cls(matrix, idf, vocabulary, pages)
+
+    @classmethod
+    def load_if_exists(cls, directory):
+        """Load the index, or return None when it has not been built"""
+        if not (Path(directory) / "pages.json").exists():
+            return None
+        return cls.load(directory)
+
+    def query_vector(self, text):
+        counts = Counter(self.vocabulary[t] for t in tokenize(text) if t in self.vocabulary)
+        if not counts:
+            return None
+        cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[cols]
+        weights /= np.linalg.norm(weights)
+        return cols, weights.astype(np.float32)
+
+    def suggest(self, text, k=5, exclude_urls=()):
+        """Top-k pages most similar to `text` as [(url, title, score)]"""
+        vector = self.query_vector(text)
+        if vector is None:
+            return []
+        cols, weights = vector
+        query = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        query[cols] = weights
+        scores = self.matrix.dot(query)
+
+        exclude = set(exclude_urls)
+        candidates = min(k + len(exclude), len(scores))
+        if candidates < len(scores):
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        results = [
+            (self.pages[i]["url"], self.pages[i]["title"], float(scores[i]))
+            for i in top
+            if scores[i] > 0 and self.pages[i]["url"] not in exclude
+        ]
+        return results[:k]
+
+if __name__ == "__main__":
+    command, *args = sys.argv[1:] or ["help"]
+    if command == "build" and len(args) == 2:
+        n_pages, n_terms = build_link_index(read_pages(args[0]), args[1])
+        print(f"✅ Indexed {n_pages} pages, {n_terms} terms into {args[1]}")
+    elif command == "query" and len(args) == 2:
+        for url, title, score in LinkIndex.load(args[0]).suggest(args[1], k=10):
+            print(f"{score:.3f}  {url}  {title}")
+    else:
+        print(__doc__)
@@ -4,21 +4,119 @@ from fasthtml.svg import *
 import os
 from pathlib import Path
 import uuid
+import functools
+import hmac
+from datetime import datetime
+from urllib.parse import urlparse
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.responses import RedirectResponse
 from dotenv import load_dotenv
+from app.brief_cache import BriefCache, brief_cache_key
+from app.api_clients import llm_client_from_env, semrush_client_from_env
+from app.internal_links import LinkIndex
+from app.question_clusters import cluster_questions
+from app.market_detection import detect_markets, dominant_market, split_by_market
+from app.research_pipeline import run_research
+from app.volume_store import MONTH_NAMES, VolumeStore
+from app.brief_export import brief_docx, export_filename, export_folder
+from app.sharepoint import DONE, FAILED, sharepoint_uploader_from_env
+from app.revisions import RevisionStore, revision_key
+from app.session_index import SessionIndex
+from app.precomputed import PrecomputedStore
+from app.profiling import ProfilingMiddleware, run_in_threadpool
+from app.shared_state import InvalidationBus
+from app.serp_clusters import MIN_SHARED, SerpIndex, campaign_plan, normalize_url, parse_keyword_list
+from app.competitor_profiles import AggregateCache, GapAggregate, ProfileStore
+from app.api_export import NDJSON, briefs_stream, brief_record, campaigns_stream, keywords_stream
+from app.seo_score import (
+    DENSITY_FIELDS, FOCUS_MENTIONS, META_FONT_PX, META_MAX_CHARS, META_MAX_PX,
+    TITLE_FONT_PX, TITLE_MAX_CHARS, TITLE_MAX_PX, BriefScorer, ScorerCache, length_check
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Get configuration from environment variables
 APP_PASSWORD = os.getenv("APP_PASSWORD", "change-this-password-123")
-SECRET_KEY = os.getenv("SECRET_KEY", "change-this-to-random-string-in-production")
+# Session cookie key, identical in every worker: SECRET_KEY, or SECRET_KEY_FILE pointing at a mounted secret
+SECRET_KEY = os.getenv("SECRET_KEY") or (Path(os.environ["SECRET_KEY_FILE"]).read_text().strip() if os.getenv("SECRET_KEY_FILE") else None)
+# Bearer tokens for /api/v1 scripts (comma-separated); logged-in browser sessions work too
+API_TOKENS = [token.strip() for token in os.getenv("API_TOKENS", "").split(",") if token.strip()]
 
 # Get the current directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
 static_dir = os.path.join(current_dir, 'static')
 session_key_path = "/tmp/.sesskey"
+if not SECRET_KEY:
+    # Workers forked together would race to create the key file and could end up with different keys
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        raise RuntimeError("SECRET_KEY or SECRET_KEY_FILE must be set when running more than one worker")
+    # Local development only: a generated key file is not shared between machines
+    print("⚠️ SECRET_KEY / SECRET_KEY_FILE not set, using a generated key in", session_key_path)
+    SECRET_KEY = get_key(fname=session_key_path)
+
+# Cross-process invalidations, so every worker (and the nightly job) drops stale memory caches
+invalidation_bus = InvalidationBus(os.getenv("INVALIDATION_DB", "/tmp/invalidations.sqlite3"))
+
+# Generated-brief cache (memory LRU + disk tier with TTL)
+brief_cache = BriefCache(
+    os.getenv("BRIEF_CACHE_DIR", "/tmp/brief-cache"),
+    max_entries=int(os.getenv("BRIEF_CACHE_SIZE", "128")),
+    ttl_seconds=int(os.getenv("BRIEF_CACHE_TTL", str(7 * 24 * 3600))),
+    bus=invalidation_bus
+)
+
+# SEMrush volumes for the research pipeline (skipped when no key is configured)
+semrush_client = semrush_client_from_env() if os.getenv("SEMRUSH_API_KEY") else None
+
+# LLM that writes the brief's content guidelines (template text when no key is configured)
+llm_client = llm_client_from_env() if os.getenv("LLM_API_KEY") else None
+
+# Internal-link TF-IDF index (built with `python -m app.internal_links build`)
+link_index = LinkIndex.load_if_exists(os.getenv("LINK_INDEX_DIR", os.path.join(current_dir, "data", "link-index")))
+
+# Chunked, resumable export uploads to the SharePoint document library
+sharepoint_uploader = sharepoint_uploader_from_env() if os.getenv("SHAREPOINT_DRIVE_URL") else None
+
+# Saved Step 4 edits per session: snapshots plus compressed per-field deltas
+revision_store = RevisionStore(
+    os.getenv("REVISIONS_DB", "/tmp/brief-revisions.sqlite3"),
+    max_heads=int(os.getenv("REVISION_HEAD_CACHE_SIZE", "256"))
+)
+
+# Nightly snapshots (written by `python -m app.nightly`); handlers only look them up.
+# Opened on first use, so a process started before the first nightly run picks it up
+precomputed_db = os.getenv("PRECOMPUTED_DB", os.path.join(current_dir, "data", "precomputed.sqlite3"))
+_precomputed = None
+
+def precomputed_store():
+    """The nightly snapshot store, or None until the nightly job has written one"""
+    global _precomputed
+    if _precomputed is None:
+        _precomputed = PrecomputedStore.load_if_exists(precomputed_db)
+    return _precomputed
+
+# Wizard state per session, resumable by short session ID
+session_index = SessionIndex(os.getenv("SESSIONS_DB", "/tmp/wizard-sessions.sqlite3"))
+
+# Crawled competitor pages reduced to term profiles, and each session's running gap sums
+profile_store = ProfileStore(os.getenv("PROFILES_DB", "/tmp/page-profiles.sqlite3"))
+gap_aggregates = AggregateCache()
+
+# Live Step 4 SEO counters per session, updated one edited field at a time
+seo_scorers = ScorerCache()
+
+# Top result URLs per keyword for SERP-overlap campaign planning (same export the nightly job reads)
+serp_index = SerpIndex.load_if_exists(os.getenv("SERP_FILE", os.path.join(current_dir, "data", "serps.jsonl")))
+
+# Monthly keyword volume history (built with `python -m app.volume_store build`)
+volume_store = VolumeStore.load_if_exists(os.getenv("VOLUME_STORE_DIR", os.path.join(current_dir, "data", "volume-store")))
+
+def resume_interrupted_uploads():
+    """Restart export uploads that a stopped worker left half-sent"""
+    if sharepoint_uploader is not None:
+        for job_id in sharepoint_uploader.resume_interrupted():
+            print(f"📤 Resuming interrupted SharePoint upload {job_id}")
 
 # Initialize app with session middleware
 app, rt = fast_app(
@@ -26,8 +124,13 @@ app, rt = fast_app(
     static_dir=static_dir,
     live=False,
     key_fname=session_key_path,
+    # A fixed key, so every worker process can read the others' session cookies
+    secret_key=SECRET_KEY,
+    on_startup=[resume_interrupted_uploads],
     middleware=[
-        Middleware(SessionMiddleware, secret_key=SECRET_KEY)
+        Middleware(SessionMiddleware, secret_key=SECRET_KEY),
+        # `?_profile=tree` / `X-Profile: tree` on a logged-in request returns its profile
+        Middleware(ProfilingMiddleware, enabled=os.getenv("PROFILING_ENABLED", "1") == "1")
     ]
 )
 
@@ -39,6 +142,7 @@ def is_authenticated(request):
 
 def require_auth(func):
     """Decorator to require authentication for routes"""
+    @functools.wraps(func)
     async def wrapper(request, *args, **kwargs):
         if not hasattr(request, 'session'):
             return RedirectResponse('/login', status_code=302)
@@ -75,6 +179,27 @@ def get_short_session_id(session_id):
     """Get shortened version of session ID for display"""
     return session_id[:8].upper()
 
+# Session keys that make up the wizard's progress
+WIZARD_STATE_KEYS = ("research", "brief_inputs", "brief_key", "brief_cache_hit")
+
+async def save_wizard_state(request):
+    """Persist this session's wizard progress so it can be resumed by ID"""
+    session_id = get_or_create_session_id(request)
+    state = {k: request.session[k] for k in WIZARD_STATE_KEYS if k in request.session}
+    await run_in_threadpool(session_index.save, session_id, state)
+
+def restore_wizard_state(request, session_id, state):
+    """Rehydrate the wizard from saved state; returns the step URL to continue at"""
+    for key in WIZARD_STATE_KEYS:
+        request.session.pop(key, None)
+    request.session.update({k: v for k, v in state.items() if k in WIZARD_STATE_KEYS})
+    request.session["session_id"] = session_id
+    if "brief_key" in state:
+        return "/campaign/step4"
+    if "research" in state:
+        return "/campaign/step3"
+    return "/campaign/new"
+
 def create_session_banner(session_id):
     """Create copyable session ID banner"""
     short_id = get_short_session_id(session_id)
@@ -92,10 +217,95 @@ def create_session_banner(session_id):
                 onclick=f"navigator.clipboard.writeText('{session_id}'); this.textContent='✅ Copied!'; setTimeout(() => this.textContent='📋 Copy Full ID', 2000);"
             )
         ),
-        P("Save this ID to reference your session later", cls=TextPresets.muted_sm),
+        DivFullySpaced(
+            P("Save this ID to reference your session later", cls=TextPresets.muted_sm),
+            Form(
+                Input(name="id", placeholder="Resume session ID...", cls="w-48 font-mono"),
+                Button("Resume", cls=ButtonT.default, type="submit"),
+                method="get",
+                action="/session/resume",
+                cls="flex items-center gap-2"
+            )
+        ),
         cls="bg-blue-50 border border-blue-200 rounded-lg p-4 mb-6"
     )
 
+def session_resume_page(short_id, matches):
+    """Shown when a short ID matches no session, or more than one"""
+    if not matches:
+        body = Alert(f"No saved session found for '{short_id}'.", cls=AlertT.warning)
+    else:
+        body = Div(
+            P(f"'{short_id}' matches {len(matches)} sessions. Pick the one to resume:", cls=TextPresets.muted_sm),
+            Ul(cls="space-y-2 mt-4")(*[
+                Li(DivFullySpaced(
+                    Div(
+                        Code(match["session_id"], cls="font-mono"),
+                        P(
+                            ", ".join(match["state"].get("research", {}).get("keywords", [])[:3]) or "No keywords yet",
+                            " · ", datetime.fromtimestamp(match["updated"]).strftime("%d-%m-%Y %H:%M"),
+                            cls=TextPresets.muted_sm
+                        )
+                    ),
+                    A(Button("Resume", cls=ButtonT.primary), href=f"/session/resume?id={match['session_id']}")
+                ))
+                for match in matches
+            ])
+        )
+    return Container(
+        H2("Resume Session"),
+        Card(body),
+        cls="max-w-3xl mx-auto space-y-6"
+    )
+
+def has_api_token(request):
+    """Check the request's `Authorization: Bearer` token against API_TOKENS"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    return any(hmac.compare_digest(token.encode(), allowed.encode()) for allowed in API_TOKENS)
+
+def require_api_auth(func):
+    """Decorator for /api routes: API token or logged-in session, else a JSON 401"""
+    @functools.wraps(func)
+    async def wrapper(request, *args, **kwargs):
+        if has_api_token(request) or is_authenticated(request):
+            return await func(request, *args, **kwargs)
+        return JSONResponse({"error": "unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return wrapper
+
+# ===== STREAMING PAGES =====
+
+_STREAM_SLOT = NotStr("<!--stream-slot-->")
+
+def _split_at_slot(ft):
+    """Render `ft` and return the markup before and after its `_STREAM_SLOT` child"""
+    return to_xml(ft).split(str(_STREAM_SLOT))
+
+def StreamingPage(request, *head, container, sections=(), tail=()):
+    """Send a full page as a chunked response.
+    
+    The document head and `head` components (e.g. AppHeader) go out in the
+    first chunk. `sections` are zero-argument callables rendered one at a time
+    in the threadpool and streamed inside `container` as they finish, so the
+    first byte never waits on the slowest card. HTMX requests get a regular
+    fragment response.
+    """
+    if 'hx-request' in request.headers:
+        return (*head, container(*[section() for section in sections]), *tail)
+    
+    async def chunks():
+        page_open, page_close = _split_at_slot(Html(_STREAM_SLOT, **request.htmlkw))
+        body_open, body_close = _split_at_slot(Body(_STREAM_SLOT, **request.bodykw))
+        container_open, container_close = _split_at_slot(container(_STREAM_SLOT))
+        yield page_open + to_xml(Head(Title(request.app.title), *request.hdrs))
+        yield body_open + to_xml(head) + container_open
+        for section in sections:
+            yield to_xml(await run_in_threadpool(section))
+        yield container_close + to_xml((*tail, *request.ftrs)) + body_close + page_close
+    
+    return StreamingResponse(chunks(), media_type="text/html")
+
 # ===== VERIFICATION & LEGAL PAGES (NO AUTH REQUIRED) =====
 
 @rt('/google52b7c19ec95a274e.html')
@@ -295,6 +505,32 @@ def FormSectionDiv(*c, cls='space-y-3', **kwargs):
 def HelpText(c): 
     return P(c, cls=TextPresets.muted_sm)
 
+MARKET_OPTIONS = ("Netherlands (NL)", "Belgium (BE)", "Germany (DE)")
+
+def MarketField(selected="Netherlands (NL)", markets=None):
+    """Market/Locale select, re-rendered when keywords are auto-detected"""
+    mixed = markets and len(markets) > 1
+    return FormSectionDiv(
+        DivLAligned(
+            FormLabel("Market/Locale"),
+            BrainIcon("Auto-detected based on keywords and domain")
+        ),
+        Select(
+            *[Option(o, selected=o == selected) for o in MARKET_OPTIONS],
+            id="market"
+        ),
+        HelpText("Mixed list: " + ", ".join(f"{len(kws)} {code}" for code, kws in markets.items())) if mixed else "",
+        id="market-field"
+    )
+
+KEYWORD_MARKET_DETECTION = {
+    "hx_post": "/campaign/step2/market",
+    "hx_trigger": "change, keyup changed delay:500ms",
+    "hx_target": "#market-field",
+    "hx_swap": "outerHTML",
+    "hx_include": "#keywords, #page-url"
+}
+
 def LoadingOverlay():
     """Full-screen loading overlay with blur effect"""
     return Div(
@@ -314,13 +550,8 @@ def LoadingOverlay():
         style="backdrop-filter: blur(4px);"
     ), Script("""
     function startBriefGeneration() {
-        // Show loading overlay
+        // Show loading overlay while the generate form submits
         document.getElementById('loading-overlay').classList.remove('hidden');
-        
-        // After 10 seconds, redirect to step 4
-        setTimeout(function() {
-            window.location.href = '/campaign/step4';
-        }, 10000);
     }
     """)
 
@@ -349,11 +580,19 @@ def AppHeader():
         cls="bg-gradient-to-r from-orange-600 to-orange-500 shadow-lg"
     )
 
-def keyword_yoy_chart():
-    """SEMRush-style Year-over-Year comparison for 'bedrijfsaansprakelijkheidsverzekering' keyword"""
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+def keyword_yoy_chart(keyword="bedrijfsaansprakelijkheidsverzekering"):
+    """SEMRush-style Year-over-Year comparison for one keyword"""
+    months = MONTH_NAMES
     data_2023 = [2100, 2200, 2300, 2400, 2500, 2450, 2600, 2550, 2700, 2650, 2800, 2750]
     data_2024 = [2300, 2400, 2600, 2700, 2800, 2540, 2900, 2850, 3000, 2950, 3100, 3050]
+    previous_year, current_year, y_min, y_max = 2023, 2024, 2000, 3200
+    if volume_store is not None and volume_store.series(keyword) is not None:
+        current_year = volume_store.last_month // 12
+        previous_year = current_year - 1
+        data_2023 = volume_store.year_series(keyword, previous_year)
+        data_2024 = volume_store.year_series(keyword, current_year)
+        values = [v for v in data_2023 + data_2024 if v] or [0]
+        y_min, y_max = min(values) // 100 * 100, -(-max(values) // 100) * 100 + 100
     
     return ApexChart(
         opts={
@@ -372,8 +611,8 @@ def keyword_yoy_chart():
                 "toolbar": {"show": True}
             },
             "series": [
-                {"name": "2023", "data": data_2023},
-                {"name": "2024", "data": data_2024}
+                {"name": str(previous_year), "data": data_2023},
+                {"name": str(current_year), "data": data_2024}
             ],
             "colors": ['#FF6200', '#545454'],
             "dataLabels": {"enabled": False},
@@ -388,7 +627,7 @@ def keyword_yoy_chart():
             },
             "markers": {"size": 6, "hover": {"size": 8}},
             "xaxis": {"categories": months, "title": {"text": "Month"}},
-            "yaxis": {"title": {"text": "Monthly Search Volume"}, "min": 2000, "max": 3200},
+            "yaxis": {"title": {"text": "Monthly Search Volume"}, "min": y_min, "max": y_max},
             "legend": {
                 "position": "top", "horizontalAlign": "right", 
                 "floating": True, "offsetY": -25, "offsetX": -5
@@ -425,6 +664,222 @@ def CampaignSteps(current_step=1):
     
     return Steps(*step_items, cls=(StepsT.horizonal, "mb-8"))
 
+# ===== BRIEF GENERATION =====
+
+DEFAULT_COMPETITORS = [
+    {"title": "KVK - Bedrijfsaansprakelijkheidsverzekering", "url": "kvk.nl/verzekeringen/..."},
+    {"title": "Zilveren Kruis - AVB Zakelijk", "url": "zilverenkruis.nl/zakelijk/..."},
+    {"title": "Nationale Nederlanden - Aansprakelijkheidsverzekering", "url": "nn.nl/zakelijk/..."}
+]
+
+BRIEF_SECTION_OPTIONS = ("legal-blocks", "faq-blocks", "competitor-analysis", "internal-links")
+
+DEFAULT_BRIEF_INPUTS = {
+    "keywords": [
+        "bedrijfsaansprakelijkheidsverzekering", "avb",
+        "aansprakelijkheid bedrijven", "werkgeversaansprakelijkheid"
+    ],
+    "market": "Netherlands (NL)",
+    "product_group": "Zakelijke Verzekeringen",
+    "research_depth": 2,
+    "sections": ["legal-blocks", "faq-blocks", "competitor-analysis"],
+    "competitors": [comp["url"] for comp in DEFAULT_COMPETITORS],
+    "funnel_stage": "Think - Consideration",
+    "page_type": "Product Page",
+    "page_url": ""
+}
+
+DEFAULT_INTERNAL_LINKS = """/zakelijk/verzekeringen → Overzicht zakelijke verzekeringen
+/zakelijk/rekening → Zakelijke rekening openen
+/zakelijk/lenen → Zakelijke financiering
+/zakelijk/adviseurs → Persoonlijk advies"""
+
+def parse_keywords(text):
+    """Split a comma/newline separated keyword field into a clean list"""
+    return [kw.strip() for kw in text.replace("\n", ",").split(",") if kw.strip()]
+
+def suggest_internal_links(inputs, k=5):
+    """Related ING pages for the brief from the link index, one per line"""
+    if link_index is None or "internal-links" not in inputs.get("sections", []):
+        return DEFAULT_INTERNAL_LINKS
+    query = " ".join([*inputs.get("keywords", []), inputs.get("product_group", "")])
+    suggestions = link_index.suggest(query, k=k)
+    if not suggestions:
+        return DEFAULT_INTERNAL_LINKS
+    return "\n".join(f"{urlparse(url).path} → {title}" for url, title, _ in suggestions)
+
+def faq_from_paa(questions, limit=6):
+    """Collapse near-duplicate PAA questions, most asked first, one per line"""
+    return "\n".join(cluster["question"] for cluster in cluster_questions(questions)[:limit])
+
+DEFAULT_CONTENT_GAPS = """Concurrenten missen:
+- Specifieke voorbeelden voor verschillende sectoren
+- Kostenrekentool of premium calculator  
+- Video uitleg van complexe verzekeringssituaties
+- Vergelijkingstabel met andere verzekeringen"""
+
+DEFAULT_DIFFERENTIATION = """ING differentiatie:
+- Focus op digitale ondernemers en moderne werkvormen
+- Integratie met zakelijke bankproducten
+- Persoonlijke adviseur via video call
+- Snelle online afhandeling (24u)"""
+
+CONTENT_GAPS_TIMED_OUT = """Content gap-analyse niet afgerond binnen het researchbudget.
+Genereer de brief opnieuw of kies een hogere Research Depth."""
+
+def content_gap_fields(research):
+    """(Content Gaps, Differentiation Strategy) texts from the research pipeline's gap analysis"""
+    if not (research or {}).get("competitor_profiles"):
+        return DEFAULT_CONTENT_GAPS, DEFAULT_DIFFERENTIATION
+    
+    # The pipeline already spent its deadline on the analysis; a timeout is shown, not rerun
+    analysis = research.get("gaps")
+    if analysis is None:
+        return CONTENT_GAPS_TIMED_OUT, DEFAULT_DIFFERENTIATION
+    n = analysis["competitors"]
+    gaps = "\n".join(
+        f"- {gap['topic']} ({round(gap['competitor_share'] * n)}/{n} concurrenten)"
+        for gap in analysis["gaps"]
+    )
+    strengths = "\n".join(f"- {strength['topic']}" for strength in analysis["strengths"])
+    return (
+        "Concurrenten behandelen, ING nog niet:\n" + gaps if gaps else DEFAULT_CONTENT_GAPS,
+        "ING onderscheidt zich op:\n" + strengths if strengths else DEFAULT_DIFFERENTIATION
+    )
+
+def generate_brief(inputs, research=None):
+    """Build the brief fields for a set of Step 2/3 inputs.
+    
+    This is the template half of generation (`write_content_guidelines` adds
+    the model-written text); callers go through `brief_cache` so identical
+    inputs are only generated once.
+    `research` optionally carries crawled page texts and keyword volumes.
+    """
+    keywords = inputs.get("keywords") or DEFAULT_BRIEF_INPUTS["keywords"]
+    focus, secondary = keywords[0], keywords[1:]
+    content_gaps, differentiation = content_gap_fields(research)
+    
+    return {
+        "focus_keyword": focus,
+        "url": "https://www.ing.nl/zakelijk/verzekeringen/" + "-".join(focus.lower().split()),
+        "page_type": inputs.get("page_type") or "Product Page",
+        "funnel_stage": inputs.get("funnel_stage") or "Think - Consideration",
+        "audience": "MKB ondernemers, ZZP'ers",
+        "page_title": f"{focus[:1].upper() + focus[1:]} | ING Zakelijk",
+        "meta_description": f"Bescherm je bedrijf met {focus} van ING. Vergelijk AVB opties en regel direct online. Ontdek jouw mogelijkheden.",
+        "h1": f"{focus[:1].upper() + focus[1:]}: Bescherm je bedrijf tegen claims",
+        "h2_headers": f"""Wat is een {focus}?
+Waarom heb je een AVB nodig als ondernemer?
+Wat dekt een {focus}?
+Hoe kies je de juiste dekking voor jouw bedrijf?
+ING AVB: jouw voordelen op een rij
+Aanvragen in 3 eenvoudige stappen""",
+        "content_guidelines": f"""Schrijf persoonlijk en begrijpelijk. Gebruik 'je'-vorm en vermijd jargon.
+
+Focus keyword '{focus}' minimaal 3x natuurlijk verwerken.
+Secundaire keywords: {", ".join(secondary) or "-"}.
+
+Structuur per sectie:
+- Duidelijke koppen met keywords
+- Korte alinea's (max 4 regels)
+- Praktische voorbeelden voor MKB
+- Call-to-action per sectie""",
+        "content_gaps": content_gaps,
+        "differentiation": differentiation,
+        "faq": faq_from_paa([
+            f"Wat kost een {focus}?",
+            "Hoe hoog moet mijn AVB dekking zijn?",
+            "Kan ik mijn AVB tussentijds opzeggen?",
+            "Wat is het verschil tussen AVB en beroepsaansprakelijkheid?",
+            "Dekt AVB ook schade aan eigen personeel?",
+            "Welke bedrijven hebben een AVB verplicht?"
+        ]),
+        "internal_links": suggest_internal_links(inputs),
+        "research": {
+            "truncated": research.get("truncated", []),
+            "failed": research.get("failed", []),
+            "budget": research.get("budget")
+        } if research else {}
+    }
+
+async def write_content_guidelines(brief):
+    """Have the LLM write the brief's content guidelines; keeps the template text if it fails"""
+    if llm_client is None:
+        return brief
+    prompt = "\n\n".join([
+        f"Focus keyword: {brief['focus_keyword']}",
+        f"Page type: {brief['page_type']} ({brief['funnel_stage']}), audience: {brief['audience']}",
+        f"H2 headers:\n{brief['h2_headers']}",
+        f"Content gaps:\n{brief['content_gaps']}",
+        f"Template guidelines:\n{brief['content_guidelines']}"
+    ])
+    try:
+        text = await llm_client.complete(
+            prompt, max_tokens=800,
+            system="Je schrijft de schrijfrichtlijnen voor een SEO content brief van ING Zakelijk, in het Nederlands."
+        )
+    except Exception as e:
+        print(f"⚠️ LLM guidelines failed, keeping the template: {e}")
+        return brief
+    return {**brief, "content_guidelines": text.strip() or brief["content_guidelines"]}
+
+def brief_revision_key(request):
+    """This session's edit history of its brief; the cached brief itself is shared and never edited"""
+    return revision_key(get_or_create_session_id(request), request.session.get("brief_key", ""))
+
+async def research_brief(request, inputs):
+    """Return (brief, cache_hit) for `inputs`, researching and generating it on a cache miss.
+
+    Briefs built on truncated research are not cached, so regenerating can do
+    better; the session keeps them as a revision of its own instead. A fresh
+    brief (or a cached one replacing a truncated revision) becomes a new
+    revision when the session already has a history, so it is not hidden
+    behind older ones.
+    """
+    key = brief_cache_key(inputs)
+    # In the threadpool: a memory-tier miss reads the disk tier
+    brief, _ = await run_in_threadpool(brief_cache.lookup, key)
+    hit = brief is not None
+    request.session["brief_inputs"] = inputs
+    request.session["brief_key"] = key
+    request.session["brief_cache_hit"] = hit
+    truncated = False
+    if not hit:
+        research_results = await run_research(inputs, inputs["page_url"], semrush=semrush_client, profiles=profile_store)
+        brief = await run_in_threadpool(generate_brief, inputs, research_results)
+        brief = await write_content_guidelines(brief)
+        truncated = bool(research_results["truncated"])
+        if not truncated:
+            await run_in_threadpool(brief_cache.store, key, inputs, brief)
+
+    rev_key = brief_revision_key(request)
+    latest = await run_in_threadpool(revision_store.latest, rev_key)
+    outdated = latest is not None and (not hit or latest[1].get("research", {}).get("truncated"))
+    if truncated or outdated:
+        await run_in_threadpool(revision_store.save, rev_key, brief)
+    await save_wizard_state(request)
+    print(f"📝 Brief {key[:8]} {'served from cache' if hit else 'generated'}")
+    return brief, hit
+
+async def current_brief(request):
+    """Return (brief, cache_hit) for the brief this session last generated, with its saved edits.
+
+    Once the cached brief is gone (TTL, keyword invalidation) it is researched
+    again, never regenerated from the inputs alone.
+    """
+    # In the threadpool: both reads may hit SQLite or the disk tier
+    edited = None
+    if request.session.get("brief_key"):
+        edited = await run_in_threadpool(revision_store.get, brief_revision_key(request))
+    if edited is not None:
+        return edited, request.session.get("brief_cache_hit", False)
+    
+    brief, _ = await run_in_threadpool(brief_cache.lookup, request.session.get("brief_key", ""))
+    if brief is not None:
+        return brief, request.session.get("brief_cache_hit", False)
+    
+    return await research_brief(request, request.session.get("brief_inputs", DEFAULT_BRIEF_INPUTS))
+
 # ===== CAMPAIGN STEP FUNCTIONS =====
 
 def step1_mode_selection():
@@ -472,7 +927,11 @@ def step1_mode_selection():
         cls="max-w-4xl mx-auto"
     )
 
-def step2_research_setup(mode="optimize"):
+def step2_research_setup(mode="optimize", research=None):
+    research = research or {}
+    sections = research.get("sections", ["legal-blocks", "faq-blocks", "competitor-analysis"])
+    product_group = research.get("product_group", "Zakelijke Verzekeringen")
+    keywords = ", ".join(research.get("keywords", []))
     settings_card = Card(
         DivLAligned(
             H3("Optional Settings"),
@@ -481,18 +940,7 @@ def step2_research_setup(mode="optimize"):
         
         Div(
             Grid(
-                FormSectionDiv(
-                    DivLAligned(
-                        FormLabel("Market/Locale"),
-                        BrainIcon("Auto-detected based on keywords and domain")
-                    ),
-                    Select(
-                        Option("Netherlands (NL)", selected=True),
-                        Option("Belgium (BE)"),
-                        Option("Germany (DE)"),
-                        id="market"
-                    )
-                ),
+                MarketField(research.get("market", MARKET_OPTIONS[0])),
                 
                 FormSectionDiv(
                     DivLAligned(
@@ -500,10 +948,10 @@ def step2_research_setup(mode="optimize"):
                         BrainIcon("Determines legal pack and SharePoint folder")
                     ),
                     Select(
-                        Option("Zakelijke Verzekeringen", selected=True),
-                        Option("Zakelijke Rekeningen"),
-                        Option("Zakelijke Leningen"),
-                        Option("Beleggen"),
+                        *[
+                            Option(o, selected=o == product_group)
+                            for o in ("Zakelijke Verzekeringen", "Zakelijke Rekeningen", "Zakelijke Leningen", "Beleggen")
+                        ],
                         id="product-group"
                     )
                 ),
@@ -518,16 +966,16 @@ def step2_research_setup(mode="optimize"):
                             FormLabel("Research Depth"),
                             BrainIcon("Affects competitor analysis depth and keyword expansion")
                         ),
-                        LabelRange("Standard", value="2", min=1, max=3, id="research-depth")
+                        LabelRange("Standard", value=str(research.get("research_depth", 2)), min=1, max=3, id="research-depth", name="research-depth")
                     ),
                     
                     FormSectionDiv(
                         FormLabel("Include Sections"),
                         DivVStacked(
-                            LabelCheckboxX("Legal/Compliance blocks", checked=True, id="legal-blocks"),
-                            LabelCheckboxX("FAQ from PAA", checked=True, id="faq-blocks"),
-                            LabelCheckboxX("Competitor analysis", checked=True, id="competitor-analysis"),
-                            LabelCheckboxX("Internal linking suggestions", id="internal-links")
+                            LabelCheckboxX("Legal/Compliance blocks", checked="legal-blocks" in sections, id="legal-blocks"),
+                            LabelCheckboxX("FAQ from PAA", checked="faq-blocks" in sections, id="faq-blocks"),
+                            LabelCheckboxX("Competitor analysis", checked="competitor-analysis" in sections, id="competitor-analysis"),
+                            LabelCheckboxX("Internal linking suggestions", checked="internal-links" in sections, id="internal-links")
                         )
                     ),
                     cols=2, gap=4
@@ -549,8 +997,8 @@ def step2_research_setup(mode="optimize"):
                     FormLabel("ING Page URL"),
                     BrainIcon("We'll crawl this page to understand current content structure")
                 ),
-                Input(placeholder="https://www.ing.nl/zakelijk/verzekeringen/...", id="page-url"),
-                Button("Analyze URL", cls=ButtonT.default)
+                Input(placeholder="https://www.ing.nl/zakelijk/verzekeringen/...", value=research.get("page_url", ""), id="page-url"),
+                Button("Analyze URL", cls=ButtonT.default, type="button")
             ),
             
             FormSectionDiv(
@@ -558,7 +1006,7 @@ def step2_research_setup(mode="optimize"):
                     FormLabel("Target Keywords"),
                     BrainIcon("Primary keywords this page should rank for")
                 ),
-                Input(placeholder="bedrijfsaansprakelijkheidsverzekering, avb", id="keywords"),
+                Input(placeholder="bedrijfsaansprakelijkheidsverzekering, avb", value=keywords, id="keywords", **KEYWORD_MARKET_DETECTION),
                 UploadZone(
                     DivCentered(
                         UkIcon("upload", height=24, width=24, cls="text-muted-foreground"),
@@ -580,7 +1028,7 @@ def step2_research_setup(mode="optimize"):
                     FormLabel("Focus Keywords"),
                     BrainIcon("Primary keywords for the new page to target")
                 ),
-                Input(placeholder="bedrijfsaansprakelijkheidsverzekering, avb", id="keywords"),
+                Input(placeholder="bedrijfsaansprakelijkheidsverzekering, avb", value=keywords, id="keywords", **KEYWORD_MARKET_DETECTION),
                 UploadZone(
                     DivCentered(
                         UkIcon("upload", height=24, width=24, cls="text-muted-foreground"),
@@ -604,367 +1052,765 @@ def step2_research_setup(mode="optimize"):
     return Container(
         CampaignSteps(2),
         
-        main_inputs,
-        settings_card,
-        
-        DivFullySpaced(
-            A(Button("← Back", cls=ButtonT.ghost), href=f"/campaign/step1"),
-            A(Button("Start AI Analysis →", 
-                   cls=ButtonT.primary + " px-8"),
-              href="/campaign/step3")
+        Form(
+            Hidden(mode, id="mode"),
+            main_inputs,
+            settings_card,
+            
+            DivFullySpaced(
+                A(Button("← Back", cls=ButtonT.ghost, type="button"), href=f"/campaign/step1"),
+                Button("Start AI Analysis →", 
+                       cls=ButtonT.primary + " px-8",
+                       type="submit")
+            ),
+            method="post",
+            action="/campaign/step2",
+            cls="space-y-6"
         ),
         
         cls="max-w-4xl mx-auto space-y-6"
     )
 
-def step3_analysis():
-    return Container(
-        LoadingOverlay(),
-        CampaignSteps(3),
-        
-        Card(
-            H2("AI Analysis Complete"),
-            P("Review the research findings and confirm your preferences", cls=TextPresets.muted_sm)
+DEFAULT_KEYWORD_EXPANSION = [
+    ("bedrijfsaansprakelijkheidsverzekering", 2540),
+    ("avb", 2200),
+    ("aansprakelijkheidsverzekering voor bedrijven", 100),
+    ("aansprakelijkheid bedrijven", 60),
+    ("werkgeversaansprakelijkheidsverzekering", 60)
+]
+
+def keyword_expansion(keywords):
+    """[(keyword, monthly volume or None)], focus keyword first, from the nightly snapshot"""
+    if not keywords:
+        return DEFAULT_KEYWORD_EXPANSION
+    precomputed = precomputed_store()
+    stats = precomputed.keyword_stats(keywords) if precomputed is not None else {}
+    return [(kw, stats[kw]["volume"] if kw in stats else None) for kw in keywords]
+
+def research_competitors(keywords):
+    """Top competitors ranking for the focus keyword, from the nightly snapshot"""
+    precomputed = precomputed_store()
+    if keywords and precomputed is not None:
+        return precomputed.competitors(keywords[0]) or DEFAULT_COMPETITORS
+    return DEFAULT_COMPETITORS
+
+def competitor_pages(research):
+    """The research's competitor URLs as [{"title", "url"}] for display"""
+    suggested = research_competitors(research.get("keywords", []))
+    titles = {c["url"]: c["title"] for c in [*DEFAULT_COMPETITORS, *suggested]}
+    urls = research.get("competitors") or [c["url"] for c in suggested]
+    return [{"title": titles.get(url, url.split("/", 1)[0]), "url": url} for url in urls]
+
+def format_volume(volume):
+    return "–" if volume is None else f"{volume:,}"
+
+def CompetitorList(competitors):
+    """Editable competitor list; each edit swaps this list and the gap preview in place"""
+    edit = {"hx_target": "#competitor-list", "hx_swap": "outerHTML"}
+    return Div(
+        H4("Top Competitors Found", cls="mb-3"),
+        *[
+            Div(
+                DivFullySpaced(
+                    Div(
+                        Strong(f"{i+1}. {comp['title']}"),
+                        P(comp['url'], cls=TextPresets.muted_sm)
+                    ),
+                    Button("Remove", cls=ButtonT.ghost + " text-sm", type="button",
+                           hx_post="/campaign/step3/competitors/remove", hx_vals={"url": comp["url"]}, **edit)
+                ),
+                cls="border-b pb-2 mb-2"
+            ) 
+            for i, comp in enumerate(competitors)
+        ],
+        DivLAligned(
+            # The list sits inside the Step 3 form: Enter adds the competitor instead of submitting it
+            Input(placeholder="competitor.nl/pagina", id="new-competitor", name="url", cls="flex-1",
+                  onkeydown="if (event.key === 'Enter') event.preventDefault()",
+                  hx_post="/campaign/step3/competitors/add", hx_trigger="keydown[key=='Enter']", **edit),
+            Button("+ Add Competitor", cls=ButtonT.default, type="button",
+                   hx_post="/campaign/step3/competitors/add", hx_include="#new-competitor", **edit),
+            cls="gap-2 mt-2"
         ),
-        
+        id="competitor-list"
+    )
+
+def GapPreview(analysis=None, failed=(), **kwargs):
+    """Content gaps of the current competitor list; loads itself after the page renders"""
+    header = DivLAligned(
+        H3("Content Gaps"),
+        BrainIcon("Topics most competitors cover that the ING page does not")
+    )
+    if analysis is None:
+        return Card(
+            header,
+            DivLAligned(Loading((LoadingT.spinner, LoadingT.sm)), P("Analyzing competitor pages...", cls=TextPresets.muted_sm)),
+            id="gap-preview", hx_get="/campaign/step3/gaps", hx_trigger="load", hx_swap="outerHTML"
+        )
+    n = analysis["competitors"]
+    return Card(
+        header,
         Grid(
-            Card(
-                DivLAligned(
-                    H3("SERP Analysis"),
-                    BrainIcon("Top competitors found in Google search results")
-                ),
-                
-                Div(
-                    H4("Top Competitors Found", cls="mb-3"),
-                    *[
-                        Div(
-                            DivFullySpaced(
-                                Div(
-                                    Strong(f"{i+1}. {comp['title']}"),
-                                    P(comp['url'], cls=TextPresets.muted_sm)
-                                ),
-                                Button("Remove", cls=ButtonT.ghost + " text-sm")
-                            ),
-                            cls="border-b pb-2 mb-2"
-                        ) 
-                        for i, comp in enumerate([
-                            {"title": "KVK - Bedrijfsaansprakelijkheidsverzekering", "url": "kvk.nl/verzekeringen/..."},
-                            {"title": "Zilveren Kruis - AVB Zakelijk", "url": "zilverenkruis.nl/zakelijk/..."},
-                            {"title": "Nationale Nederlanden - Aansprakelijkheidsverzekering", "url": "nn.nl/zakelijk/..."}
-                        ])
-                    ],
-                    Button("+ Add Competitor", cls=ButtonT.default + " mt-2")
-                )
-            ),
-            
-            Card(
-                DivLAligned(
-                    H3("Page Recommendations"),
-                    BrainIcon("Analyzed from search intent and competitor patterns")
-                ),
-                
-                FormSectionDiv(
-                    FormLabel("Funnel Stage"),
-                    Select(
-                        Option("Think - Consideration", selected=True),
-                        Option("See - Awareness"),
-                        Option("Do - Decision"),
-                        Option("Care - Retention"),
-                        id="funnel-stage"
-                    )
-                ),
-                
-                FormSectionDiv(
-                    FormLabel("Page Type"), 
-                    Select(
-                        Option("Product Page", selected=True),
-                        Option("Content Page"),
-                        Option("Blog Article"),
-                        id="page-type"
+            Div(
+                H4("Competitors cover, ING does not", cls="mb-2"),
+                *[
+                    DivFullySpaced(
+                        Span(gap["topic"], cls="font-mono text-sm"),
+                        Span(f"{round(gap['competitor_share'] * n)}/{n}", cls=TextPresets.muted_sm)
                     )
-                )
+                    for gap in analysis["gaps"]
+                ] or [P("No shared topics missing.", cls=TextPresets.muted_sm)]
             ),
-            cols=2, gap=6
-        ),
-        
-        Card(
-            DivLAligned(
-                H3("Keyword Expansion"),
-                BrainIcon("Additional keywords found through SEMrush analysis")
+            Div(
+                H4("ING stands out on", cls="mb-2"),
+                *[P(strength["topic"], cls="font-mono text-sm") for strength in analysis["strengths"]]
+                or [P("Add the ING page URL in Step 2 to compare.", cls=TextPresets.muted_sm)]
             ),
-            
-            Grid(
-                Div(
-                    H4("Focus Keyword", cls="mb-2"),
-                    P("bedrijfsaansprakelijkheidsverzekering", cls="font-mono bg-orange-50 p-2 rounded"),
-                    P("2,540 monthly searches", cls=TextPresets.muted_sm)
-                ),
-                
-                Div(
-                    H4("Secondary Keywords", cls="mb-2"),
-                    *[
-                        DivFullySpaced(
-                            Span(kw['term'], cls="font-mono text-sm"),
-                            Span(f"{kw['vol']}/mo", cls=TextPresets.muted_sm)
-                        )
-                        for kw in [
-                            {"term": "avb", "vol": "2,200"},
-                            {"term": "aansprakelijkheidsverzekering voor bedrijven", "vol": "100"},
-                            {"term": "aansprakelijkheid bedrijven", "vol": "60"},
-                            {"term": "werkgeversaansprakelijkheidsverzekering", "vol": "60"}
-                        ]
-                    ]
-                ),
-                cols=2, gap=6
-            )
-        ),
-        
-        DivFullySpaced(
-            A(Button("← Back to Setup", cls=ButtonT.ghost), href="/campaign/step2"),
-            Button("Generate Brief →", 
-                   cls=ButtonT.primary + " px-8",
-                   onclick="startBriefGeneration()")
+            cols=2, gap=6
         ),
-        
-        cls="max-w-6xl mx-auto space-y-6"
+        P(f"Could not fetch: {', '.join(failed)}", cls="text-sm text-red-600 mt-2") if failed else "",
+        id="gap-preview",
+        **kwargs
     )
 
-def step4_brief_edit():
+def step3_analysis(research=None):
+    keywords = (research or {}).get("keywords", [])
+    competitors = competitor_pages(research or {})
+    (focus, focus_volume), *secondary = keyword_expansion(keywords)
     return Container(
-        CampaignSteps(4),
+        LoadingOverlay(),
+        CampaignSteps(3),
         
-        DivFullySpaced(
-            Div(
-                H2("Content Brief Generated"),
-                P("Review and edit your AI-generated brief", cls=TextPresets.muted_sm)
-            )
-        ),
+        Form(
+            Card(
+                H2("AI Analysis Complete"),
+                P("Review the research findings and confirm your preferences", cls=TextPresets.muted_sm)
+            ),
         
-        Accordion(
-            AccordionItem(
-                "Basic Information & Strategy",
-                Grid(
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Suggested URL"),
-                            BrainIcon("SEO-optimized URL structure recommendation")
-                        ),
-                        Input(value="https://www.ing.nl/zakelijk/verzekeringen/bedrijfsaansprakelijkheid", id="url-suggestion")
+            Grid(
+                Card(
+                    DivLAligned(
+                        H3("SERP Analysis"),
+                        BrainIcon("Top competitors found in Google search results")
                     ),
-                    
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Page Type"),
-                            BrainIcon("Recommended based on search intent analysis")
-                        ),
-                        Select(
-                            Option("Product Page", selected=True),
-                            Option("Content Page"),
-                            Option("Landing Page"),
-                            id="page-type-final"
-                        )
+                
+                    CompetitorList(competitors)
+                ),
+            
+                Card(
+                    DivLAligned(
+                        H3("Page Recommendations"),
+                        BrainIcon("Analyzed from search intent and competitor patterns")
                     ),
-                    
+                
                     FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Funnel Stage"),
-                            BrainIcon("Customer journey phase this content addresses")
-                        ),
+                        FormLabel("Funnel Stage"),
                         Select(
                             Option("Think - Consideration", selected=True),
                             Option("See - Awareness"),
                             Option("Do - Decision"),
                             Option("Care - Retention"),
-                            id="funnel-final"
+                            id="funnel-stage"
                         )
                     ),
-                    
+                
                     FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Target Audience"),
-                            BrainIcon("Primary audience identified from keyword analysis")
-                        ),
-                        Input(value="MKB ondernemers, ZZP'ers", id="target-audience")
-                    ),
-                    cols=2, gap=4
-                )
+                        FormLabel("Page Type"), 
+                        Select(
+                            Option("Product Page", selected=True),
+                            Option("Content Page"),
+                            Option("Blog Article"),
+                            id="page-type"
+                        )
+                    )
+                ),
+                cols=2, gap=6
             ),
+
+            GapPreview(),
+        
+            Card(
+                DivLAligned(
+                    H3("Keyword Expansion"),
+                    BrainIcon("Additional keywords found through SEMrush analysis")
+                ),
             
-            AccordionItem(
-                "SEO Elements",
                 Grid(
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Page Title (60 chars max)"),
-                            BrainIcon("Optimized for click-through rate and keyword relevance")
-                        ),
-                        Input(value="Bedrijfsaansprakelijkheidsverzekering | ING Zakelijk", id="page-title"),
-                        P("48/60 characters", cls="text-green-600 text-sm")
-                    ),
-                    
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Meta Description (155 chars max)"),
-                            BrainIcon("Compelling snippet to improve search click-through rates")
-                        ),
-                        TextArea(
-                            "Bescherm je bedrijf met bedrijfsaansprakelijkheidsverzekering van ING. Vergelijk AVB opties en regel direct online. Ontdek jouw mogelijkheden.",
-                            rows=3,
-                            id="meta-description"
-                        ),
-                        P("148/155 characters", cls="text-green-600 text-sm")
+                    Div(
+                        H4("Focus Keyword", cls="mb-2"),
+                        P(focus, cls="font-mono bg-orange-50 p-2 rounded"),
+                        P(f"{format_volume(focus_volume)} monthly searches", cls=TextPresets.muted_sm)
                     ),
-                    cols=2, gap=4
-                ),
                 
-                FormSectionDiv(
-                    DivLAligned(
-                        FormLabel("Focus Keyword Density"),
-                        BrainIcon("Recommended 3-5 natural mentions throughout content")
+                    Div(
+                        H4("Secondary Keywords", cls="mb-2"),
+                        *[
+                            DivFullySpaced(
+                                Span(term, cls="font-mono text-sm"),
+                                Span(f"{format_volume(volume)}/mo", cls=TextPresets.muted_sm)
+                            )
+                            for term, volume in secondary
+                        ]
                     ),
-                    P("bedrijfsaansprakelijkheidsverzekering", cls="font-mono bg-orange-50 p-2 rounded"),
-                    P("Target: 3-5 mentions (currently 0)", cls=TextPresets.muted_sm)
-                )
-            ),
-            
-            AccordionItem(
-                "Content Structure & Headers",
-                FormSectionDiv(
-                    DivLAligned(
-                        FormLabel("H1 Heading"),
-                        BrainIcon("Primary heading incorporating focus keyword")
-                    ),
-                    Input(value="Bedrijfsaansprakelijkheidsverzekering: Bescherm je bedrijf tegen claims", id="h1-heading")
+                    cols=2, gap=6
                 ),
-                
-                FormSectionDiv(
-                    DivLAligned(
-                        FormLabel("H2 Section Headers"),
-                        BrainIcon("Main content sections based on user search intent")
-                    ),
-                    TextArea(
-                        """Wat is een bedrijfsaansprakelijkheidsverzekering?
-Waarom heb je een AVB nodig als ondernemer?
-Wat dekt een bedrijfsaansprakelijkheidsverzekering?
-Hoe kies je de juiste dekking voor jouw bedrijf?
-ING AVB: jouw voordelen op een rij
-Aanvragen in 3 eenvoudige stappen""",
-                        rows=6,
-                        id="h2-headers"
-                    )
-                ),
-                
-                FormSectionDiv(
-                    DivLAligned(
-                        FormLabel("Content Guidelines"),
-                        BrainIcon("Writing instructions following ING tone of voice")
-                    ),
-                    TextArea(
-                        """Schrijf persoonlijk en begrijpelijk. Gebruik 'je'-vorm en vermijd jargon.
+                A("Plan a campaign from a full keyword list →", href="/campaign/plan", cls="text-sm text-orange-600 mt-4 inline-block")
+            ),
+        
+            DivFullySpaced(
+                A(Button("← Back to Setup", cls=ButtonT.ghost, type="button"), href="/campaign/step2"),
+                Button("Generate Brief →", 
+                       cls=ButtonT.primary + " px-8",
+                       type="submit",
+                       onclick="startBriefGeneration()")
+            ),
+            method="post",
+            action="/campaign/generate",
+            cls="space-y-6"
+        ),
+        
+        cls="max-w-6xl mx-auto space-y-6"
+    )
 
-Focus keyword 'bedrijfsaansprakelijkheidsverzekering' minimaal 3x natuurlijk verwerken.
-Secundaire keywords: avb, aansprakelijkheid bedrijven, werkgeversaansprakelijkheid.
+# Proposed briefs rendered on the plan page (the rest only count in the summary)
+MAX_PLAN_BRIEFS = 50
+# Keywords carried from a plan cluster into a new brief
+MAX_BRIEF_KEYWORDS = 25
 
-Structuur per sectie:
-- Duidelijke koppen met keywords
-- Korte alinea's (max 4 regels)
-- Praktische voorbeelden voor MKB
-- Call-to-action per sectie""",
-                        rows=8,
-                        id="content-guidelines"
+def fill_volumes(keywords):
+    """Uploaded (keyword, volume) pairs with missing volumes taken from the nightly snapshot"""
+    missing = [kw for kw, volume in keywords if volume is None]
+    stats, precomputed = {}, precomputed_store()
+    if missing and precomputed is not None:
+        # Batched to stay under SQLite's bound-parameter limit
+        for start in range(0, len(missing), 500):
+            stats.update(precomputed.keyword_stats(missing[start:start + 500]))
+    return [(kw, volume if volume is not None else stats.get(kw, {}).get("volume")) for kw, volume in keywords]
+
+def PlanBriefRow(brief):
+    focus_volume = brief["keywords"][0][1]
+    secondary = [kw for kw, _ in brief["keywords"][1:]]
+    return Tr(
+        Td(Strong(brief["keyword"], cls="font-mono"), P(f"{format_volume(focus_volume)}/mo", cls=TextPresets.muted_sm)),
+        Td(
+            Span(", ".join(secondary[:8]), cls="font-mono text-sm"),
+            Span(f" +{len(secondary) - 8} more", cls=TextPresets.muted_sm) if len(secondary) > 8 else ""
+        ),
+        Td(f"{brief['volume']:,}"),
+        Td(*[P(url, cls=TextPresets.muted_sm) for url in brief["urls"]]),
+        Td(
+            Form(
+                *[Hidden(kw, name="keywords") for kw, _ in brief["keywords"][:MAX_BRIEF_KEYWORDS]],
+                Button("Create brief", cls=ButtonT.primary + " text-sm", type="submit"),
+                method="post",
+                action="/campaign/plan/use"
+            )
+        )
+    )
+
+def campaign_plan_page(plan=None, min_shared=MIN_SHARED, error=None):
+    """Keyword-list upload and the proposed briefs, one per SERP-overlap cluster"""
+    upload = Card(
+        DivLAligned(
+            H3("Keyword List"),
+            BrainIcon("Keywords that share top-ranking pages are grouped into one brief")
+        ),
+        Form(
+            FormSectionDiv(
+                FormLabel("Upload keywords (.txt or .csv, optional volume column)"),
+                Input(type="file", name="keyword-file", accept=".txt,.csv")
+            ),
+            FormSectionDiv(
+                FormLabel("Or paste keywords, one per line"),
+                TextArea(rows=6, name="keyword-text", placeholder="avb\nbedrijfsaansprakelijkheidsverzekering, 2540")
+            ),
+            FormSectionDiv(
+                FormLabel("Shared top-10 results to share a page"),
+                Select(*[Option(str(n), selected=n == min_shared) for n in range(2, 7)], name="min-shared")
+            ),
+            Button("Build Campaign Plan →", cls=ButtonT.primary + " px-8", type="submit"),
+            method="post",
+            action="/campaign/plan",
+            enctype="multipart/form-data",
+            cls="space-y-4"
+        ),
+        P(error, cls="text-red-600 text-sm") if error else ""
+    )
+    if plan is None:
+        return Container(H2("Campaign Plan"), upload, cls="max-w-6xl mx-auto space-y-6")
+
+    briefs = plan["briefs"][:MAX_PLAN_BRIEFS]
+    summary = Card(
+        H3(f"{len(plan['briefs']):,} proposed briefs"),
+        P(
+            f"{plan['keywords']:,} keywords: {sum(len(b['keywords']) for b in plan['briefs']):,} grouped into briefs, "
+            f"{len(plan['singletons']):,} without a page-sharing partner, {len(plan['missing']):,} without SERP data. "
+            f"Clustered in {plan['seconds']:.2f}s.",
+            cls=TextPresets.muted_sm
+        ),
+        P(f"Showing the {len(briefs)} briefs with the most search volume.", cls=TextPresets.muted_sm)
+        if len(plan["briefs"]) > len(briefs) else ""
+    )
+    return Container(
+        H2("Campaign Plan"),
+        summary,
+        Card(
+            Table(
+                Thead(Tr(Th("Focus keyword"), Th("Secondary keywords"), Th("Volume/mo"), Th("Top ranking pages"), Th(""))),
+                Tbody(*[PlanBriefRow(brief) for brief in briefs]),
+                cls=(TableT.divider, TableT.sm)
+            ) if briefs else P("No keywords share enough top results to share a page.", cls=TextPresets.muted_lg)
+        ),
+        upload,
+        cls="max-w-6xl mx-auto space-y-6"
+    )
+
+# Step 4 brief sections, in display order. Only the first one is rendered
+# inline; the rest are fetched from /campaign/step4/section/{slug} the first
+# time the user expands them and then stay in the page.
+
+def brief_section_basic(brief):
+    return Grid(
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Suggested URL"),
+                BrainIcon("SEO-optimized URL structure recommendation")
+            ),
+            Input(value=brief["url"], id="url-suggestion", name="url")
+        ),
+        
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Page Type"),
+                BrainIcon("Recommended based on search intent analysis")
+            ),
+            Select(
+                *[Option(o, selected=o == brief["page_type"]) for o in ("Product Page", "Content Page", "Landing Page")],
+                id="page-type-final",
+                name="page_type"
+            )
+        ),
+        
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Funnel Stage"),
+                BrainIcon("Customer journey phase this content addresses")
+            ),
+            Select(
+                *[Option(o, selected=o == brief["funnel_stage"]) for o in ("Think - Consideration", "See - Awareness", "Do - Decision", "Care - Retention")],
+                id="funnel-final",
+                name="funnel_stage"
+            )
+        ),
+        
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Target Audience"),
+                BrainIcon("Primary audience identified from keyword analysis")
+            ),
+            Input(value=brief["audience"], id="target-audience", name="audience")
+        ),
+        cols=2, gap=4
+    )
+
+# Edits to page-copy fields re-score the brief once typing pauses
+LIVE_SEO_SCORING = {
+    "hx_post": "/campaign/step4/score",
+    "hx_trigger": "input changed delay:300ms",
+    "hx_target": "#seo-score",
+    "hx_swap": "outerHTML",
+    "hx_include": "#brief-form"
+}
+
+SCORE_STATUS_CLS = {"ok": "text-green-600", "short": "text-amber-600", "low": "text-amber-600",
+                    "high": "text-red-600", "truncated": "text-red-600"}
+
+def seo_report(brief, keywords=()):
+    """One-off full SEO report for a brief (live edits go through `seo_scorers`)"""
+    scorer = BriefScorer(brief["focus_keyword"], keywords[1:])
+    scorer.sync({field: brief.get(field, "") for field in DENSITY_FIELDS})
+    return scorer.report()
+
+def LengthScore(id, check, **kwargs):
+    note = {"truncated": " · cut off in search results", "short": " · too short"}.get(check["status"], "")
+    return P(
+        f"{check['chars']}/{check['max_chars']} characters · {check['px']}/{check['max_px']} px{note}",
+        cls=f"{SCORE_STATUS_CLS[check['status']]} text-sm",
+        id=id,
+        **kwargs
+    )
+
+def FocusMentions(focus, **kwargs):
+    low, high = FOCUS_MENTIONS
+    return P(
+        f"Target: {low}-{high} mentions (currently {focus['mentions']}, {focus['density']:.1%} of page copy)",
+        cls=f"{SCORE_STATUS_CLS[focus['status']]} text-sm",
+        id="focus-mentions",
+        **kwargs
+    )
+
+def SeoScorePanel(report, elapsed=None):
+    """Live checks over title, meta description, keyword use and headings"""
+    headings = report["headings"]
+
+    def check(ok, text):
+        return DivLAligned(UkIcon("check" if ok else "x", height=16, width=16,
+                                  cls="text-green-600" if ok else "text-red-600"), Span(text, cls="text-sm"))
+
+    return Card(
+        DivFullySpaced(
+            DivLAligned(H3("SEO Score"), BrainIcon("Recomputed as you edit title, meta, headings and FAQ")),
+            Span(f"updated in {elapsed * 1000:.2f} ms", cls=TextPresets.muted_sm) if elapsed is not None else ""
+        ),
+        Grid(
+            Div(
+                check(report["title"]["status"] == "ok", f"Title {report['title']['px']}/{report['title']['max_px']} px"),
+                check(report["meta"]["status"] == "ok", f"Meta description {report['meta']['px']}/{report['meta']['max_px']} px"),
+                check(report["focus"]["status"] == "ok", f"Focus keyword: {report['focus']['mentions']} mentions"),
+                cls="space-y-2"
+            ),
+            Div(
+                check(headings["focus_in_h1"], "Focus keyword in H1"),
+                check(headings["h2_with_keyword"] > 0, f"H2s with a keyword: {headings['h2_with_keyword']}/{headings['h2_total']}"),
+                check(headings["secondary_in_headings"] == headings["secondary_total"],
+                      f"Secondary keywords in headings: {headings['secondary_in_headings']}/{headings['secondary_total']}"),
+                cls="space-y-2"
+            ),
+            Div(
+                *[
+                    DivFullySpaced(
+                        Span(item["keyword"], cls="font-mono text-sm"),
+                        Span(f"{item['mentions']}× · {item['density']:.1%}", cls=TextPresets.muted_sm)
                     )
-                )
+                    for item in report["secondary"]
+                ],
+                P(f"{report['words']:,} words of page copy", cls=TextPresets.muted_sm)
             ),
-            
-            AccordionItem(
-                "Competitor Analysis & Opportunities",
-                Grid(
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Content Gaps"),
-                            BrainIcon("Opportunities where competitors are weak")
-                        ),
-                        TextArea(
-                            """Concurrenten missen:
-- Specifieke voorbeelden voor verschillende sectoren
-- Kostenrekentool of premium calculator  
-- Video uitleg van complexe verzekeringssituaties
-- Vergelijkingstabel met andere verzekeringen""",
-                            rows=4,
-                            id="content-gaps"
-                        )
-                    ),
-                    
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Differentiation Strategy"),
-                            BrainIcon("How to stand out from competitor content")
-                        ),
-                        TextArea(
-                            """ING differentiatie:
-- Focus op digitale ondernemers en moderne werkvormen
-- Integratie met zakelijke bankproducten
-- Persoonlijke adviseur via video call
-- Snelle online afhandeling (24u)""",
-                            rows=4,
-                            id="differentiation"
-                        )
-                    ),
-                    cols=2, gap=4
-                )
+            cols=3, gap=4
+        ),
+        id="seo-score"
+    )
+
+def brief_section_seo(brief):
+    return (
+        Grid(
+            FormSectionDiv(
+                DivLAligned(
+                    FormLabel("Page Title (60 chars max)"),
+                    BrainIcon("Optimized for click-through rate and keyword relevance")
+                ),
+                Input(value=brief["page_title"], id="page-title", name="page_title", **LIVE_SEO_SCORING),
+                LengthScore("page-title-score", length_check(brief["page_title"], TITLE_MAX_CHARS, TITLE_FONT_PX, TITLE_MAX_PX))
             ),
             
-            AccordionItem(
-                "FAQ & Internal Linking",
-                Grid(
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("FAQ from PAA"),
-                            BrainIcon("Questions extracted from Google's People Also Ask")
-                        ),
-                        TextArea(
-                            """Wat kost een bedrijfsaansprakelijkheidsverzekering?
-Hoe hoog moet mijn AVB dekking zijn?
-Kan ik mijn AVB tussentijds opzeggen?
-Wat is het verschil tussen AVB en beroepsaansprakelijkheid?
-Dekt AVB ook schade aan eigen personeel?
-Welke bedrijven hebben een AVB verplicht?""",
-                            rows=6,
-                            id="faq-questions"
-                        )
-                    ),
-                    
-                    FormSectionDiv(
-                        DivLAligned(
-                            FormLabel("Internal Links"),
-                            BrainIcon("Relevant ING pages to link to for SEO and user journey")
-                        ),
-                        TextArea(
-                            """/zakelijk/verzekeringen → Overzicht zakelijke verzekeringen
-/zakelijk/rekening → Zakelijke rekening openen
-/zakelijk/lenen → Zakelijke financiering
-/zakelijk/adviseurs → Persoonlijk advies""",
-                            rows=4,
-                            id="internal-links"
-                        )
-                    ),
-                    cols=2, gap=4
-                )
+            FormSectionDiv(
+                DivLAligned(
+                    FormLabel("Meta Description (155 chars max)"),
+                    BrainIcon("Compelling snippet to improve search click-through rates")
+                ),
+                TextArea(
+                    brief["meta_description"],
+                    rows=3,
+                    id="meta-description",
+                    name="meta_description",
+                    **LIVE_SEO_SCORING
+                ),
+                LengthScore("meta-description-score", length_check(brief["meta_description"], META_MAX_CHARS, META_FONT_PX, META_MAX_PX))
+            ),
+            cols=2, gap=4
+        ),
+        
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Focus Keyword Density"),
+                BrainIcon("Recommended 3-5 natural mentions throughout content")
+            ),
+            P(brief["focus_keyword"], cls="font-mono bg-orange-50 p-2 rounded"),
+            FocusMentions(seo_report(brief)["focus"])
+        )
+    )
+
+def brief_section_structure(brief):
+    return (
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("H1 Heading"),
+                BrainIcon("Primary heading incorporating focus keyword")
+            ),
+            Input(value=brief["h1"], id="h1-heading", name="h1", **LIVE_SEO_SCORING)
+        ),
+        
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("H2 Section Headers"),
+                BrainIcon("Main content sections based on user search intent")
+            ),
+            TextArea(
+                brief["h2_headers"],
+                rows=6,
+                id="h2-headers",
+                name="h2_headers",
+                **LIVE_SEO_SCORING
             )
         ),
         
-        DivFullySpaced(
-            A(Button("← Back to Analysis", cls=ButtonT.ghost), href="/campaign/step3"),
+        FormSectionDiv(
             DivLAligned(
-                Button("Save Draft", cls=ButtonT.default),
-                A(Button("Export & Finish →", cls=ButtonT.primary), href="/campaign/step5")
+                FormLabel("Content Guidelines"),
+                BrainIcon("Writing instructions following ING tone of voice")
+            ),
+            TextArea(
+                brief["content_guidelines"],
+                rows=8,
+                id="content-guidelines",
+                name="content_guidelines"
+            )
+        )
+    )
+
+def brief_section_competitors(brief):
+    return Grid(
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Content Gaps"),
+                BrainIcon("Opportunities where competitors are weak")
+            ),
+            TextArea(
+                brief["content_gaps"],
+                rows=4,
+                id="content-gaps",
+                name="content_gaps"
             )
         ),
         
-        cls="max-w-6xl mx-auto space-y-6"
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Differentiation Strategy"),
+                BrainIcon("How to stand out from competitor content")
+            ),
+            TextArea(
+                brief["differentiation"],
+                rows=4,
+                id="differentiation",
+                name="differentiation"
+            )
+        ),
+        cols=2, gap=4
+    )
+
+def brief_section_faq_links(brief):
+    return Grid(
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("FAQ from PAA"),
+                BrainIcon("Questions extracted from Google's People Also Ask")
+            ),
+            TextArea(
+                brief["faq"],
+                rows=6,
+                id="faq-questions",
+                name="faq",
+                **LIVE_SEO_SCORING
+            )
+        ),
+        
+        FormSectionDiv(
+            DivLAligned(
+                FormLabel("Internal Links"),
+                BrainIcon("Relevant ING pages to link to for SEO and user journey")
+            ),
+            TextArea(
+                brief["internal_links"],
+                rows=4,
+                id="internal-links",
+                name="internal_links"
+            )
+        ),
+        cols=2, gap=4
+    )
+
+BRIEF_SECTIONS = {
+    "basic": ("Basic Information & Strategy", brief_section_basic),
+    "seo": ("SEO Elements", brief_section_seo),
+    "structure": ("Content Structure & Headers", brief_section_structure),
+    "competitors": ("Competitor Analysis & Opportunities", brief_section_competitors),
+    "faq-links": ("FAQ & Internal Linking", brief_section_faq_links),
+}
+
+def LazyAccordionItem(slug, title):
+    """Accordion item whose body is loaded once, on first expand"""
+    return AccordionItem(
+        title,
+        DivCentered(Loading((LoadingT.dots, LoadingT.md)), cls="py-6"),
+        a_kwargs={
+            "hx_get": f"/campaign/step4/section/{slug}",
+            "hx_trigger": "click once",
+            "hx_target": "next .uk-accordion-content",
+            "hx_swap": "innerHTML"
+        }
     )
 
-def step5_complete():
+STEP4_CONTAINER_CLS = "max-w-6xl mx-auto space-y-6"
+
+def step4_brief_header(brief, cache_hit=False):
+    truncated = brief.get("research", {}).get("truncated")
+    return Div(
+        DivFullySpaced(
+            Div(
+                H2("Content Brief Generated"),
+                P("Review and edit your AI-generated brief", cls=TextPresets.muted_sm)
+            ),
+            Label("⚡ Served from cache", cls=LabelT.secondary) if cache_hit else ""
+        ),
+        Alert(
+            f"⏱ Research hit its {brief['research']['budget']:g}s budget for this depth. "
+            f"Not included: {', '.join(truncated)}",
+            cls=AlertT.warning + " mt-4"
+        ) if truncated else ""
+    )
+
+def step4_brief_accordion(brief):
+    (first_slug, (first_title, first_section)), *rest = BRIEF_SECTIONS.items()
+    # One form around every section, so Save Draft picks up whichever ones are loaded
+    return Form(id="brief-form")(
+        Accordion(
+            AccordionItem(first_title, first_section(brief)),
+            *[LazyAccordionItem(slug, title) for slug, (title, _) in rest]
+        )
+    )
+
+def step4_brief_actions():
+    return DivFullySpaced(
+        A(Button("← Back to Analysis", cls=ButtonT.ghost), href="/campaign/step3"),
+        DivLAligned(
+            Span(id="save-status"),
+            Button(
+                "Save Draft",
+                cls=ButtonT.default,
+                type="button",
+                hx_post="/campaign/step4/save",
+                hx_include="#brief-form",
+                hx_target="#save-status"
+            ),
+            A(Button("Export & Finish →", cls=ButtonT.primary), href="/campaign/step5")
+        )
+    )
+
+def step4_sections(brief, cache_hit=False, keywords=()):
+    """Step 4 page sections, in order, as lazily rendered callables"""
+    return (
+        lambda: CampaignSteps(4),
+        lambda: step4_brief_header(brief, cache_hit),
+        lambda: step4_brief_accordion(brief),
+        lambda: SeoScorePanel(seo_report(brief, keywords)),
+        step4_brief_actions
+    )
+
+def step4_brief_edit(brief, cache_hit=False, keywords=()):
+    return Container(*[section() for section in step4_sections(brief, cache_hit, keywords)], cls=STEP4_CONTAINER_CLS)
+
+def SaveStatus(rev):
+    return DivLAligned(
+        P(f"✓ Saved revision {rev}", cls="text-green-600 text-sm"),
+        A("History", href="/campaign/step4/revisions", cls="text-sm underline")
+    )
+
+def revision_history_page(history):
+    rows = [
+        Tr(
+            Td(f"#{item['rev']}"),
+            Td(datetime.fromtimestamp(item["created"]).strftime("%d-%m-%Y %H:%M:%S")),
+            Td(", ".join(item["fields"]) if item["kind"] == "delta" else "Full snapshot"),
+            Td(f"{item['bytes']:,} B", cls=TextPresets.muted_sm),
+            Td(
+                A("Compare with previous", href=f"/campaign/step4/revisions/diff?old={item['rev'] - 1}&new={item['rev']}")
+                if item["rev"] > 1 else ""
+            )
+        )
+        for item in history
+    ]
+    return Container(
+        DivFullySpaced(
+            H2("Revision History"),
+            A(Button("← Back to Brief", cls=ButtonT.ghost), href="/campaign/step4")
+        ),
+        Card(
+            Table(
+                Thead(Tr(Th("Revision"), Th("Saved"), Th("Changed"), Th("Stored"), Th(""))),
+                Tbody(*rows)
+            ) if rows else P("No saved revisions yet. Use Save Draft in Step 4.", cls=TextPresets.muted_lg)
+        ),
+        cls=STEP4_CONTAINER_CLS
+    )
+
+DIFF_ROW_CLS = {
+    "equal": ("", ""),
+    "replace": ("bg-red-50", "bg-green-50"),
+    "delete": ("bg-red-50", ""),
+    "insert": ("", "bg-green-50"),
+}
+
+def revision_diff_page(old_rev, new_rev, changes):
+    """Side-by-side diff of every field changed between two revisions"""
+    cards = [
+        Card(
+            Table(
+                Thead(Tr(Th(f"Revision {old_rev}"), Th(f"Revision {new_rev}"))),
+                Tbody(*[
+                    Tr(
+                        Td(old_line, cls=f"{DIFF_ROW_CLS[tag][0]} font-mono text-sm whitespace-pre-wrap w-1/2"),
+                        Td(new_line, cls=f"{DIFF_ROW_CLS[tag][1]} font-mono text-sm whitespace-pre-wrap w-1/2")
+                    )
+                    for tag, old_line, new_line in rows
+                ]),
+                cls=(TableT.divider, TableT.sm)
+            ),
+            header=H4(field.replace("_", " ").capitalize())
+        )
+        for field, rows in changes.items()
+    ]
+    return Container(
+        DivFullySpaced(
+            H2(f"Revision {old_rev} → {new_rev}"),
+            A(Button("← History", cls=ButtonT.ghost), href="/campaign/step4/revisions")
+        ),
+        *(cards or [Card(P("No differences between these revisions.", cls=TextPresets.muted_lg))]),
+        cls=STEP4_CONTAINER_CLS
+    )
+
+def ExportUploadStatus(job):
+    """SharePoint button for an export upload, polling itself until the job settles"""
+    if job is None:
+        return Button("View in SharePoint", cls=ButtonT.default, disabled=True, title="SharePoint upload is not configured")
+    if job["status"] == DONE:
+        return A(Button("View in SharePoint", cls=ButtonT.default), href=job["item"]["webUrl"], target="_blank")
+    if job["status"] == FAILED:
+        return Button(
+            "⟳ Retry SharePoint upload",
+            cls=ButtonT.default,
+            title=job["error"],
+            hx_post=f"/campaign/step5/upload/{job['id']}/resume",
+            hx_swap="outerHTML"
+        )
+    percent = int(100 * job["sent_bytes"] / job["size"]) if job["size"] else 0
+    return Div(
+        Button(f"Uploading to SharePoint… {percent}%", cls=ButtonT.default, disabled=True),
+        hx_get=f"/campaign/step5/upload/{job['id']}",
+        hx_trigger="every 1s",
+        hx_swap="outerHTML"
+    )
+
+def export_details(brief, inputs, when):
+    keywords = inputs.get("keywords") or DEFAULT_BRIEF_INPUTS["keywords"]
+    return [
+        ("File Name:", export_filename(brief, inputs["product_group"], when)),
+        ("SharePoint Folder:", export_folder(inputs["product_group"], when)),
+        ("Keywords:", f"{brief['focus_keyword']} + {len(keywords) - 1} secondary"),
+        ("Generated:", f"{when:%B} {when.day}, {when:%Y - %H:%M}")
+    ]
+
+def step5_complete(brief, inputs, job=None, when=None):
+    when = when or datetime.now()
     return Container(
         CampaignSteps(5),
         
@@ -983,20 +1829,15 @@ def step5_complete():
                             P(label, cls="font-medium"),
                             P(value, cls=TextPresets.muted_sm)
                         )
-                        for label, value in [
-                            ("File Name:", "ZakelijkeVerzekeringen_bedrijfsaansprakelijkheid_20241201.docx"),
-                            ("SharePoint Folder:", "/Zakelijke Verzekeringen/Content Briefs/2024"),
-                            ("Keywords:", "bedrijfsaansprakelijkheidsverzekering + 8 secondary"),
-                            ("Generated:", "December 1, 2024 - 14:32")
-                        ]
+                        for label, value in export_details(brief, inputs, when)
                     ],
                     cls="space-y-2 mt-6"
                 ),
                 
                 DivCentered(
                     DivLAligned(
-                        Button("Download Brief", cls=ButtonT.primary),
-                        Button("View in SharePoint", cls=ButtonT.default),
+                        A(Button("Download Brief", cls=ButtonT.primary), href="/campaign/step5/download"),
+                        ExportUploadStatus(job),
                         A(Button("Create Another", cls=ButtonT.ghost), href="/campaign/new")
                     ),
                     cls="mt-6"
@@ -1007,6 +1848,91 @@ def step5_complete():
         )
     )
 
+# ===== DASHBOARD =====
+
+DASHBOARD_CONTAINER_CLS = "space-y-6 max-w-7xl mx-auto"
+
+def dashboard_title():
+    return DivFullySpaced(
+        Div(
+            H1("SEO Performance Dashboard"),
+            P("Track keyword performance and content opportunities", cls=TextPresets.muted_lg)
+        ),
+        A(Button("New Campaign", cls=ButtonT.primary), href="/campaign/new")
+    )
+
+DEFAULT_KEY_INSIGHTS = [
+    ("Top keyword", "bedrijfsaansprakelijkheidsverzekering (2,540 searches/month)"),
+    ("YoY Growth", "↑ 12.4% increase vs 2023"),
+    ("Second highest", "avb (2,200 searches) - abbreviated form"),
+    ("Long-tail opportunity", "Several keywords with 60+ monthly searches"),
+    ("Total monthly volume", "8,180 searches across all tracked keywords"),
+    ("Best performing month", "November 2024 (3,100 searches)")
+]
+
+def key_insights():
+    """(label, text) pairs for the Key Insights card, from the nightly snapshot or volume store"""
+    precomputed = precomputed_store()
+    stats = precomputed.snapshot("insights") if precomputed is not None else None
+    if stats is None and volume_store is not None:
+        stats = volume_store.insights()
+    if stats is None:
+        return DEFAULT_KEY_INSIGHTS
+    insights = []
+    for label, (keyword, volume) in zip(["Top keyword", "Second highest"], stats["top_keywords"]):
+        insights.append((label, f"{keyword} ({volume:,} searches/month)"))
+    if stats["yoy_growth"] is not None:
+        arrow = "↑" if stats["yoy_growth"] >= 0 else "↓"
+        insights.append(("YoY Growth", f"{arrow} {abs(stats['yoy_growth']):.1%} vs the previous 12 months"))
+    insights.append(("Total monthly volume", f"{stats['total_monthly_volume']:,} searches across {stats['keywords']:,} tracked keywords"))
+    month, volume = stats["best_month"]
+    year, number = month.split("-")
+    insights.append(("Best performing month", f"{MONTH_NAMES[int(number) - 1]} {year} ({volume:,} searches)"))
+    return insights
+
+def dashboard_trend_cards():
+    return Grid(
+        Card(
+            CardBody(keyword_yoy_chart()),
+            header=H3("Keyword Trend Analysis")
+        ),
+        Card(
+            H3("Key Insights"),
+            Ul(cls="space-y-3")(*[Li(Strong(f"{label}: "), text) for label, text in key_insights()]),
+            cls="mt-6"
+        ),
+        cols=2, gap=6, cls="w-full"
+    )
+
+def dashboard_kpi_cards():
+    return Grid(
+        Card(
+            H4("2,540"),
+            P("Monthly searches", cls=TextPresets.muted_sm),
+            P("↑ 12.4% vs last year", cls="text-green-600 text-sm font-medium"),
+            header=H5("Focus Keyword Performance")
+        ),
+        Card(
+            H4("8,180"),
+            P("Total volume", cls=TextPresets.muted_sm),
+            P("↑ 8.7% vs last year", cls="text-green-600 text-sm font-medium"),
+            header=H5("Portfolio Volume")
+        ),
+        Card(
+            H4("15"),
+            P("Tracked keywords", cls=TextPresets.muted_sm),
+            P("3 new opportunities", cls="text-blue-600 text-sm font-medium"),
+            header=H5("Keyword Portfolio")
+        ),
+        Card(
+            H4("68%"),
+            P("Search share", cls=TextPresets.muted_sm),
+            P("↑ 5% vs competition", cls="text-green-600 text-sm font-medium"),
+            header=H5("Market Share")
+        ),
+        cols=4, gap=4, cls="w-full mt-6"
+    )
+
 # ===== PROTECTED ROUTES =====
 
 @rt("/")
@@ -1015,70 +1941,17 @@ async def get(request):
     """Dashboard - Landing page (protected)"""
     session_id = get_or_create_session_id(request)
     
-    return (
+    return StreamingPage(
+        request,
         AppHeader(),
-        Container(
-            create_session_banner(session_id),
-            
-            DivFullySpaced(
-                Div(
-                    H1("SEO Performance Dashboard"),
-                    P("Track keyword performance and content opportunities", cls=TextPresets.muted_lg)
-                ),
-                A(Button("New Campaign", cls=ButtonT.primary), href="/campaign/new")
-            ),
-            
-            Grid(
-                Card(
-                    CardBody(keyword_yoy_chart()),
-                    header=H3("Keyword Trend Analysis")
-                ),
-                Card(
-                    H3("Key Insights"),
-                    Ul(cls="space-y-3")(
-                        Li(Strong("Top keyword: "), "bedrijfsaansprakelijkheidsverzekering (2,540 searches/month)"),
-                        Li(Strong("YoY Growth: "), "↑ 12.4% increase vs 2023"),
-                        Li(Strong("Second highest: "), "avb (2,200 searches) - abbreviated form"),
-                        Li(Strong("Long-tail opportunity: "), "Several keywords with 60+ monthly searches"),
-                        Li(Strong("Total monthly volume: "), "8,180 searches across all tracked keywords"),
-                        Li(Strong("Best performing month: "), "November 2024 (3,100 searches)")
-                    ),
-                    cls="mt-6"
-                ),
-                cols=2, gap=6, cls="w-full"
-            ),
-            
-            Grid(
-                Card(
-                    H4("2,540"),
-                    P("Monthly searches", cls=TextPresets.muted_sm),
-                    P("↑ 12.4% vs last year", cls="text-green-600 text-sm font-medium"),
-                    header=H5("Focus Keyword Performance")
-                ),
-                Card(
-                    H4("8,180"),
-                    P("Total volume", cls=TextPresets.muted_sm),
-                    P("↑ 8.7% vs last year", cls="text-green-600 text-sm font-medium"),
-                    header=H5("Portfolio Volume")
-                ),
-                Card(
-                    H4("15"),
-                    P("Tracked keywords", cls=TextPresets.muted_sm),
-                    P("3 new opportunities", cls="text-blue-600 text-sm font-medium"),
-                    header=H5("Keyword Portfolio")
-                ),
-                Card(
-                    H4("68%"),
-                    P("Search share", cls=TextPresets.muted_sm),
-                    P("↑ 5% vs competition", cls="text-green-600 text-sm font-medium"),
-                    header=H5("Market Share")
-                ),
-                cols=4, gap=4, cls="w-full mt-6"
-            ),
-            
-            cls="space-y-6 max-w-7xl mx-auto"
+        container=Container(cls=DASHBOARD_CONTAINER_CLS),
+        sections=(
+            lambda: create_session_banner(session_id),
+            dashboard_title,
+            dashboard_trend_cards,
+            dashboard_kpi_cards
         ),
-        LoadingOverlay()
+        tail=(LoadingOverlay(),)
     )
 
 @rt('/campaign/new')
@@ -1094,22 +1967,300 @@ async def get(request):
 @rt('/campaign/step2')
 @require_auth
 async def get(request, mode: str = "optimize"):
-    return AppHeader(), step2_research_setup(mode)
+    research = request.session.get("research", {})
+    # Keep the saved setup when coming back to the same mode (e.g. after a resume)
+    return AppHeader(), step2_research_setup(mode, research if research.get("mode") == mode else None)
+
+@rt('/campaign/step2')
+@require_auth
+async def post(request):
+    """Store the research setup and continue to the analysis step"""
+    form = await request.form()
+    request.session["research"] = {
+        "mode": form.get("mode", "optimize"),
+        "page_url": form.get("page-url", ""),
+        "keywords": parse_keywords(form.get("keywords", "")),
+        "market": form.get("market", DEFAULT_BRIEF_INPUTS["market"]),
+        "product_group": form.get("product-group", DEFAULT_BRIEF_INPUTS["product_group"]),
+        "research_depth": int(form.get("research-depth") or 2),
+        "sections": [name for name in BRIEF_SECTION_OPTIONS if form.get(name)]
+    }
+    await save_wizard_state(request)
+    return RedirectResponse('/campaign/step3', status_code=303)
+
+@rt('/campaign/step2/market')
+@require_auth
+async def post(request):
+    """Re-render the Market/Locale field from the keywords typed so far"""
+    form = await request.form()
+    keywords = parse_keywords(form.get("keywords", ""))
+    domain = form.get("page-url", "")
+    # Classify once; the split and the preselected option both come from it
+    markets = detect_markets(keywords, domain)
+    return MarketField(
+        dominant_market(keywords, domain, markets) or MARKET_OPTIONS[0],
+        split_by_market(keywords, domain, markets)
+    )
 
 @rt('/campaign/step3')
 @require_auth
 async def get(request):
-    return AppHeader(), step3_analysis()
+    research = request.session.get("research", {})
+    if research and "competitors" not in research:
+        # The competitors shown here are the ones the research pipeline crawls
+        competitors = research_competitors(research.get("keywords", []))
+        research = request.session["research"] = {**research, "competitors": [c["url"] for c in competitors]}
+    return AppHeader(), step3_analysis(research)
+
+async def competitor_gaps(request):
+    """(gap analysis, unreachable URLs) for the session's competitors, updated incrementally.
+
+    The session's aggregate lives in this worker's memory; only competitors
+    added since it was last synced are crawled (or read from the profile
+    store) and summed in, and removed ones are subtracted.
+    """
+    research = request.session.get("research", {})
+    page_url = research.get("page_url", "")
+    key = f"{get_or_create_session_id(request)}:{page_url}"
+    urls = research.get("competitors", [])
+    aggregate = gap_aggregates.get(key)
+    if aggregate is None:
+        ing_profile = (await profile_store.fetch([page_url])).get(page_url) if page_url else None
+        aggregate = GapAggregate(ing_profile)
+        gap_aggregates.put(key, aggregate)
+    profiles = await profile_store.fetch(set(urls) - aggregate.urls)
+    aggregate.sync(urls, profiles)
+    volumes = {kw: volume for kw, volume in keyword_expansion(research.get("keywords", [])) if volume}
+    analysis = aggregate.gaps(volumes)
+    return analysis, [url for url in urls if url in aggregate.failed]
+
+async def edit_competitors(request, urls):
+    """Store the edited competitor list and return the refreshed Step 3 fragments"""
+    research = request.session["research"] = {**request.session.get("research", {}), "competitors": urls}
+    await save_wizard_state(request)
+    analysis, failed = await competitor_gaps(request)
+    return CompetitorList(competitor_pages(research)), GapPreview(analysis, failed, hx_swap_oob="true")
+
+@rt('/campaign/step3/gaps')
+@require_auth
+async def get(request):
+    analysis, failed = await competitor_gaps(request)
+    return GapPreview(analysis, failed)
+
+@rt('/campaign/step3/competitors/add')
+@require_auth
+async def post(request):
+    form = await request.form()
+    url = normalize_url(form.get("url", ""))
+    urls = [c["url"] for c in competitor_pages(request.session.get("research", {}))]
+    return await edit_competitors(request, urls + [url] if url and url not in urls else urls)
+
+@rt('/campaign/step3/competitors/remove')
+@require_auth
+async def post(request):
+    form = await request.form()
+    urls = [c["url"] for c in competitor_pages(request.session.get("research", {}))]
+    return await edit_competitors(request, [u for u in urls if u != form.get("url")])
+
+@rt('/campaign/plan')
+@require_auth
+async def get(request):
+    return AppHeader(), campaign_plan_page()
+
+@rt('/campaign/plan')
+@require_auth
+async def post(request):
+    """Cluster an uploaded keyword list by SERP overlap into proposed briefs"""
+    form = await request.form()
+    upload = form.get("keyword-file")
+    text = form.get("keyword-text", "")
+    if upload is not None and not isinstance(upload, str):
+        text = (await upload.read()).decode("utf-8-sig", errors="replace") + "\n" + text
+    min_shared = int(form.get("min-shared") or MIN_SHARED)
+    keywords = parse_keyword_list(text)
+    if not keywords:
+        return AppHeader(), campaign_plan_page(min_shared=min_shared, error="Upload or paste at least one keyword.")
+    if serp_index is None:
+        return AppHeader(), campaign_plan_page(min_shared=min_shared, error="No SERP data available yet (SERP_FILE).")
+    keywords = await run_in_threadpool(fill_volumes, keywords)
+    plan = await run_in_threadpool(campaign_plan, keywords, serp_index, min_shared)
+    print(f"🗺️ Planned {plan['keywords']} keywords into {len(plan['briefs'])} briefs in {plan['seconds']:.2f}s")
+    return AppHeader(), campaign_plan_page(plan, min_shared)
+
+@rt('/campaign/plan/use')
+@require_auth
+async def post(request):
+    """Start a new-page brief for one plan cluster, focus keyword first"""
+    form = await request.form()
+    request.session["research"] = {
+        "mode": "create",
+        "page_url": "",
+        "keywords": form.getlist("keywords")[:MAX_BRIEF_KEYWORDS],
+        "market": DEFAULT_BRIEF_INPUTS["market"],
+        "product_group": DEFAULT_BRIEF_INPUTS["product_group"],
+        "research_depth": DEFAULT_BRIEF_INPUTS["research_depth"],
+        "sections": DEFAULT_BRIEF_INPUTS["sections"]
+    }
+    await save_wizard_state(request)
+    return RedirectResponse('/campaign/step2?mode=create', status_code=303)
+
+@rt('/campaign/generate')
+@require_auth
+async def post(request):
+    """Generate (or fetch from cache) the brief for the current inputs"""
+    form = await request.form()
+    research = request.session.get("research", {})
+    inputs = {
+        **DEFAULT_BRIEF_INPUTS,
+        **{k: v for k, v in research.items() if k in DEFAULT_BRIEF_INPUTS},
+        "funnel_stage": form.get("funnel-stage", DEFAULT_BRIEF_INPUTS["funnel_stage"]),
+        "page_type": form.get("page-type", DEFAULT_BRIEF_INPUTS["page_type"])
+    }
+    await research_brief(request, inputs)
+    return RedirectResponse('/campaign/step4', status_code=303)
 
 @rt('/campaign/step4')
 @require_auth 
 async def get(request):
-    return AppHeader(), step4_brief_edit()
+    brief, cache_hit = await current_brief(request)
+    return StreamingPage(
+        request,
+        AppHeader(),
+        container=Container(cls=STEP4_CONTAINER_CLS),
+        sections=step4_sections(brief, cache_hit, request.session.get("brief_inputs", {}).get("keywords", []))
+    )
+
+@rt('/campaign/step4/section/{slug}')
+@require_auth
+async def get(request, slug: str):
+    """Body of a single Step 4 accordion section (HTMX fragment)"""
+    if slug not in BRIEF_SECTIONS:
+        return Response("Unknown section", status_code=404)
+    _, section = BRIEF_SECTIONS[slug]
+    brief, _ = await current_brief(request)
+    return section(brief)
+
+# Step 4 fields Save Draft may change
+EDITABLE_BRIEF_FIELDS = (
+    "url", "page_type", "funnel_stage", "audience", "page_title", "meta_description", "h1",
+    "h2_headers", "content_guidelines", "content_gaps", "differentiation", "faq", "internal_links"
+)
+
+@rt('/campaign/step4/save')
+@require_auth
+async def post(request):
+    """Save the edited Step 4 fields as a new revision (HTMX fragment)"""
+    form = await request.form()
+    brief, _ = await current_brief(request)
+    key = brief_revision_key(request)
+    edits = {f: form[f].replace("\r\n", "\n") for f in EDITABLE_BRIEF_FIELDS if f in form}
+    if not await run_in_threadpool(revision_store.history, key):
+        # The generated brief is revision 1, so the first edit diffs against it
+        await run_in_threadpool(revision_store.save, key, brief)
+    rev = await run_in_threadpool(revision_store.save, key, {**brief, **edits})
+    await save_wizard_state(request)
+    return SaveStatus(rev)
+
+@rt('/campaign/step4/score')
+@require_auth
+async def post(request):
+    """Re-score the brief after an edit; only fields whose text changed are re-counted"""
+    form = await request.form()
+    fields = {field: form[field] for field in DENSITY_FIELDS if field in form}
+    keywords = request.session.get("brief_inputs", {}).get("keywords", [])
+
+    brief, _ = await current_brief(request)
+
+    def build():
+        scorer = BriefScorer(brief["focus_keyword"], keywords[1:])
+        scorer.sync({field: brief.get(field, "") for field in DENSITY_FIELDS})
+        return scorer
+
+    # In the threadpool: building a scorer counts every field of the brief
+    report, changed, elapsed = await run_in_threadpool(seo_scorers.score, brief_revision_key(request), fields, build)
+    fragments = [SeoScorePanel(report, elapsed)]
+    if "page_title" in changed:
+        fragments.append(LengthScore("page-title-score", report["title"], hx_swap_oob="true"))
+    if "meta_description" in changed:
+        fragments.append(LengthScore("meta-description-score", report["meta"], hx_swap_oob="true"))
+    if changed and "page_title" in form:
+        # The SEO section is loaded, so its mention counter is on the page
+        fragments.append(FocusMentions(report["focus"], hx_swap_oob="true"))
+    return tuple(fragments)
+
+@rt('/campaign/step4/revisions')
+@require_auth
+async def get(request):
+    await current_brief(request)
+    history = await run_in_threadpool(revision_store.history, brief_revision_key(request))
+    return AppHeader(), revision_history_page(history)
+
+@rt('/campaign/step4/revisions/diff')
+@require_auth
+async def get(request, old: int, new: int):
+    await current_brief(request)
+    changes = await run_in_threadpool(revision_store.diff, brief_revision_key(request), old, new)
+    return AppHeader(), revision_diff_page(old, new, changes)
 
 @rt('/campaign/step5')
 @require_auth
 async def get(request):
-    return AppHeader(), step5_complete()
+    """Export the brief and upload it to SharePoint in the background (once per brief)"""
+    brief, _ = await current_brief(request)
+    inputs = request.session.get("brief_inputs", DEFAULT_BRIEF_INPUTS)
+    job = None
+    if sharepoint_uploader is not None:
+        export = request.session.get("export_job", {})
+        if export.get("brief_key") == request.session["brief_key"]:
+            job = sharepoint_uploader.status(export["job_id"])
+        if job is None:
+            data = await run_in_threadpool(brief_docx, brief)
+            job_id = sharepoint_uploader.submit(
+                export_filename(brief, inputs["product_group"]), export_folder(inputs["product_group"]), data
+            )
+            request.session["export_job"] = {"brief_key": request.session["brief_key"], "job_id": job_id}
+            job = sharepoint_uploader.status(job_id)
+    return AppHeader(), step5_complete(brief, inputs, job)
+
+@rt('/campaign/step5/download')
+@require_auth
+async def get(request):
+    brief, _ = await current_brief(request)
+    inputs = request.session.get("brief_inputs", DEFAULT_BRIEF_INPUTS)
+    return Response(
+        await run_in_threadpool(brief_docx, brief),
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(brief, inputs["product_group"])}"'}
+    )
+
+@rt('/campaign/step5/upload/{job_id}')
+@require_auth
+async def get(request, job_id: str):
+    """Current state of an export upload (HTMX fragment)"""
+    job = sharepoint_uploader.status(job_id) if sharepoint_uploader else None
+    if job is None:
+        return Response("Unknown upload", status_code=404)
+    return ExportUploadStatus(job)
+
+@rt('/campaign/step5/upload/{job_id}/resume')
+@require_auth
+async def post(request, job_id: str):
+    """Resume a failed upload; only the byte ranges SharePoint still lacks are sent"""
+    job = sharepoint_uploader.resume(job_id) if sharepoint_uploader else None
+    if job is None:
+        return Response("Unknown upload", status_code=404)
+    return ExportUploadStatus(sharepoint_uploader.status(job_id))
+
+@rt('/session/resume')
+@require_auth
+async def get(request, id: str = ""):
+    """Resume a saved session from its (short) ID in one indexed lookup"""
+    matches = await run_in_threadpool(session_index.lookup, id)
+    if len(matches) == 1:
+        match = matches[0]
+        print(f"🔁 Resumed session {get_short_session_id(match['session_id'])}")
+        return RedirectResponse(restore_wizard_state(request, match["session_id"], match["state"]), status_code=303)
+    return AppHeader(), session_resume_page(id.strip(), matches)
 
 @rt('/campaigns')
 @require_auth
@@ -1137,6 +2288,49 @@ async def get(request):
         )
     )
 
+# ===== JSON API (v1) =====
+# NDJSON list endpoints stream straight from SQLite cursors (see app/api_export.py);
+# page through them with `after=<last key>` and `limit`.
+
+@rt('/api/v1')
+@require_api_auth
+async def get(request):
+    return JSONResponse({
+        "version": 1,
+        "endpoints": {
+            "/api/v1/campaigns": "NDJSON, one saved campaign per line (after=<id>, limit)",
+            "/api/v1/briefs": "NDJSON, one campaign's brief with its saved edits per line (after=<campaign>, limit)",
+            "/api/v1/briefs/{key}": "JSON, a single brief as generated, or with a campaign's edits (campaign=<id>)",
+            "/api/v1/keywords": "NDJSON, nightly keyword metrics (after=<keyword>, limit, product_group)"
+        }
+    })
+
+@rt('/api/v1/campaigns')
+@require_api_auth
+async def get(request, after: str = "", limit: int = 0):
+    return StreamingResponse(campaigns_stream(session_index.path, after, limit), media_type=NDJSON)
+
+@rt('/api/v1/briefs')
+@require_api_auth
+async def get(request, after: str = "", limit: int = 0):
+    return StreamingResponse(briefs_stream(session_index.path, revision_store, brief_cache, after, limit), media_type=NDJSON)
+
+@rt('/api/v1/briefs/{key}')
+@require_api_auth
+async def get(request, key: str, campaign: str = ""):
+    record = await run_in_threadpool(brief_record, key, revision_store, brief_cache, campaign or None)
+    if record is None:
+        return JSONResponse({"error": "brief not found"}, status_code=404)
+    return JSONResponse(record)
+
+@rt('/api/v1/keywords')
+@require_api_auth
+async def get(request, after: str = "", limit: int = 0, product_group: str = ""):
+    precomputed = precomputed_store()
+    if precomputed is None:
+        return JSONResponse({"error": "no keyword snapshot yet (run python -m app.nightly)"}, status_code=503)
+    return StreamingResponse(keywords_stream(precomputed.path, after, limit, product_group), media_type=NDJSON)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
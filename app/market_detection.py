@@ -0,0 +1,200 @@
+"""Local language/market detection for keyword lists.
+
+Keywords are hashed into character 1-4-gram count vectors in one NumPy
+pass over the whole list and scored against precomputed per-language
+log-probability profiles (multinomial naive Bayes). The profiles are
+trained on the plain-text corpora in `CORPUS_DIR` (one `<language>.txt` per
+language, a few thousand words of general and financial prose each) plus
+the in-domain seed vocabulary below; larger corpora can be dropped in
+without code changes. The language comes from the keyword text alone; the
+domain TLD only decides whether Dutch keywords without lexical markers go
+to the Netherlands or to Belgium. No external service is involved.
+"""
+import os
+import re
+from urllib.parse import urlparse
+
+import numpy as np
+from scipy import sparse
+
+BUCKET_BITS = 14
+BUCKETS = 1 << BUCKET_BITS
+NGRAM_SIZES = (1, 2, 3, 4)
+MAX_BYTES = 96
+
+MARKETS = {
+    "nl-NL": "Netherlands (NL)",
+    "nl-BE": "Belgium (BE)",
+    "fr-BE": "Belgium (BE)",
+    "de-DE": "Germany (DE)",
+}
+
+# General-language training text per language (<language>.txt)
+CORPUS_DIR = os.getenv("LANGUAGE_CORPUS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "language-corpora"))
+
+# Seed vocabulary per language, in the terms our keywords come from
+SEED_CORPORA = {
+    "nl": """
+        bedrijfsaansprakelijkheidsverzekering aansprakelijkheidsverzekering voor bedrijven
+        zakelijke rekening openen zakelijke lening aanvragen hypotheek afsluiten sparen beleggen
+        verzekering vergelijken premie berekenen eigen risico dekking schade melden
+        ondernemer zelfstandige werkgever werknemers personeel bedrijf starten inschrijven
+        rechtsbijstandverzekering inventarisverzekering bedrijfsauto verzekeren cyberverzekering
+        arbeidsongeschiktheidsverzekering pensioen opbouwen betalen pinnen creditcard aanvragen
+        wat kost een verzekering hoe werkt het waarom heb je nodig welke kies je voor jouw
+        goedkoopste beste online direct geregeld voorwaarden opzeggen overstappen kosten
+        financiering krediet lenen rente tarieven kantoor winkel bouw horeca transport
+        avb bav wa btw kvk kmo zzp mkb bv nv vof
+        """,
+    "fr": """
+        assurance responsabilité civile entreprise assurance professionnelle comparer prix
+        compte professionnel ouvrir prêt entreprise demander crédit hypothécaire épargne placer
+        prime calculer franchise couverture sinistre déclarer indépendant employeur salariés
+        personnel société créer entreprise assurance protection juridique assurance véhicule
+        assurance cyber incapacité de travail pension complémentaire payer carte de crédit
+        combien coûte une assurance comment ça marche pourquoi quelle choisir pour votre
+        moins cher meilleur en ligne conditions résilier changer frais financement taux
+        bureau magasin construction restaurant transport indépendants pme tva numéro
+        """,
+    "de": """
+        betriebshaftpflichtversicherung haftpflichtversicherung für unternehmen vergleichen
+        geschäftskonto eröffnen firmenkredit beantragen baufinanzierung sparen anlegen
+        versicherung beitrag berechnen selbstbeteiligung deckung schaden melden
+        selbstständige arbeitgeber mitarbeiter personal firma gründen gewerbe anmelden
+        rechtsschutzversicherung inventarversicherung firmenwagen versichern cyberversicherung
+        berufsunfähigkeitsversicherung altersvorsorge bezahlen kreditkarte beantragen
+        was kostet eine versicherung wie funktioniert warum brauche ich welche wählen für ihr
+        günstigste beste online sofort bedingungen kündigen wechseln kosten finanzierung
+        zinsen büro laden handwerk gastronomie spedition kleinunternehmen steuernummer
+        """,
+}
+
+# Share of each language in the keyword lists we research; ambiguous short
+# keywords ("rente" is a word in all three) lean Dutch
+LANGUAGE_PRIORS = {"nl": 0.6, "fr": 0.2, "de": 0.2}
+
+# Dutch vocabulary that only Belgium (or only the Netherlands) uses
+BELGIAN_MARKERS = frozenset({
+    "kmo", "kmo's", "bvba", "bv-be", "vennootschap", "zelfstandige", "zelfstandigen",
+    "ondernemingsnummer", "btw-nummer", "rijksregisternummer", "gsm", "kbo", "riziv",
+    "hospitalisatieverzekering", "brandverzekering", "familiale",
+})
+DUTCH_MARKERS = frozenset({
+    "zzp", "zzp'er", "zzp'ers", "kvk", "mkb", "btw-id", "bsn", "belastingdienst", "uwv",
+})
+
+TLD_MARKETS = {"nl": "nl-NL", "be": "nl-BE", "de": "de-DE"}
+
+# ===== VECTORIZER =====
+
+def _byte_matrix(texts):
+    """Lowercased UTF-8 bytes of each text, space-padded and zero-filled, one row per text"""
+    matrix = np.zeros((len(texts), MAX_BYTES + 2), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        encoded = (" " + " ".join(text.lower().split())[:MAX_BYTES] + " ").encode("utf-8")[:MAX_BYTES + 2]
+        matrix[row, :len(encoded)] = np.frombuffer(encoded, dtype=np.uint8)
+    return matrix
+
+def ngram_counts(texts):
+    """Hashed character n-gram counts for all texts as a sparse (n, BUCKETS) matrix"""
+    matrix = _byte_matrix(texts)
+    n_rows, width = matrix.shape
+    rows, cols = [], []
+    for size in NGRAM_SIZES:
+        # Seeding with the n-gram size keeps "a" and "\0a"-style grams apart
+        hashed = np.full((n_rows, width - size + 1), size, dtype=np.uint64)
+        valid = np.ones_like(hashed, dtype=bool)
+        for offset in range(size):
+            window = matrix[:, offset:offset + width - size + 1]
+            hashed = hashed * np.uint64(257) + window
+            valid &= window != 0
+        # Fibonacci hashing: the top bits of h * 2**64/phi spread well over the buckets
+        hashed = (hashed * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(64 - BUCKET_BITS)
+        row_ids, positions = np.nonzero(valid)
+        rows.append(row_ids)
+        cols.append(hashed[row_ids, positions].astype(np.int64))
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    return sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n_rows, BUCKETS))
+
+def _training_text(language):
+    """Corpus and seed words for `language`, in keyword-sized runs that fit the MAX_BYTES window"""
+    with open(os.path.join(CORPUS_DIR, f"{language}.txt"), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    chunks = []
+    for line in lines + [SEED_CORPORA[language]]:
+        chunk = []
+        # Keywords carry no punctuation, so the profiles should not either
+        for word in re.findall(r"[\w'-]+", line):
+            if chunk and len(" ".join(chunk + [word]).encode("utf-8")) > MAX_BYTES:
+                chunks.append(" ".join(chunk))
+                chunk = []
+            chunk.append(word)
+        if chunk:
+            chunks.append(" ".join(chunk))
+    return chunks
+
+def _build_profiles():
+    languages = list(SEED_CORPORA)
+    counts = np.vstack([np.asarray(ngram_counts(_training_text(lang)).sum(axis=0)) for lang in languages])
+    # Laplace-smoothed log-probabilities per bucket: rows are languages
+    log_probs = np.log((counts + 1.0) / (counts.sum(axis=1, keepdims=True) + BUCKETS))
+    priors = np.log([LANGUAGE_PRIORS[lang] for lang in languages])
+    return languages, log_probs.T.astype(np.float32), priors.astype(np.float32)
+
+LANGUAGES, LANGUAGE_PROFILES, LANGUAGE_LOG_PRIORS = _build_profiles()
+
+# ===== DETECTION =====
+
+def domain_market(domain):
+    """Market code suggested by a URL or domain TLD, or None"""
+    if not domain:
+        return None
+    host = urlparse(domain if "//" in domain else f"//{domain}").hostname or ""
+    return TLD_MARKETS.get(host.rsplit(".", 1)[-1])
+
+def detect_markets(keywords, domain=None):
+    """Market code ("nl-NL", "nl-BE", "fr-BE", "de-DE") for every keyword"""
+    if not keywords:
+        return []
+    scores = ngram_counts(keywords) @ LANGUAGE_PROFILES + LANGUAGE_LOG_PRIORS
+    languages = np.asarray(LANGUAGES)[np.argmax(scores, axis=1)]
+    # The TLD says which country a Dutch keyword targets, never which language it is in
+    hint = domain_market(domain)
+
+    markets = []
+    for keyword, language in zip(keywords, languages):
+        if language == "de":
+            markets.append("de-DE")
+        elif language == "fr":
+            markets.append("fr-BE")
+        else:
+            words = set(re.findall(r"[\w'-]+", keyword.lower()))
+            if words & BELGIAN_MARKERS:
+                markets.append("nl-BE")
+            elif words & DUTCH_MARKERS:
+                markets.append("nl-NL")
+            else:
+                markets.append("nl-BE" if hint == "nl-BE" else "nl-NL")
+    return markets
+
+def split_by_market(keywords, domain=None, markets=None):
+    """Group keywords by detected market code, keeping their order.
+
+    `markets` are the `detect_markets` codes for `keywords` when the caller
+    already has them.
+    """
+    if markets is None:
+        markets = detect_markets(keywords, domain)
+    groups = {}
+    for keyword, market in zip(keywords, markets):
+        groups.setdefault(market, []).append(keyword)
+    return groups
+
+def dominant_market(keywords, domain=None, markets=None):
+    """The Market/Locale option most keywords belong to, or None if unknown"""
+    if markets is None:
+        markets = detect_markets(keywords, domain)
+    if not markets:
+        return MARKETS.get(domain_market(domain))
+    options = [MARKETS[m] for m in markets]
+    return max(set(options), key=options.count)
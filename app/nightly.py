@@ -0,0 +1,244 @@
+"""Nightly precomputation of dashboard and research snapshots.
+
+Recomputes keyword rollups, YoY deltas, top competitors per keyword and
+keyword clusters (by SERP overlap, as in campaign planning) into the SQLite file the web process reads through
+app.precomputed. Runs are incremental: each keyword's volume series and
+product group and its SERP results are fingerprinted, and only keywords
+whose fingerprint changed are recomputed. All writes of a run land in one transaction, so
+the web process sees either the previous snapshot or the new one.
+Cached briefs built on keywords whose volumes changed are invalidated
+afterwards, in every web worker (see app.shared_state).
+
+    python -m app.nightly                  # incremental run
+    python -m app.nightly --full           # recompute everything
+
+Inputs default to the same locations the web process uses
+(VOLUME_STORE_DIR, SERP_FILE, PRECOMPUTED_DB, BRIEF_CACHE_DIR, INVALIDATION_DB).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.brief_cache import BriefCache
+from app.precomputed import SCHEMA
+from app.serp_clusters import SerpIndex, cluster_keywords, normalize_keyword
+from app.shared_state import InvalidationBus
+from app.volume_store import BLOCK_ROWS, VolumeStore
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Competitor pages kept per keyword, and domains that are ours
+TOP_COMPETITORS = 5
+OWN_DOMAINS = ("ing.nl", "ing.be", "ing.de")
+
+# Largest clusters (by summed volume) kept in the "clusters" snapshot
+MAX_CLUSTERS = 200
+
+def open_snapshot_db(path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path)
+    # WAL lets the web process keep reading the old snapshot while a run writes
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+# ===== VOLUMES =====
+
+def volume_fingerprints(store):
+    """One 64-bit fingerprint per keyword row (volume series and product group), computed blockwise over the mmap"""
+    # Fixed seed: fingerprints must be comparable between runs
+    weights = np.random.default_rng(0).integers(1, 2**63, size=store.volumes.shape[1], dtype=np.uint64) | np.uint64(1)
+    seed = np.uint64(store.first_month)
+    # Hashed by name, since group ids are only positions in this store's group list
+    group_hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(group.encode("utf-8"), digest_size=8).digest(), "little") for group in store.product_groups],
+        dtype=np.uint64
+    )
+    fingerprints = np.empty(len(store.keywords), dtype=np.uint64)
+    for start in range(0, len(store.keywords), BLOCK_ROWS):
+        block = store.volumes[start:start + BLOCK_ROWS].astype(np.uint64)
+        groups = group_hashes[np.asarray(store.groups[start:start + BLOCK_ROWS], dtype=np.int64)]
+        fingerprints[start:start + BLOCK_ROWS] = (block * weights).sum(axis=1) + seed + groups
+    return [f"{f:016x}" for f in fingerprints]
+
+def keyword_rows(store, ids):
+    """(volume, yoy) per keyword id: latest month and last 12 vs previous 12 months"""
+    ids = np.asarray(ids, dtype=np.int64)
+    months = store.volumes.shape[1]
+    latest = store.volumes[ids, months - 1].astype(np.int64)
+    if months < 24:
+        return [(int(v), None) for v in latest]
+    current = store.volumes[ids, months - 12:].astype(np.int64).sum(axis=1)
+    previous = store.volumes[ids, months - 24:months - 12].astype(np.int64).sum(axis=1)
+    yoy = np.where(previous > 0, (current - previous) / np.maximum(previous, 1), np.nan)
+    return [(int(v), None if np.isnan(g) else float(g)) for v, g in zip(latest, yoy)]
+
+def refresh_keywords(db, store, full=False):
+    """Upsert changed keyword rows.
+
+    Returns (rows written, keywords whose volumes changed, removed keywords);
+    with `full` every row is rewritten, changed or not.
+    """
+    known = dict(db.execute("SELECT keyword, fingerprint FROM keyword_stats"))
+    fingerprints = volume_fingerprints(store)
+    changed = [
+        i for i, (keyword, fingerprint) in enumerate(zip(store.keywords, fingerprints))
+        if full or known.get(keyword) != fingerprint
+    ]
+    removed = set(known) - set(store.keywords)
+
+    for start in range(0, len(changed), BLOCK_ROWS):
+        ids = changed[start:start + BLOCK_ROWS]
+        db.executemany(
+            "INSERT INTO keyword_stats (keyword, fingerprint, product_group, volume, yoy, cluster) "
+            "VALUES (?, ?, ?, ?, ?, NULL) ON CONFLICT (keyword) DO UPDATE SET "
+            "fingerprint = excluded.fingerprint, product_group = excluded.product_group, "
+            "volume = excluded.volume, yoy = excluded.yoy",
+            [
+                (store.keywords[i], fingerprints[i], store.product_groups[store.groups[i]], volume, yoy)
+                for i, (volume, yoy) in zip(ids, keyword_rows(store, ids))
+            ]
+        )
+    db.executemany("DELETE FROM keyword_stats WHERE keyword = ?", [(k,) for k in removed])
+    stale = [store.keywords[i] for i in changed if known.get(store.keywords[i]) != fingerprints[i]]
+    return len(changed), stale, removed
+
+def refresh_clusters(db, serp_index):
+    """Re-cluster all keywords by SERP overlap and store each keyword's cluster plus the top clusters.
+
+    Keywords without SERP data (or all of them, without a `serp_index`) stay
+    clusters of their own.
+    """
+    volumes = dict(db.execute("SELECT keyword, volume FROM keyword_stats"))
+    # The SERP index is keyed by normalized keyword; the stats table by the stored one
+    stored = {}
+    for keyword in volumes:
+        stored.setdefault(normalize_keyword(keyword), []).append(keyword)
+    normalized = [(keyword, sum(volumes[k] or 0 for k in originals)) for keyword, originals in stored.items()]
+    if serp_index is not None:
+        found, missing = cluster_keywords(normalized, serp_index)
+    else:
+        found, missing = [], normalized
+    clusters = [
+        [k for keyword, _ in cluster["keywords"] for k in stored[keyword]]
+        for cluster in found
+    ] + [stored[keyword] for keyword, _ in missing]
+
+    db.executemany(
+        "UPDATE keyword_stats SET cluster = ? WHERE keyword = ?",
+        [(cluster_id, keyword) for cluster_id, cluster in enumerate(clusters) for keyword in cluster]
+    )
+    summary = sorted(
+        (
+            {
+                # Members are listed head (highest volume) first
+                "id": cluster_id,
+                "keyword": cluster[0],
+                "keywords": cluster,
+                "volume": sum(volumes.get(k) or 0 for k in cluster)
+            }
+            for cluster_id, cluster in enumerate(clusters)
+        ),
+        key=lambda c: -c["volume"]
+    )
+    write_snapshot(db, "clusters", summary[:MAX_CLUSTERS])
+    return len(clusters)
+
+# ===== SERPS =====
+
+def read_serps(path):
+    """Yield (keyword, results) from a SERP export: one {"keyword", "results": [{"url", "title"}]} per line"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                serp = json.loads(line)
+                yield serp["keyword"], serp["results"]
+
+def top_competitors(results, n=TOP_COMPETITORS):
+    """First n results in rank order that are not our own pages"""
+    competitors = []
+    for result in results:
+        url = result["url"].split("://", 1)[-1].removeprefix("www.")
+        if not url.split("/", 1)[0].endswith(OWN_DOMAINS):
+            competitors.append({"title": result.get("title") or url.split("/", 1)[0], "url": url})
+        if len(competitors) == n:
+            break
+    return competitors
+
+def refresh_competitors(db, serps, full=False):
+    """Upsert top competitors for keywords whose SERP changed; returns the count"""
+    known = dict(db.execute("SELECT keyword, fingerprint FROM keyword_competitors"))
+    rows = []
+    for keyword, results in serps:
+        fingerprint = hashlib.sha1(json.dumps(results, sort_keys=True).encode("utf-8")).hexdigest()
+        if full or known.get(keyword) != fingerprint:
+            rows.append((keyword, fingerprint, json.dumps(top_competitors(results), ensure_ascii=False)))
+    db.executemany(
+        "INSERT INTO keyword_competitors (keyword, fingerprint, competitors) VALUES (?, ?, ?) "
+        "ON CONFLICT (keyword) DO UPDATE SET fingerprint = excluded.fingerprint, competitors = excluded.competitors",
+        rows
+    )
+    return len(rows)
+
+# ===== RUN =====
+
+def write_snapshot(db, name, payload):
+    db.execute(
+        "INSERT INTO snapshots (name, updated, payload) VALUES (?, ?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET updated = excluded.updated, payload = excluded.payload",
+        (name, time.time(), json.dumps(payload, ensure_ascii=False))
+    )
+
+def run_nightly(db_path, volume_dir=None, serp_file=None, full=False, brief_cache=None):
+    """One precomputation run; returns a summary dict"""
+    started = time.monotonic()
+    stale = set()
+    summary = {"keywords_changed": 0, "keywords_removed": 0, "clusters": None, "serps_changed": 0}
+    db = open_snapshot_db(db_path)
+    try:
+        with db:  # one transaction: readers never see a half-written run
+            store = VolumeStore.load_if_exists(volume_dir) if volume_dir else None
+            if store is not None:
+                changed, stale_keywords, removed = refresh_keywords(db, store, full)
+                summary["keywords_changed"], summary["keywords_removed"] = changed, len(removed)
+                stale.update(stale_keywords, removed)
+                if changed or removed:
+                    write_snapshot(db, "insights", store.insights())
+                    write_snapshot(db, "group_totals", store.group_totals())
+            if serp_file and Path(serp_file).exists():
+                summary["serps_changed"] = refresh_competitors(db, read_serps(serp_file), full)
+            # Clusters depend on the SERPs and, through the head keywords, on volumes
+            if store is not None and (stale or summary["serps_changed"] or full):
+                summary["clusters"] = refresh_clusters(db, SerpIndex.load_if_exists(serp_file) if serp_file else None)
+            summary["seconds"] = round(time.monotonic() - started, 2)
+            write_snapshot(db, "last_run", {**summary, "finished": time.time()})
+    finally:
+        db.close()
+    # Only once the new numbers are committed, so a regenerated brief cannot read the old ones
+    if brief_cache is not None and stale:
+        brief_cache.invalidate_keywords(stale)
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute dashboard and research snapshots")
+    parser.add_argument("--db", default=os.getenv("PRECOMPUTED_DB", os.path.join(APP_DIR, "data", "precomputed.sqlite3")))
+    parser.add_argument("--volume-store", default=os.getenv("VOLUME_STORE_DIR", os.path.join(APP_DIR, "data", "volume-store")))
+    parser.add_argument("--serps", default=os.getenv("SERP_FILE", os.path.join(APP_DIR, "data", "serps.jsonl")))
+    parser.add_argument("--brief-cache", default=os.getenv("BRIEF_CACHE_DIR", "/tmp/brief-cache"))
+    parser.add_argument("--invalidation-db", default=os.getenv("INVALIDATION_DB", "/tmp/invalidations.sqlite3"))
+    parser.add_argument("--full", action="store_true", help="recompute every keyword, not just changed ones")
+    args = parser.parse_args()
+
+    cache = BriefCache(args.brief_cache, bus=InvalidationBus(args.invalidation_db))
+    result = run_nightly(args.db, args.volume_store, args.serps, args.full, cache)
+    print(
+        f"✅ Nightly run in {result['seconds']}s: {result['keywords_changed']} keywords updated, "
+        f"{result['keywords_removed']} removed, {result['serps_changed']} SERPs refreshed"
+        + (f", {result['clusters']} clusters" if result["clusters"] is not None else "")
+    )
@@ -0,0 +1,74 @@
+"""Read side of the nightly precomputed snapshots (see app/nightly.py).
+
+The web process only opens the SQLite file read-only and does primary-key
+lookups; every expensive rollup is computed offline by the nightly job.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    name TEXT PRIMARY KEY,
+    updated REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS keyword_stats (
+    keyword TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    product_group TEXT NOT NULL,
+    volume INTEGER NOT NULL,
+    yoy REAL,
+    cluster INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS keyword_competitors (
+    keyword TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    competitors TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+class PrecomputedStore:
+    """Read-only lookups into the nightly snapshot database"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    @classmethod
+    def load_if_exists(cls, path):
+        """Open the snapshot database, or return None before the first nightly run"""
+        if not Path(path).exists():
+            return None
+        return cls(path)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def snapshot(self, name):
+        """A named rollup (e.g. "insights", "group_totals", "clusters"), or None"""
+        rows = self._query("SELECT payload FROM snapshots WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def keyword_stats(self, keywords):
+        """{keyword: {"volume", "yoy", "product_group", "cluster"}} for the known keywords"""
+        keywords = list(keywords)
+        if not keywords:
+            return {}
+        rows = self._query(
+            f"SELECT keyword, volume, yoy, product_group, cluster FROM keyword_stats "
+            f"WHERE keyword IN ({','.join('?' * len(keywords))})",
+            keywords
+        )
+        return {
+            keyword: {"volume": volume, "yoy": yoy, "product_group": group, "cluster": cluster}
+            for keyword, volume, yoy, group, cluster in rows
+        }
+
+    def competitors(self, keyword):
+        """Top competitor pages ranking for `keyword` as [{"title", "url"}], or None"""
+        rows = self._query("SELECT competitors FROM keyword_competitors WHERE keyword = ?", (keyword,))
+        return json.loads(rows[0][0]) if rows else None
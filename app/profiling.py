@@ -0,0 +1,186 @@
+"""On-demand profiling of a single request.
+
+An authenticated request carrying `?_profile=tree` (or an `X-Profile: tree`
+header) runs under cProfile and gets back a call-tree report instead of the
+page: FT construction, `to_xml` serialization, event-loop I/O waits
+(`select`/`epoll`) and work handed to the threadpool through
+`run_in_threadpool` below are all included. `_profile=pstats` returns the
+raw profile instead, for snakeviz/flameprof flame graphs.
+
+Requests without the flag go straight through: the middleware only looks
+for the flag and no profiler is installed.
+"""
+import contextvars
+import cProfile
+import io
+import marshal
+import pstats
+import time
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+PROFILE_MODES = ("tree", "pstats")
+
+# Edges below this share of the total are left out of the call tree
+MIN_SHARE = 0.01
+MAX_DEPTH = 40
+
+_active = contextvars.ContextVar("profile_session", default=None)
+
+class ProfileSession:
+    """Profiles of one request: the event-loop thread plus each threadpool call"""
+
+    def __init__(self):
+        self.main = cProfile.Profile()
+        self.threads = []
+
+    def stats(self):
+        stats = pstats.Stats(self.main, stream=io.StringIO())
+        for profile in self.threads:
+            stats.add(profile)
+        return stats
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """starlette's run_in_threadpool, profiling `func` when the request is being profiled"""
+    session = _active.get()
+    if session is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    def profiled():
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            session.threads.append(profile)
+
+    return await _run_in_threadpool(profiled)
+
+# ===== REPORTS =====
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    parts = filename.replace("\\", "/").rsplit("/", 2)
+    return f"{name}  ({'/'.join(parts[-2:])}:{line})"
+
+def call_tree(stats, min_share=MIN_SHARE, max_depth=MAX_DEPTH):
+    """Indented call tree (cumulative ms per call edge) from pstats caller data.
+
+    cProfile only records caller->callee totals, not full stacks, so in
+    recursive code (e.g. `_to_xml`) a child can show more time than the
+    path leading to it.
+    """
+    callees, roots = {}, []
+    for func, (_, _, _, cumulative, callers) in stats.stats.items():
+        if not callers:
+            roots.append((func, cumulative))
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    total = sum(cumulative for _, cumulative in roots) or 1e-9
+
+    lines = []
+
+    def walk(func, cumulative, depth, path):
+        if cumulative < total * min_share or depth > max_depth:
+            return
+        lines.append(f"{cumulative * 1000:9.1f} ms {cumulative / total:6.1%}  {'  ' * depth}{_label(func)}")
+        if func in path:
+            return
+        for callee, edge_cumulative in sorted(callees.get(func, []), key=lambda c: -c[1]):
+            walk(callee, edge_cumulative, depth + 1, path | {func})
+
+    for func, cumulative in sorted(roots, key=lambda r: -r[1]):
+        walk(func, cumulative, 0, frozenset())
+    return "\n".join(lines)
+
+def text_report(scope, status, body_bytes, elapsed, session, stats):
+    top = io.StringIO()
+    stats.stream = top
+    stats.sort_stats("tottime").print_stats(25)
+    return "\n".join([
+        f"Profile of {scope['method']} {scope['path']} -> {status}, {body_bytes:,} bytes in {elapsed * 1000:.1f} ms (wall)",
+        f"Threadpool calls profiled: {len(session.threads)}",
+        "Other requests running concurrently on this worker's event loop are included too.",
+        "",
+        "Call tree (cumulative time per call edge):",
+        call_tree(stats),
+        "",
+        "Top functions by own time:",
+        top.getvalue()
+    ])
+
+# ===== MIDDLEWARE =====
+
+def requested_mode(scope):
+    """Profile mode asked for by the `_profile` query flag or `X-Profile` header, else None"""
+    mode = None
+    if b"_profile" in scope.get("query_string", b""):
+        mode = parse_qs(scope["query_string"].decode("latin-1")).get("_profile", ["tree"])[0] or "tree"
+    else:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                mode = value.decode("latin-1") or "tree"
+                break
+    if mode is None:
+        return None
+    return mode if mode in PROFILE_MODES else "tree"
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; must sit inside SessionMiddleware to see the login"""
+
+    def __init__(self, app, enabled=True):
+        self.app = app
+        self.enabled = enabled
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode = requested_mode(scope)
+        if mode is None or not scope.get("session", {}).get("authenticated"):
+            return await self.app(scope, receive, send)
+        if self._busy:
+            # cProfile allows one active profiler per thread (the event loop's)
+            return await self._respond(send, 409, b"Another request is being profiled on this worker", "text/plain")
+
+        session = ProfileSession()
+        response = {"status": None, "bytes": 0}
+
+        async def capture(message):
+            # The page itself is discarded; only its size and status are reported
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+
+        self._busy = True
+        token = _active.set(session)
+        started = time.perf_counter()
+        session.main.enable()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            session.main.disable()
+            elapsed = time.perf_counter() - started
+            _active.reset(token)
+            self._busy = False
+
+        stats = session.stats()
+        print(f"🔬 Profiled {scope['method']} {scope['path']} in {elapsed * 1000:.1f} ms")
+        if mode == "pstats":
+            # Same format as pstats.Stats.dump_stats, so snakeviz/flameprof can load it
+            return await self._respond(send, 200, marshal.dumps(stats.stats), "application/octet-stream",
+                                       [(b"content-disposition", b'attachment; filename="request.prof"')])
+        report = text_report(scope, response["status"], response["bytes"], elapsed, session, stats)
+        await self._respond(send, 200, report.encode("utf-8"), "text/plain; charset=utf-8")
+
+    @staticmethod
+    async def _respond(send, status, body, content_type, headers=()):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode()), *headers]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,133 @@
+"""Near-duplicate clustering for People-Also-Ask questions.
+
+Questions are normalized, stripped of their question frame ("wat kost
+een", "hoe werkt de") so the subject words decide similarity, cut into
+word shingles and MinHashed; LSH
+banding then only proposes questions that share a band bucket as
+candidates, so collapsing thousands of PAA pulls stays near-linear instead
+of comparing every pair.
+"""
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+# Common abbreviations in Dutch insurance/banking searches, expanded before
+# shingling so "Wat kost een AVB?" lands next to the written-out question
+SYNONYMS = {
+    "avb": "bedrijfsaansprakelijkheidsverzekering",
+    "bav": "beroepsaansprakelijkheidsverzekering",
+    "zzp": "zzper",
+    "zzp'er": "zzper",
+    "zzp'ers": "zzpers",
+    "mkb": "midden en kleinbedrijf",
+}
+
+# Question words, articles and pronouns that frame a PAA question but say
+# nothing about its subject; without them "Wat kost een X?" no longer
+# matches "Wat kost een Y?" on the frame alone
+FRAME_WORDS = frozenset("""
+    wat wie welk welke waar waarom wanneer hoe hoeveel hoelang
+    de het een der des den dit dat deze die er
+    is zijn ben bent was waren wordt worden word kan kun kunt kunnen mag moet moeten
+    ik je jij u uw mijn me mij we wij ze zij hij jullie men
+    van voor in op aan met bij naar om over uit tot te als of en ook nog
+    what how why when where which who is are does do can a an the of for to my your i
+""".split())
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r"[a-z0-9à-ÿ']+")
+
+def normalize_question(question):
+    """Lowercase, strip punctuation and expand known abbreviations"""
+    words = _WORD_RE.findall(question.lower())
+    return " ".join(SYNONYMS.get(w, w) for w in words)
+
+def content_words(text):
+    """Words of a normalized question without its frame; all words if nothing else is left"""
+    words = text.split()
+    return [w for w in words if w not in FRAME_WORDS] or words
+
+def shingles(text):
+    """Hashed word and word-bigram shingles of the content words of `text` as a uint64 array"""
+    words = content_words(text) or [""]
+    grams = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+class QuestionClusterer:
+    """MinHash signatures + LSH banding over normalized questions"""
+
+    def __init__(self, num_perm=128, bands=32, threshold=0.5, seed=42):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        # Universal hashes (a*h + b) mod p; a*h wraps around 2**64 like datasketch's
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashed = shingles(text)
+        return ((np.outer(self._a, hashed) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def cluster(self, questions):
+        """Group questions into clusters of near-duplicates.
+
+        Returns [{"question", "frequency", "variants"}] ordered by frequency,
+        where "question" is the most asked (then shortest) original wording.
+        """
+        # Exact duplicates (after normalization) never need MinHash
+        wordings = {}
+        for question in questions:
+            question = question.strip()
+            if question:
+                wordings.setdefault(normalize_question(question), Counter())[question] += 1
+        keys = list(wordings)
+        if not keys:
+            return []
+
+        signatures = np.vstack([self.signature(k) for k in keys])
+        parent = list(range(len(keys)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(self.bands):
+            band_rows = signatures[:, band * self.rows:(band + 1) * self.rows]
+            buckets = {}
+            for i, row in enumerate(band_rows):
+                buckets.setdefault(row.tobytes(), []).append(i)
+            for members in buckets.values():
+                # Compare each candidate with the cluster root of the bucket's first
+                # member only, which keeps work O(bucket) and limits chaining
+                for other in members[1:]:
+                    root, other_root = find(members[0]), find(other)
+                    if root == other_root:
+                        continue
+                    similarity = np.mean(signatures[root] == signatures[other])
+                    if similarity >= self.threshold:
+                        parent[other_root] = root
+
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(find(i), Counter()).update(wordings[key])
+
+        clusters = [
+            {
+                "question": min(counts, key=lambda q: (-counts[q], len(q))),
+                "frequency": sum(counts.values()),
+                "variants": sorted(counts, key=lambda q: -counts[q])
+            }
+            for counts in groups.values()
+        ]
+        return sorted(clusters, key=lambda c: -c["frequency"])
+
+def cluster_questions(questions, threshold=0.5):
+    """Cluster PAA questions with the default MinHash/LSH settings"""
+    return QuestionClusterer(threshold=threshold).cluster(questions)
@@ -0,0 +1,109 @@
+"""Deadline-aware research pipeline behind the Research Depth slider.
+
+Research Depth (1-3) becomes an explicit latency budget. Crawling, text
+extraction, keyword volume lookups and gap analysis run concurrently inside
+that budget; whatever has not finished when the deadline hits is cancelled
+and listed in the result's "truncated" field, and the partial results that
+did arrive are returned as-is.
+"""
+import asyncio
+import time
+
+from app.api_clients import BATCH, INTERACTIVE, MARKET_DATABASES, create_http_client
+from app.competitor_profiles import GapAggregate, ProfileStore
+
+DEPTH_SETTINGS = {
+    1: {"budget": 3.0, "competitors": 3, "keywords": 5},
+    2: {"budget": 10.0, "competitors": 5, "keywords": 20},
+    3: {"budget": 30.0, "competitors": 10, "keywords": 100},
+}
+
+# Time kept back at the end of the budget for gap analysis on partial data
+ANALYSIS_RESERVE = 0.5
+
+# ===== PIPELINE =====
+
+async def _profile(profiles, http, url, deadline):
+    """Profile of one page from the shared store, crawled (and stored) only if it has none"""
+    timeout = max(0.1, deadline - time.monotonic())
+    profile = (await profiles.fetch([url], timeout=timeout, http=http))[url]
+    if "error" in profile:
+        raise RuntimeError(profile["error"])
+    return profile
+
+async def run_research(inputs, page_url="", depth=None, semrush=None, transport=None, profiles=None):
+    """Run the research stages for brief `inputs` within the depth's budget.
+
+    Pages are read through the `profiles` store (an in-memory one when not
+    given), so a page Step 3 already profiled is not crawled again.
+
+    Returns {"ing_profile", "competitor_profiles", "keyword_volumes", "gaps",
+    "truncated", "failed", "elapsed", "budget"}.
+    """
+    if profiles is None:
+        profiles = ProfileStore(":memory:")
+    depth = int(depth or inputs.get("research_depth") or 2)
+    settings = DEPTH_SETTINGS[min(max(depth, 1), 3)]
+    started = time.monotonic()
+    deadline = started + settings["budget"]
+    result = {
+        "ing_profile": None,
+        "competitor_profiles": {},
+        "keyword_volumes": {},
+        "gaps": None,
+        "truncated": [],
+        "failed": [],
+        "budget": settings["budget"]
+    }
+
+    competitors = inputs.get("competitors", [])[:settings["competitors"]]
+    keywords = inputs.get("keywords", [])[:settings["keywords"]]
+
+    async with create_http_client(max_connections=8, transport=transport) as http:
+        tasks = {}
+        if page_url:
+            tasks[asyncio.create_task(_profile(profiles, http, page_url, deadline))] = ("ing", page_url)
+        for url in competitors:
+            tasks[asyncio.create_task(_profile(profiles, http, url, deadline))] = ("competitor", url)
+        if semrush is not None and keywords:
+            database = MARKET_DATABASES.get(inputs.get("market"), "nl")
+            # The first keywords drive the brief; the long tail can wait behind users
+            tasks[asyncio.create_task(semrush.keyword_volumes(keywords[:5], database, INTERACTIVE))] = ("volumes", "focus")
+            if len(keywords) > 5:
+                tasks[asyncio.create_task(semrush.keyword_volumes(keywords[5:], database, BATCH))] = ("volumes", "expansion")
+
+        pending = set(tasks)
+        while pending:
+            remaining = deadline - ANALYSIS_RESERVE - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                kind, name = tasks[task]
+                if task.exception() is not None:
+                    result["failed"].append(f"{kind}: {name}")
+                elif kind == "ing":
+                    result["ing_profile"] = task.result()
+                elif kind == "competitor":
+                    result["competitor_profiles"][name] = task.result()
+                else:
+                    result["keyword_volumes"].update({k: v for k, v in task.result().items() if v is not None})
+
+        for task in pending:
+            task.cancel()
+            kind, name = tasks[task]
+            result["truncated"].append(f"{kind}: {name}")
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    if result["competitor_profiles"]:
+        aggregate = GapAggregate(result["ing_profile"])
+        for url, profile in result["competitor_profiles"].items():
+            aggregate.add(url, profile)
+        analysis = asyncio.to_thread(aggregate.gaps, result["keyword_volumes"])
+        try:
+            result["gaps"] = await asyncio.wait_for(analysis, timeout=max(0.05, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            result["truncated"].append("analysis: content gaps")
+
+    result["elapsed"] = time.monotonic() - started
+    return result
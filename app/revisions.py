@@ -0,0 +1,258 @@
+"""Revision history for edited briefs.
+
+Every save that changes something becomes a revision. Most revisions are
+stored as zlib-compressed per-field line deltas against the previous
+revision; a full compressed snapshot is only written once the deltas since
+the last snapshot outweigh it (or the chain gets long), so storage grows
+with the size of the edits rather than with the number of saves, and any
+revision is rebuilt from one snapshot plus a bounded run of deltas.
+
+Generated briefs are shared through the content-addressed brief cache, so
+histories are not kept per brief key but per session and brief key (see
+`revision_key`): every campaign edits its own copy, starting from the
+cached text.
+"""
+import difflib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from app.shared_state import connect_shared
+
+# Upper bound on deltas applied to rebuild a revision
+MAX_CHAIN = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS brief_revisions (
+    brief_key TEXT NOT NULL,
+    rev INTEGER NOT NULL,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (brief_key, rev)
+)
+"""
+
+def revision_key(session_id, brief_key):
+    """History key for one session's edits of a generated brief"""
+    return f"{session_id}:{brief_key}"
+
+# ===== DELTAS =====
+
+def _lines(text):
+    return text.splitlines(keepends=True)
+
+def field_delta(old, new):
+    """Compact edit script turning field value `old` into `new`.
+
+    Text becomes ["ops", [[start, end, [lines]], ...]]: replace old lines
+    start:end by `lines`. Anything else is stored whole as ["set", value].
+    """
+    if not isinstance(old, str) or not isinstance(new, str):
+        return ["set", new]
+    matcher = difflib.SequenceMatcher(None, _lines(old), _lines(new), autojunk=False)
+    new_lines = _lines(new)
+    return ["ops", [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]]
+
+def apply_field_delta(old, delta):
+    kind, body = delta
+    if kind == "set":
+        return body
+    lines = _lines(old)
+    # Apply back to front so earlier line numbers stay valid
+    for start, end, replacement in reversed(body):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+def brief_delta(old, new):
+    """{field: field delta} for the fields that differ between two briefs"""
+    return {
+        field: field_delta(old.get(field), value)
+        for field, value in new.items()
+        if old.get(field) != value
+    }
+
+def apply_brief_delta(brief, delta):
+    brief = dict(brief)
+    for field, field_change in delta.items():
+        brief[field] = apply_field_delta(brief.get(field, ""), field_change)
+    return brief
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+def _unpack(payload):
+    return json.loads(zlib.decompress(payload))
+
+# ===== SIDE-BY-SIDE DIFF =====
+
+def side_by_side(old, new):
+    """Rows of (tag, old_line, new_line) for a two-column diff of two texts"""
+    old_lines, new_lines = str(old or "").splitlines(), str(new or "").splitlines()
+    rows = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        left, right = old_lines[i1:i2], new_lines[j1:j2]
+        for k in range(max(len(left), len(right))):
+            rows.append((
+                tag,
+                left[k] if k < len(left) else "",
+                right[k] if k < len(right) else ""
+            ))
+    return rows
+
+# ===== STORE =====
+
+class RevisionStore:
+    """SQLite-backed revision chains, one per `revision_key` (stored in the brief_key column)"""
+
+    def __init__(self, path, max_chain=MAX_CHAIN, max_heads=256):
+        self.path = path
+        self.max_chain = max_chain
+        self.max_heads = max_heads
+        self._lock = threading.Lock()
+        self._db = connect_shared(path)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        # brief_key -> (rev, brief), so saves diff without a rebuild; other
+        # worker processes may have saved since, so it is checked before use.
+        # An LRU: every session has its own chain, and most are never edited again
+        self._heads = OrderedDict()
+
+    def _rows(self, brief_key, rev):
+        """Rows needed to rebuild `rev`: its nearest snapshot and the deltas after it"""
+        snapshot = self._db.execute(
+            "SELECT MAX(rev) FROM brief_revisions WHERE brief_key = ? AND rev <= ? AND kind = 'snapshot'",
+            (brief_key, rev)
+        ).fetchone()[0]
+        if snapshot is None:
+            return []
+        return self._db.execute(
+            "SELECT rev, kind, payload FROM brief_revisions WHERE brief_key = ? AND rev BETWEEN ? AND ? ORDER BY rev",
+            (brief_key, snapshot, rev)
+        ).fetchall()
+
+    def get(self, brief_key, rev=None):
+        """The brief as of revision `rev` (default: latest), or None"""
+        with self._lock:
+            head = self._head(brief_key)
+            if head is None:
+                return None
+            if rev is None or rev == head[0]:
+                return dict(head[1])
+            brief = None
+            for _, kind, payload in self._rows(brief_key, rev):
+                brief = _unpack(payload) if kind == "snapshot" else apply_brief_delta(brief, _unpack(payload))
+            return brief
+
+    def latest(self, brief_key, remember=True):
+        """(revision number, brief) of the newest revision, or None.
+
+        Bulk readers pass `remember=False` so rebuilt heads do not evict the
+        head cache's hot entries.
+        """
+        with self._lock:
+            head = self._head(brief_key, remember)
+            return None if head is None else (head[0], dict(head[1]))
+
+    def _remember(self, brief_key, head):
+        self._heads[brief_key] = head
+        self._heads.move_to_end(brief_key)
+        while len(self._heads) > self.max_heads:
+            self._heads.popitem(last=False)
+        return head
+
+    def _head(self, brief_key, remember=True):
+        latest = self._db.execute(
+            "SELECT MAX(rev) FROM brief_revisions WHERE brief_key = ?", (brief_key,)
+        ).fetchone()[0]
+        if latest is None:
+            self._heads.pop(brief_key, None)
+            return None
+        cached = self._heads.get(brief_key)
+        if cached is not None and cached[0] == latest:
+            if remember:
+                self._heads.move_to_end(brief_key)
+            return cached
+        if cached is not None and cached[0] < latest:
+            # Catch up on revisions saved by another process
+            rows = self._db.execute(
+                "SELECT rev, kind, payload FROM brief_revisions WHERE brief_key = ? AND rev > ? ORDER BY rev",
+                (brief_key, cached[0])
+            ).fetchall()
+            brief = cached[1]
+        else:
+            rows, brief = self._rows(brief_key, latest), None
+        for _, kind, payload in rows:
+            brief = _unpack(payload) if kind == "snapshot" else apply_brief_delta(brief, _unpack(payload))
+        return self._remember(brief_key, (latest, brief)) if remember else (latest, brief)
+
+    def save(self, brief_key, brief):
+        """Record `brief` as a new revision; returns its number (unchanged briefs add none)"""
+        with self._lock:
+            # Write lock up front: a save in another process cannot slip in between
+            # reading the head and inserting the next revision number
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                return self._save(brief_key, brief)
+            finally:
+                if self._db.in_transaction:
+                    self._db.rollback()
+
+    def _save(self, brief_key, brief):
+        head = self._head(brief_key)
+        if head is not None and head[1] == brief:
+            return head[0]
+
+        rev = 1 if head is None else head[0] + 1
+        snapshot = _pack(brief)
+        kind, payload, fields = "snapshot", snapshot, sorted(brief)
+        if head is not None:
+            delta = brief_delta(head[1], brief)
+            packed = _pack(delta)
+            since_snapshot = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM brief_revisions "
+                "WHERE brief_key = ? AND kind = 'delta' AND rev > ("
+                "SELECT MAX(rev) FROM brief_revisions WHERE brief_key = ? AND kind = 'snapshot')",
+                (brief_key, brief_key)
+            ).fetchone()
+            chain, delta_bytes = since_snapshot
+            # A new snapshot once replaying deltas would cost more than storing it
+            if chain < self.max_chain and delta_bytes + len(packed) < len(snapshot):
+                kind, payload, fields = "delta", packed, sorted(delta)
+
+        self._db.execute(
+            "INSERT INTO brief_revisions (brief_key, rev, created, kind, fields, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            (brief_key, rev, time.time(), kind, json.dumps(fields), payload)
+        )
+        self._db.commit()
+        self._remember(brief_key, (rev, dict(brief)))
+        return rev
+
+    def history(self, brief_key):
+        """[{"rev", "created", "kind", "fields", "bytes"}] newest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT rev, created, kind, fields, LENGTH(payload) FROM brief_revisions "
+                "WHERE brief_key = ? ORDER BY rev DESC",
+                (brief_key,)
+            ).fetchall()
+        return [
+            {"rev": rev, "created": created, "kind": kind, "fields": json.loads(fields), "bytes": size}
+            for rev, created, kind, fields, size in rows
+        ]
+
+    def diff(self, brief_key, old_rev, new_rev):
+        """{field: side-by-side rows} for the fields that changed between two revisions"""
+        old, new = self.get(brief_key, old_rev) or {}, self.get(brief_key, new_rev) or {}
+        return {
+            field: side_by_side(old.get(field), new.get(field))
+            for field in new
+            if old.get(field) != new.get(field)
+        }
@@ -0,0 +1,183 @@
+"""Live SEO checks for the Step 4 brief fields.
+
+`BriefScorer` keeps, per field, the word count and keyword hits of its
+last seen text plus running totals over all fields. An edit re-tokenizes
+only the field whose text changed and moves the totals by the difference,
+so a score after a keystroke costs one short field, not the whole brief.
+
+Title and meta description widths are estimated in pixels from Arial
+advance widths, the font Google uses for desktop results, so truncation
+is flagged by rendered width rather than by character count alone.
+"""
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Desktop SERP limits: title at 20px, description at 14px
+TITLE_FONT_PX = 20
+TITLE_MAX_PX = 580
+TITLE_MAX_CHARS = 60
+META_FONT_PX = 14
+META_MAX_PX = 920
+META_MAX_CHARS = 155
+
+# Fields that end up as page copy; guidelines and gap notes are for the writer
+DENSITY_FIELDS = ("page_title", "meta_description", "h1", "h2_headers", "faq")
+
+# Focus keyword mentions the brief should plan for
+FOCUS_MENTIONS = (3, 5)
+
+# Arial advance widths in 1/1000 em
+_ARIAL_WIDTHS = {
+    **dict.fromkeys("abdeghnopqu0123456789€$#_", 556),
+    **dict.fromkeys("cksvxyz", 500),
+    **dict.fromkeys("fjilt .,:;!/[]\\", 278), "i": 222, "j": 222, "l": 222,
+    "m": 833, "r": 333, "w": 722, "-": 333, "(": 333, ")": 333, "?": 556, "|": 260,
+    "'": 191, '"': 355, "&": 667, "%": 889, "+": 584, "=": 584, "*": 389, "@": 1015,
+    **dict.fromkeys("ABEKPSVXY", 667), **dict.fromkeys("CDHNRU", 722), **dict.fromkeys("GOQ", 778),
+    "F": 611, "T": 611, "Z": 611, "I": 278, "J": 500, "L": 556, "M": 833, "W": 944,
+}
+_DEFAULT_WIDTH = 556
+
+_WORD_RE = re.compile(r"[a-z0-9à-ÿ]+(?:['’-][a-z0-9à-ÿ]+)*")
+
+def tokenize(text):
+    return _WORD_RE.findall(text.lower())
+
+def text_width(text, font_px):
+    """Rendered width in pixels of `text` in Arial at `font_px`"""
+    return sum(_ARIAL_WIDTHS.get(ch, _DEFAULT_WIDTH) for ch in text) * font_px / 1000
+
+def length_check(text, max_chars, font_px, max_px):
+    """{"chars", "px", "status"}; status is "ok", "short" or "truncated" (too wide for the SERP)"""
+    text = " ".join(text.split())
+    px = text_width(text, font_px)
+    if px > max_px:
+        status = "truncated"
+    elif len(text) < max_chars // 2:
+        status = "short"
+    else:
+        status = "ok"
+    return {"chars": len(text), "max_chars": max_chars, "px": round(px), "max_px": max_px, "status": status}
+
+class BriefScorer:
+    """Keyword and heading counters over the brief fields, updated per edited field"""
+
+    def __init__(self, focus_keyword, secondary_keywords=()):
+        self.focus = tuple(tokenize(focus_keyword))
+        self.secondary = [k for k in dict.fromkeys(tuple(tokenize(kw)) for kw in secondary_keywords) if k and k != self.focus]
+        self.keywords = {k for k in [self.focus, *self.secondary] if k}
+        self._lengths = sorted({len(k) for k in self.keywords})
+        self.texts = {}
+        self._fields = {}  # field -> (words, keyword hits Counter, [keyword sets per line])
+        self.words = 0
+        self.hits = Counter()
+
+    def _analyze(self, text):
+        lines = []
+        hits = Counter()
+        words = 0
+        for line in text.splitlines() or [""]:
+            tokens = tokenize(line)
+            words += len(tokens)
+            found = Counter(
+                gram
+                for n in self._lengths
+                for gram in zip(*(tokens[i:] for i in range(n)))
+                if gram in self.keywords
+            )
+            hits.update(found)
+            if tokens:
+                lines.append(set(found))
+        return words, hits, lines
+
+    def update(self, field, text):
+        """Re-count one field; returns False when its text did not change"""
+        text = text or ""
+        if self.texts.get(field) == text:
+            return False
+        new = self._analyze(text)
+        old = self._fields.get(field)
+        if field in DENSITY_FIELDS:
+            if old is not None:
+                self.words -= old[0]
+                self.hits.subtract(old[1])
+            self.words += new[0]
+            self.hits.update(new[1])
+        self.texts[field] = text
+        self._fields[field] = new
+        return True
+
+    def sync(self, fields):
+        """Apply a {field: text} snapshot; returns the names of the fields that changed"""
+        return [field for field, text in fields.items() if self.update(field, text)]
+
+    def density(self, keyword):
+        if not self.words:
+            return 0.0
+        return self.hits[keyword] * len(keyword) / self.words
+
+    def report(self):
+        h1_lines = self._fields.get("h1", (0, Counter(), []))[2]
+        h2_lines = self._fields.get("h2_headers", (0, Counter(), []))[2]
+        in_headings = set().union(*h1_lines, *h2_lines)
+        focus_mentions = self.hits[self.focus]
+        low, high = FOCUS_MENTIONS
+        return {
+            "title": length_check(self.texts.get("page_title", ""), TITLE_MAX_CHARS, TITLE_FONT_PX, TITLE_MAX_PX),
+            "meta": length_check(self.texts.get("meta_description", ""), META_MAX_CHARS, META_FONT_PX, META_MAX_PX),
+            "words": self.words,
+            "focus": {
+                "keyword": " ".join(self.focus),
+                "mentions": focus_mentions,
+                "density": self.density(self.focus),
+                "status": "ok" if low <= focus_mentions <= high else ("low" if focus_mentions < low else "high")
+            },
+            "secondary": [
+                {"keyword": " ".join(k), "mentions": self.hits[k], "density": self.density(k)}
+                for k in self.secondary
+            ],
+            "headings": {
+                "focus_in_h1": any(self.focus in line for line in h1_lines),
+                "h2_with_keyword": sum(1 for line in h2_lines if line),
+                "h2_total": len(h2_lines),
+                "secondary_in_headings": sum(1 for k in self.secondary if k in in_headings),
+                "secondary_total": len(self.secondary)
+            }
+        }
+
+class ScorerCache:
+    """LRU of live scorers, one per session and brief"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (scorer, lock serializing its updates)
+        self._lock = threading.Lock()
+
+    def score(self, key, fields, build):
+        """(report, changed fields, seconds spent counting) after applying `fields`.
+
+        `build()` makes the scorer (primed with the saved brief) the first
+        time a key is seen in this process. It may be slow (it can load or
+        regenerate the brief), so it runs outside the cache lock, which only
+        guards the LRU; counting holds just the lock of this one scorer.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            built = (build(), threading.Lock())
+            with self._lock:
+                # Another request for the same key may have installed one meanwhile
+                entry = self._entries.setdefault(key, built)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        scorer, lock = entry
+        with lock:
+            started = time.perf_counter()
+            changed = scorer.sync(fields)
+            report = scorer.report()
+            return report, changed, time.perf_counter() - started
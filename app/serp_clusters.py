@@ -0,0 +1,176 @@
+"""Campaign planning: group keywords that Google answers with the same pages.
+
+Two keywords belong on one page when their top-N organic results share at
+least `min_shared` URLs. Keywords are visited by volume, highest first;
+each one joins the existing cluster whose head keyword it overlaps most, or
+becomes the head of a new cluster. Overlap is counted through an inverted
+URL -> cluster-head index, so a keyword is only compared with heads it
+shares a URL with instead of with every other keyword, and because every
+member overlaps its head directly, clusters cannot chain into unrelated
+topics. Each cluster is one proposed brief: the head is its focus keyword.
+
+    python -m app.serp_clusters plan keywords.txt [serps.jsonl]
+
+SERPs come from the same export the nightly job reads (SERP_FILE): one
+{"keyword", "results": [{"url", "title"}]} object per line, in rank order.
+Keyword files hold one keyword per line, optionally followed by a
+comma/semicolon/tab and its monthly volume.
+"""
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Results per SERP compared, and shared URLs needed to share a page
+TOP_N = 10
+MIN_SHARED = 3
+
+# URLs ranking for more keywords than this (portals, Wikipedia hubs) say
+# little about intent and would make every keyword a candidate of every head
+MAX_KEYWORDS_PER_URL = 2000
+
+_VOLUME_SPLIT_RE = re.compile(r"[,;\t]")
+
+def normalize_keyword(keyword):
+    return " ".join(str(keyword).lower().split())
+
+def normalize_url(url):
+    """Scheme-, www- and trailing-slash-free URL, so variants of a page compare equal"""
+    return url.strip().split("://", 1)[-1].removeprefix("www.").rstrip("/").lower()
+
+def parse_keyword_list(text):
+    """[(keyword, volume or None)] from an uploaded list, first occurrence wins"""
+    seen, keywords = set(), []
+    for line in text.splitlines():
+        keyword, *rest = _VOLUME_SPLIT_RE.split(line, 1)
+        keyword = normalize_keyword(keyword.strip().strip('"'))
+        if not keyword or keyword in seen or keyword == "keyword":
+            continue
+        seen.add(keyword)
+        digits = re.sub(r"[^\d]", "", rest[0]) if rest else ""
+        keywords.append((keyword, int(digits) if digits else None))
+    return keywords
+
+class SerpIndex:
+    """Top-N result URLs per keyword, with URLs interned to integer ids"""
+
+    def __init__(self, top_n=TOP_N):
+        self.top_n = top_n
+        self.urls = []
+        self._url_ids = {}
+        self._serps = {}  # keyword -> tuple of url ids in rank order
+
+    @classmethod
+    def load(cls, path, top_n=TOP_N):
+        index = cls(top_n)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    serp = json.loads(line)
+                    index.add(serp["keyword"], [result["url"] for result in serp["results"]])
+        return index
+
+    @classmethod
+    def load_if_exists(cls, path, top_n=TOP_N):
+        """Load the SERP export, or return None when there is none yet"""
+        if not Path(path).exists():
+            return None
+        return cls.load(path, top_n)
+
+    def add(self, keyword, urls):
+        ids = []
+        for url in urls:
+            url = normalize_url(url)
+            url_id = self._url_ids.get(url)
+            if url_id is None:
+                url_id = self._url_ids[url] = len(self.urls)
+                self.urls.append(url)
+            if url_id not in ids:
+                ids.append(url_id)
+            if len(ids) == self.top_n:
+                break
+        self._serps[normalize_keyword(keyword)] = tuple(ids)
+
+    def __len__(self):
+        return len(self._serps)
+
+    def get(self, keyword):
+        """URL ids of the keyword's top results, or None without SERP data"""
+        return self._serps.get(keyword)
+
+def cluster_keywords(keywords, index, min_shared=MIN_SHARED, max_keywords_per_url=MAX_KEYWORDS_PER_URL):
+    """Group [(keyword, volume)] by SERP overlap.
+
+    Returns (clusters, missing): clusters as [{"keyword", "volume",
+    "keywords", "urls"}] by total volume, where "keywords" are
+    (keyword, volume) pairs head first and "urls" the pages ranking for most
+    members; missing are the keywords without SERP data.
+    """
+    serps, missing = {}, []
+    for keyword, volume in keywords:
+        urls = index.get(keyword)
+        if urls:
+            serps[keyword] = (urls, volume or 0)
+        else:
+            missing.append((keyword, volume))
+
+    document_frequency = Counter(url for urls, _ in serps.values() for url in urls)
+    common = {url for url, count in document_frequency.items() if count > max_keywords_per_url}
+
+    heads, members = [], []
+    postings = {}  # url id -> indexes of heads ranking with it
+    for keyword in sorted(serps, key=lambda k: (-serps[k][1], k)):
+        urls = [url for url in serps[keyword][0] if url not in common]
+        shared = Counter(head for url in urls for head in postings.get(url, ()))
+        best = max(shared, key=lambda h: (shared[h], -h), default=None)
+        if best is not None and shared[best] >= min_shared:
+            members[best].append(keyword)
+            continue
+        for url in urls:
+            postings.setdefault(url, []).append(len(heads))
+        heads.append(keyword)
+        members.append([keyword])
+
+    clusters = []
+    for group in members:
+        ranking = Counter(url for keyword in group for url in serps[keyword][0] if url not in common)
+        clusters.append({
+            "keyword": group[0],
+            "volume": sum(serps[keyword][1] for keyword in group),
+            "keywords": [(keyword, serps[keyword][1]) for keyword in group],
+            "urls": [index.urls[url] for url, _ in ranking.most_common(3)]
+        })
+    clusters.sort(key=lambda c: (-c["volume"], -len(c["keywords"])))
+    return clusters, missing
+
+def campaign_plan(keywords, index, min_shared=MIN_SHARED):
+    """Proposed briefs for a keyword list, plus the numbers behind them"""
+    started = time.perf_counter()
+    clusters, missing = cluster_keywords(keywords, index, min_shared)
+    return {
+        "briefs": [c for c in clusters if len(c["keywords"]) > 1],
+        "singletons": [c for c in clusters if len(c["keywords"]) == 1],
+        "missing": missing,
+        "keywords": len(keywords),
+        "seconds": time.perf_counter() - started
+    }
+
+if __name__ == "__main__":
+    command, *args = sys.argv[1:] or ["help"]
+    if command == "plan" and len(args) in (1, 2):
+        serp_file = args[1] if len(args) == 2 else os.getenv("SERP_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "serps.jsonl"))
+        started = time.perf_counter()
+        serp_index = SerpIndex.load(serp_file)
+        print(f"📥 Loaded {len(serp_index):,} SERPs in {time.perf_counter() - started:.2f}s")
+        plan = campaign_plan(parse_keyword_list(Path(args[0]).read_text(encoding="utf-8")), serp_index)
+        print(
+            f"✅ {plan['keywords']:,} keywords -> {len(plan['briefs']):,} briefs, {len(plan['singletons']):,} single-keyword pages, "
+            f"{len(plan['missing']):,} without SERP data in {plan['seconds']:.2f}s"
+        )
+        for brief in plan["briefs"][:20]:
+            print(f"  {brief['keyword']} ({brief['volume']:,}/mo, {len(brief['keywords'])} keywords)")
+    else:
+        print(__doc__)
@@ -0,0 +1,74 @@
+"""Saved wizard state, looked up by the short session ID users copy.
+
+Sessions live in a WITHOUT ROWID SQLite table clustered on the full
+session ID, so a short-ID lookup is a single B-tree range scan
+(`prefix <= id < next prefix`): O(log n) to find the first match and
+returning every session that shares the prefix, along with its state.
+"""
+import json
+import re
+import threading
+import time
+
+from app.shared_state import connect_shared
+
+# Shortest prefix accepted, so a lookup cannot enumerate everything
+MIN_PREFIX = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wizard_sessions (
+    session_id TEXT PRIMARY KEY,
+    updated REAL NOT NULL,
+    state TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+_PREFIX_RE = re.compile(r"^[0-9a-f-]+$")
+
+def normalize_prefix(short_id):
+    """Lowercased session-ID prefix, or None if it cannot match a session ID"""
+    prefix = "".join(short_id.split()).lower()
+    if len(prefix) < MIN_PREFIX or not _PREFIX_RE.match(prefix):
+        return None
+    return prefix
+
+class SessionIndex:
+    """Wizard state per session ID with prefix lookups"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = connect_shared(path)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    def save(self, session_id, state):
+        """Store (or replace) the wizard state of a session"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO wizard_sessions (session_id, updated, state) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET updated = excluded.updated, state = excluded.state",
+                (session_id, time.time(), json.dumps(state, ensure_ascii=False))
+            )
+            self._db.commit()
+
+    def lookup(self, short_id, limit=10):
+        """Sessions whose ID starts with `short_id` as [{"session_id", "updated", "state"}].
+
+        More than one result means the prefix is ambiguous; the caller asks
+        the user to pick (or to type more characters).
+        """
+        prefix = normalize_prefix(short_id)
+        if prefix is None:
+            return []
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT session_id, updated, state FROM wizard_sessions "
+                "WHERE session_id >= ? AND session_id < ? ORDER BY session_id LIMIT ?",
+                (prefix, upper, limit)
+            ).fetchall()
+        return [
+            {"session_id": session_id, "updated": updated, "state": json.loads(state)}
+            for session_id, updated, state in rows
+        ]
@@ -0,0 +1,94 @@
+"""Local storage shared by every worker process on one machine.
+
+All SQLite files the app writes go through `connect_shared`, which turns on
+WAL (readers never block the writer) and a busy timeout, so several
+uvicorn workers can use the same file. `InvalidationBus` is an append-only
+SQLite log that tells other processes to drop in-memory copies of cached
+data they no longer may serve.
+"""
+import sqlite3
+import threading
+import time
+
+# Log rows older than this are pruned; a process that missed pruned rows drops everything
+INVALIDATION_RETENTION = 24 * 3600
+
+def connect_shared(path, readonly=False):
+    """SQLite connection safe to share with other worker processes"""
+    if readonly:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False, timeout=10)
+    else:
+        db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+class InvalidationBus:
+    """Cross-process invalidation notices, delivered on the receiver's next `sync()`"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS invalidations (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel TEXT NOT NULL,
+        key TEXT,
+        created REAL NOT NULL
+    )
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = connect_shared(path)
+        self._db.execute(self.SCHEMA)
+        self._db.commit()
+        self._handlers = {}
+        # Only notices published after this process started concern it
+        self._seen = self._last_seq()
+        # This process's own notices, already applied when published
+        self._own = set()
+
+    def _last_seq(self):
+        """Highest seq ever handed out, including pruned rows"""
+        return self._db.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'invalidations'"
+        ).fetchone()[0]
+
+    def subscribe(self, channel, handler):
+        """Call `handler(key)` for each notice on `channel` (key None means everything)"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def publish(self, channel, keys=None):
+        """Tell every other process to drop `keys` (or everything) on `channel`"""
+        rows = [(channel, key, time.time()) for key in keys] if keys is not None else [(channel, None, time.time())]
+        with self._lock:
+            cursor = self._db.executemany("INSERT INTO invalidations (channel, key, created) VALUES (?, ?, ?)", rows)
+            # Still inside the write transaction, so these seqs are all ours
+            last = self._last_seq()
+            self._own.update(range(last - len(rows) + 1, last + 1))
+            self._db.execute("DELETE FROM invalidations WHERE created < ?", (time.time() - INVALIDATION_RETENTION,))
+            self._db.commit()
+        return cursor.rowcount
+
+    def sync(self):
+        """Apply notices other processes published since the last sync.
+
+        When notices this process never saw were already pruned, which keys
+        they named is unknown, so every subscriber is told to drop everything.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, channel, key FROM invalidations WHERE seq > ? ORDER BY seq", (self._seen,)
+            ).fetchall()
+            first = rows[0][0] if rows else self._last_seq() + 1
+            # Stops at the first seq that is not ours, so this stays short
+            missed = any(seq not in self._own for seq in range(self._seen + 1, first))
+            self._seen = max(self._seen, first - 1, rows[-1][0] if rows else 0)
+            rows = [row for row in rows if row[0] not in self._own]
+            self._own = {seq for seq in self._own if seq > self._seen}
+        if missed:
+            for handlers in self._handlers.values():
+                for handler in handlers:
+                    handler(None)
+        for _, channel, key in rows:
+            for handler in self._handlers.get(channel, []):
+                handler(key)
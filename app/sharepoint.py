@@ -0,0 +1,293 @@
+"""Resumable chunked uploads of exports to a SharePoint document library.
+
+Uses the Graph upload-session protocol: POST createUploadSession for the
+target path, PUT byte ranges (Content-Range) to the returned upload URL,
+and GET that URL for the ranges the server still expects. Every job's
+state and payload live on disk, so a failed or interrupted upload resumes
+by asking the server what is missing and sending only those bytes.
+
+Graph wants fragments in order and sized in multiples of 320 KiB, so chunks
+go out one at a time by default. Endpoints that accept ranges in any order
+(like the stand-in in app.fake_apis) can opt in to parallel chunks with
+SHAREPOINT_UPLOAD_CONCURRENCY.
+
+With several worker processes sharing `jobs_dir`, a job runs in whichever
+process holds its lock file, so a resume handled by another worker never
+uploads the same job twice. A job still marked queued or uploading whose
+lock nobody holds was cut off by a restart: `status()` reports it as
+failed (so it can be retried) and `resume_interrupted()` restarts such jobs
+when the app starts.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import quote
+
+import httpx
+
+from app.api_clients import create_http_client, send_with_retry
+
+# Graph requires fragments in multiples of 320 KiB
+CHUNK_SIZE = 10 * 320 * 1024
+
+# Job states
+QUEUED, UPLOADING, DONE, FAILED = "queued", "uploading", "done", "failed"
+
+def parse_ranges(next_expected, size):
+    """Graph "nextExpectedRanges" (`"0-"`, `"26-99"`) as [(start, end_exclusive)]"""
+    ranges = []
+    for item in next_expected:
+        start, _, end = item.partition("-")
+        ranges.append((int(start), int(end) + 1 if end else size))
+    return ranges
+
+def missing_spans(size, expected, chunk_size=CHUNK_SIZE):
+    """Chunk-aligned byte spans covering exactly the `expected` ranges"""
+    spans = []
+    for start, end in expected:
+        for chunk_start in range(start - start % chunk_size, end, chunk_size):
+            span = (max(start, chunk_start), min(end, chunk_start + chunk_size, size))
+            if span[0] < span[1]:
+                spans.append(span)
+    return spans
+
+class ChunkError(Exception):
+    """A chunk could not be delivered after retries"""
+
+class SharePointUploader:
+    """Background upload jobs against one drive, persisted in `jobs_dir`"""
+
+    def __init__(self, drive_url, token, jobs_dir, chunk_size=CHUNK_SIZE, concurrency=1,
+                 attempts=4, transport=None):
+        self.drive_url = drive_url.rstrip("/")
+        self.token = token
+        self.jobs_dir = Path(jobs_dir)
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.attempts = attempts
+        # Upload URLs are pre-authenticated, so the pooled client carries no token
+        self.http = create_http_client(max_connections=concurrency, transport=transport)
+        self._tasks = {}
+
+    # ----- job state -----
+
+    def _job_path(self, job_id):
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _payload_path(self, job_id):
+        return self.jobs_dir / f"{job_id}.bin"
+
+    def _claim(self, job_id):
+        """Open file holding the job's cross-process lock, or None if another process runs it"""
+        lock = open(self.jobs_dir / f"{job_id}.lock", "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+    def _save(self, job):
+        job["updated"] = time.time()
+        tmp_path = self._job_path(job["id"]).with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(job, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self._job_path(job["id"]))
+
+    def _load(self, job_id):
+        try:
+            return json.loads(self._job_path(job_id).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _running(self, job_id):
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+    def status(self, job_id):
+        """The job's state dict, or None for an unknown id.
+
+        A queued or uploading job that no process is running any more is
+        marked failed here, so the page offers a retry instead of polling
+        forever.
+        """
+        job = self._load(job_id)
+        if job is None or job["status"] not in (QUEUED, UPLOADING) or self._running(job_id):
+            return job
+        lock = self._claim(job_id)
+        if lock is None:
+            return job
+        try:
+            # Re-read under the lock: the last holder may have just finished
+            job = self._load(job_id)
+            if job is not None and job["status"] in (QUEUED, UPLOADING):
+                job["status"], job["error"] = FAILED, "Upload was interrupted (server restart)"
+                self._save(job)
+            return job
+        finally:
+            lock.close()
+
+    def incomplete_jobs(self):
+        """Ids of jobs that never reached "done" (e.g. interrupted by a restart)"""
+        if not self.jobs_dir.exists():
+            return []
+        return [
+            job["id"]
+            for job in map(self._load, (p.stem for p in self.jobs_dir.glob("*.json")))
+            if job and job["status"] != DONE
+        ]
+
+    def resume_interrupted(self):
+        """Restart the jobs a stopped process left queued or uploading; returns their ids.
+
+        Jobs that failed on their own stay failed until someone retries them.
+        """
+        interrupted = [
+            job["id"] for job in map(self._load, self.incomplete_jobs()) if job and job["status"] in (QUEUED, UPLOADING)
+        ]
+        for job_id in interrupted:
+            self.resume(job_id)
+        return interrupted
+
+    # ----- submitting -----
+
+    def submit(self, name, folder, data):
+        """Queue `data` for upload as `folder/name` and start it in the background"""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "name": name,
+            "folder": folder,
+            "size": len(data),
+            "status": QUEUED,
+            "upload_url": None,
+            "sent_bytes": 0,
+            "item": None,
+            "error": None,
+            "created": time.time()
+        }
+        self._payload_path(job["id"]).write_bytes(data)
+        self._save(job)
+        self._start(job)
+        return job["id"]
+
+    def resume(self, job_id):
+        """Restart a failed or interrupted job; returns its state, or None if unknown"""
+        job = self.status(job_id)
+        if job is None or job["status"] == DONE:
+            return job
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            self._start(job)
+        return job
+
+    def _start(self, job):
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+
+    # ----- protocol -----
+
+    async def _create_session(self, job):
+        path = quote(f"{job['folder'].strip('/')}/{job['name']}")
+        response = await send_with_retry(
+            self.http, "POST", f"{self.drive_url}/root:/{path}:/createUploadSession",
+            headers={"Authorization": f"Bearer {self.token}"} if self.token else {},
+            json={"item": {"@microsoft.graph.conflictBehavior": "replace", "name": job["name"]}}
+        )
+        return response.json()["uploadUrl"]
+
+    async def _expected_ranges(self, job):
+        """Ranges the server still needs, or None when the session has expired"""
+        response = await self.http.get(job["upload_url"])
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return parse_ranges(response.json().get("nextExpectedRanges", []), job["size"])
+
+    async def _put_chunk(self, job, payload, start, end):
+        headers = {"Content-Range": f"bytes {start}-{end - 1}/{job['size']}"}
+        for attempt in range(self.attempts):
+            try:
+                response = await send_with_retry(self.http, "PUT", job["upload_url"], content=payload[start:end], headers=headers)
+                return response.json() if response.status_code in (200, 201) else None
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                reason = f"HTTP {e.response.status_code}" if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+                if attempt == self.attempts - 1 or reason.startswith("HTTP 4"):
+                    raise ChunkError(f"bytes {start}-{end - 1}: {reason}") from e
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def _run(self, job):
+        lock = self._claim(job["id"])
+        if lock is None:
+            return
+        try:
+            # Re-read under the lock: the last holder may have finished the job
+            job = self.status(job["id"]) or job
+            if job["status"] != DONE:
+                await self._upload(job)
+        finally:
+            lock.close()
+
+    async def _upload(self, job):
+        job["status"], job["error"] = UPLOADING, None
+        self._save(job)
+        try:
+            payload = self._payload_path(job["id"]).read_bytes()
+            expected = await self._expected_ranges(job) if job["upload_url"] else None
+            if expected is None:
+                job["upload_url"] = await self._create_session(job)
+                job["sent_bytes"] = 0
+                self._save(job)
+                expected = [(0, job["size"])]
+            job["sent_bytes"] = job["size"] - sum(end - start for start, end in expected)
+
+            slots = asyncio.Semaphore(self.concurrency)
+
+            async def send(span):
+                async with slots:
+                    item = await self._put_chunk(job, payload, *span)
+                    job["sent_bytes"] += span[1] - span[0]
+                    if item is not None:
+                        job["item"] = item
+                    self._save(job)
+
+            # Let every chunk finish before failing, so a resume never races in-flight PUTs
+            results = await asyncio.gather(
+                *[send(span) for span in missing_spans(job["size"], expected, self.chunk_size)],
+                return_exceptions=True
+            )
+            errors = [r for r in results if isinstance(r, Exception)]
+            if errors:
+                raise errors[0]
+            if job["item"] is None:
+                raise ChunkError("Server did not confirm the completed file")
+        except Exception as e:
+            job["status"], job["error"] = FAILED, str(e) or type(e).__name__
+            self._save(job)
+            print(f"❌ Upload {job['id']} ({job['name']}) failed: {job['error']}")
+            return
+
+        job["status"] = DONE
+        self._save(job)
+        self._payload_path(job["id"]).unlink(missing_ok=True)
+        (self.jobs_dir / f"{job['id']}.lock").unlink(missing_ok=True)
+        print(f"📤 Uploaded {job['name']} ({job['size']:,} bytes) to {job['folder']}")
+
+    async def aclose(self):
+        await self.http.aclose()
+
+def sharepoint_uploader_from_env(transport=None):
+    """Uploader configured from SHAREPOINT_* environment variables"""
+    return SharePointUploader(
+        os.getenv("SHAREPOINT_DRIVE_URL", ""),
+        os.getenv("SHAREPOINT_TOKEN", ""),
+        os.getenv("SHAREPOINT_JOBS_DIR", "/tmp/sharepoint-jobs"),
+        chunk_size=int(os.getenv("SHAREPOINT_CHUNK_SIZE", str(CHUNK_SIZE))),
+        # Graph needs fragments in order; only raise this for endpoints that take parallel ranges
+        concurrency=int(os.getenv("SHAREPOINT_UPLOAD_CONCURRENCY", "1")),
+        transport=transport
+    )
@@ -0,0 +1,213 @@
+"""Columnar store for monthly keyword search volumes.
+
+Volumes live in one fixed-width uint32 matrix (keyword_id x month) saved in
+column-major order, so each month is a contiguous column on disk. The
+matrix is memory-mapped on load: portfolio totals, YoY growth, top-N and
+per-product-group sums only page in the months they read, and reductions
+run over blocks of keywords so RAM stays bounded on small instances.
+
+    python -m app.volume_store build volumes.csv data/volume-store
+    python -m app.volume_store summary data/volume-store
+
+The CSV has one `keyword,product_group,month,volume` row per keyword and
+month, with months written as YYYY-MM.
+"""
+import csv
+import json
+import sys
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+# Keywords reduced per block; 65536 rows x 24 months of uint64 is ~12 MB
+BLOCK_ROWS = 1 << 16
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def parse_month(month):
+    """Month number since year 0 for a "YYYY-MM" string"""
+    year, number = month.split("-")[:2]
+    return int(year) * 12 + int(number) - 1
+
+def format_month(ordinal):
+    return f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}"
+
+# ===== BUILD =====
+
+def read_volume_rows(path):
+    """Yield {"keyword", "product_group", "month", "volume"} rows from a CSV export"""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {
+                "keyword": row["keyword"].strip(),
+                "product_group": row.get("product_group", "").strip(),
+                "month": row["month"].strip(),
+                "volume": int(float(row["volume"] or 0))
+            }
+
+def build_volume_store(rows, out_dir):
+    """Write `rows` to a memory-mappable store in `out_dir`.
+
+    Returns (n_keywords, n_months). Missing keyword/month cells are 0.
+    """
+    keyword_ids, groups, group_ids = {}, {}, []
+    # One packed int64 buffer per column: 24 bytes a cell instead of a tuple of ints
+    id_column, month_column, volume_column = array("q"), array("q"), array("q")
+    for row in rows:
+        keyword_id = keyword_ids.get(row["keyword"])
+        if keyword_id is None:
+            keyword_id = keyword_ids[row["keyword"]] = len(keyword_ids)
+            group_ids.append(groups.setdefault(row["product_group"], len(groups)))
+        id_column.append(keyword_id)
+        month_column.append(parse_month(row["month"]))
+        volume_column.append(row["volume"])
+    if not id_column:
+        raise ValueError("No volume rows to store")
+
+    ids, months, volumes = (np.frombuffer(column, dtype=np.int64) for column in (id_column, month_column, volume_column))
+    first_month = int(months.min())
+    n_keywords, n_months = len(keyword_ids), int(months.max()) - first_month + 1
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    matrix = np.lib.format.open_memmap(
+        out_dir / "volumes.npy", mode="w+", dtype=np.uint32, shape=(n_keywords, n_months), fortran_order=True
+    )
+    matrix[ids, months - first_month] = np.clip(volumes, 0, np.iinfo(np.uint32).max)
+    matrix.flush()
+    del matrix
+
+    np.save(out_dir / "groups.npy", np.asarray(group_ids, dtype=np.int32))
+    (out_dir / "keywords.json").write_text(json.dumps(list(keyword_ids), ensure_ascii=False), encoding="utf-8")
+    meta = {"first_month": format_month(first_month), "months": n_months, "product_groups": list(groups)}
+    (out_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return n_keywords, n_months
+
+# ===== STORE =====
+
+class VolumeStore:
+    """Memory-mapped keyword x month volume matrix with vectorized portfolio queries"""
+
+    def __init__(self, volumes, groups, keywords, first_month, product_groups):
+        self.volumes = volumes
+        self.groups = groups
+        self.keywords = keywords
+        self.keyword_ids = {keyword: i for i, keyword in enumerate(keywords)}
+        self.first_month = first_month
+        self.product_groups = product_groups
+        self._insights = None
+
+    @classmethod
+    def load(cls, directory):
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        return cls(
+            np.load(directory / "volumes.npy", mmap_mode="r"),
+            np.load(directory / "groups.npy", mmap_mode="r"),
+            json.loads((directory / "keywords.json").read_text(encoding="utf-8")),
+            parse_month(meta["first_month"]),
+            meta["product_groups"]
+        )
+
+    @classmethod
+    def load_if_exists(cls, directory):
+        """Load the store, or return None when it has not been built"""
+        if not (Path(directory) / "meta.json").exists():
+            return None
+        return cls.load(directory)
+
+    @property
+    def last_month(self):
+        return self.first_month + self.volumes.shape[1] - 1
+
+    def _columns(self, end_month, months):
+        """Column slice for the `months` months ending at `end_month` (default: latest)"""
+        end = (self.last_month if end_month is None else parse_month(end_month)) - self.first_month + 1
+        return slice(max(end - months, 0), max(end, 0))
+
+    def window_totals(self, months=12, end_month=None):
+        """Per-keyword volume summed over a window of months, as a uint64 vector"""
+        columns = self._columns(end_month, months)
+        totals = np.zeros(len(self.keywords), dtype=np.uint64)
+        for start in range(0, len(self.keywords), BLOCK_ROWS):
+            block = self.volumes[start:start + BLOCK_ROWS, columns]
+            totals[start:start + BLOCK_ROWS] = block.sum(axis=1, dtype=np.uint64)
+        return totals
+
+    def monthly_totals(self):
+        """Portfolio volume per month across all keywords"""
+        # Column-major: each column sum is one sequential read
+        return np.array([self.volumes[:, m].sum(dtype=np.uint64) for m in range(self.volumes.shape[1])], dtype=np.uint64)
+
+    def yoy_growth(self, end_month=None):
+        """Portfolio growth of the last 12 months vs the 12 before, or None without history"""
+        end = self.last_month if end_month is None else parse_month(end_month)
+        if end - 23 < self.first_month:
+            return None
+        current = int(self.window_totals(12, format_month(end)).sum())
+        previous = int(self.window_totals(12, format_month(end - 12)).sum())
+        return (current - previous) / previous if previous else None
+
+    def top_keywords(self, n=10, months=1, end_month=None):
+        """[(keyword, volume)] of the n keywords with the highest volume in the window"""
+        totals = self.window_totals(months, end_month)
+        n = min(n, len(totals))
+        if n <= 0:
+            return []
+        top = np.argpartition(-totals.astype(np.int64), n - 1)[:n]
+        top = top[np.argsort(-totals[top].astype(np.int64), kind="stable")]
+        return [(self.keywords[i], int(totals[i])) for i in top]
+
+    def group_totals(self, months=12, end_month=None):
+        """{product_group: volume} summed over the window"""
+        sums = np.bincount(self.groups, weights=self.window_totals(months, end_month), minlength=len(self.product_groups))
+        return {group: int(total) for group, total in zip(self.product_groups, sums)}
+
+    def series(self, keyword):
+        """Monthly volumes of one keyword, or None if it is not stored"""
+        keyword_id = self.keyword_ids.get(keyword)
+        return None if keyword_id is None else np.asarray(self.volumes[keyword_id])
+
+    def year_series(self, keyword, year):
+        """Twelve monthly volumes of `keyword` in `year`, 0 where unknown"""
+        series = self.series(keyword)
+        values = np.zeros(12, dtype=np.int64)
+        if series is None:
+            return values.tolist()
+        start = year * 12 - self.first_month
+        lo, hi = max(start, 0), min(start + 12, len(series))
+        if lo < hi:
+            values[lo - start:hi - start] = series[lo:hi]
+        return values.tolist()
+
+    def insights(self):
+        """Headline numbers for the dashboard's Key Insights card (computed once per load)"""
+        if self._insights is None:
+            self._insights = self._compute_insights()
+        return self._insights
+
+    def _compute_insights(self):
+        monthly = self.monthly_totals()
+        best = int(np.argmax(monthly))
+        top = self.top_keywords(2)
+        return {
+            "top_keywords": top,
+            "yoy_growth": self.yoy_growth(),
+            "total_monthly_volume": int(monthly[-1]),
+            "best_month": (format_month(self.first_month + best), int(monthly[best])),
+            "latest_month": format_month(self.last_month),
+            "keywords": len(self.keywords)
+        }
+
+if __name__ == "__main__":
+    command, *args = sys.argv[1:] or ["help"]
+    if command == "build" and len(args) == 2:
+        n_keywords, n_months = build_volume_store(read_volume_rows(args[0]), args[1])
+        print(f"✅ Stored {n_keywords} keywords x {n_months} months into {args[1]}")
+    elif command == "summary" and len(args) == 1:
+        store = VolumeStore.load(args[0])
+        print(json.dumps(store.insights(), indent=2, ensure_ascii=False))
+        print(json.dumps(store.group_totals(), indent=2, ensure_ascii=False))
+    else:
+        print(__doc__)
@@ -0,0 +1,75 @@
+import asyncio
+
+import app.api_clients as api_clients
+from app.api_clients import BATCH, INTERACTIVE, ApiScheduler, RateBudget
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def budget_at(monkeypatch, requests_per_minute, tokens_per_minute):
+    clock = Clock()
+    monkeypatch.setattr(api_clients.time, "monotonic", clock)
+    return RateBudget(requests_per_minute, tokens_per_minute), clock
+
+def test_delay_is_zero_within_both_budgets(monkeypatch):
+    budget, _ = budget_at(monkeypatch, 3, 1000)
+    budget.record(400)
+    budget.record(400)
+    assert budget.delay_for(200) == 0.0
+
+def test_request_limit_waits_for_oldest_call(monkeypatch):
+    budget, clock = budget_at(monkeypatch, 2, 1000)
+    budget.record(10)
+    clock.now += 15
+    budget.record(10)
+    clock.now += 5
+    assert budget.delay_for(10) == 40.0
+    clock.now += 40
+    assert budget.delay_for(10) == 0.0
+
+def test_token_limit_waits_until_enough_tokens_expire(monkeypatch):
+    budget, clock = budget_at(monkeypatch, 100, 1000)
+    budget.record(300)
+    clock.now += 10
+    budget.record(600)
+    clock.now += 10
+    # 900 spent: 200 more fits once the 300-token call leaves the window
+    assert budget.delay_for(200) == 40.0
+    # 500 more needs both calls gone
+    assert budget.delay_for(500) == 50.0
+
+def test_oversized_call_runs_on_an_empty_window(monkeypatch):
+    budget, clock = budget_at(monkeypatch, 100, 1000)
+    assert budget.delay_for(5000) == 0.0
+    budget.record(100)
+    clock.now += 30
+    assert budget.delay_for(5000) == 30.0
+
+def test_interactive_caller_raises_priority_of_shared_batch_call():
+    async def run():
+        scheduler = ApiScheduler(RateBudget(1000, 10**9), concurrency=1)
+        order = []
+
+        def call(name):
+            async def run_call():
+                order.append(name)
+                await asyncio.sleep(0.001)
+                return name
+            return run_call
+
+        batch = [asyncio.create_task(scheduler.submit(f"k{i}", 1, call(f"k{i}"), BATCH)) for i in range(4)]
+        await asyncio.sleep(0)
+        joined = await scheduler.submit("k3", 1, call("other"), INTERACTIVE)
+        await asyncio.gather(*batch)
+        return joined, order, scheduler.stats
+
+    joined, order, stats = asyncio.run(run())
+    # The shared result is the queued call's, and it overtakes the batch calls queued before it
+    assert joined == "k3"
+    assert order.index("k3") < order.index("k2")
+    assert sorted(order) == ["k0", "k1", "k2", "k3"]
+    assert stats["executed"] == 4 and stats["deduped"] == 1
@@ -0,0 +1,49 @@
+import app.brief_cache as brief_cache
+from app.brief_cache import BriefCache, brief_cache_key
+from app.shared_state import InvalidationBus
+
+INPUTS = {"keywords": ["AVB", "bedrijfsaansprakelijkheid"], "market": "Netherlands (NL)"}
+BRIEF = {"focus_keyword": "avb", "h1": "AVB voor ondernemers"}
+
+def test_equivalent_inputs_share_a_key():
+    assert brief_cache_key(INPUTS) == brief_cache_key({**INPUTS, "keywords": [" avb ", "Bedrijfsaansprakelijkheid", "avb"]})
+    assert brief_cache_key(INPUTS) != brief_cache_key({**INPUTS, "keywords": ["bedrijfsaansprakelijkheid", "avb"]})
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache = BriefCache(tmp_path, ttl_seconds=60)
+    key = brief_cache_key(INPUTS)
+    cache.store(key, INPUTS, BRIEF)
+    assert cache.lookup(key) == (BRIEF, "memory")
+
+    created = brief_cache.time.time()
+    monkeypatch.setattr(brief_cache.time, "time", lambda: created + 61)
+    assert cache.lookup(key) == (None, None)
+    # The expired disk entry is removed, not just skipped
+    assert not (tmp_path / f"{key}.json").exists()
+
+def test_invalidation_in_one_process_drops_the_others_memory_tier(tmp_path):
+    bus_path = str(tmp_path / "invalidations.sqlite3")
+    # Separate directories, so only the memory tier can tell whether the notice arrived
+    ours = BriefCache(tmp_path / "ours", bus=InvalidationBus(bus_path))
+    theirs = BriefCache(tmp_path / "theirs", bus=InvalidationBus(bus_path))
+    key = brief_cache_key(INPUTS)
+    ours.store(key, INPUTS, BRIEF)
+    other_key = brief_cache_key({"keywords": ["rechtsbijstand"]})
+    ours.store(other_key, {"keywords": ["rechtsbijstand"]}, BRIEF)
+
+    theirs.invalidate_keywords(["Bedrijfsaansprakelijkheid"])
+    assert ours.lookup(key) == (BRIEF, "disk")
+    assert ours.lookup(other_key) == (BRIEF, "memory")
+
+def test_pruned_notices_clear_the_whole_memory_tier(tmp_path):
+    bus_path = str(tmp_path / "invalidations.sqlite3")
+    ours = BriefCache(tmp_path / "ours", bus=InvalidationBus(bus_path))
+    theirs = BriefCache(tmp_path / "theirs", bus=InvalidationBus(bus_path))
+    key = brief_cache_key({"keywords": ["rechtsbijstand"]})
+    ours.store(key, {"keywords": ["rechtsbijstand"]}, BRIEF)
+
+    theirs.invalidate_keywords(["avb"])
+    # The notice ages out of the log before `ours` syncs
+    theirs.bus._db.execute("DELETE FROM invalidations")
+    theirs.bus._db.commit()
+    assert ours.lookup(key) == (BRIEF, "disk")
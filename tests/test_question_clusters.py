@@ -0,0 +1,20 @@
+from app.question_clusters import cluster_questions
+
+def clusters_by_question(questions):
+    return {cluster["question"]: cluster["variants"] for cluster in cluster_questions(questions)}
+
+def test_same_frame_different_products_stay_separate():
+    clusters = clusters_by_question([
+        "Wat kost een AVB?",
+        "Wat kost een rechtsbijstandverzekering?",
+        "Wat kost een inventarisverzekering?",
+        "Wat kost een bedrijfsaansprakelijkheidsverzekering?",
+    ])
+    assert clusters["Wat kost een rechtsbijstandverzekering?"] == ["Wat kost een rechtsbijstandverzekering?"]
+    assert clusters["Wat kost een inventarisverzekering?"] == ["Wat kost een inventarisverzekering?"]
+    assert sorted(clusters["Wat kost een AVB?"]) == ["Wat kost een AVB?", "Wat kost een bedrijfsaansprakelijkheidsverzekering?"]
+
+def test_rephrased_question_about_same_product_is_merged():
+    clusters = clusters_by_question(["Wat kost een AVB?", "Hoeveel kost een AVB?", "Wat kost een AVB?"])
+    assert len(clusters) == 1
+    assert clusters["Wat kost een AVB?"][0] == "Wat kost een AVB?"
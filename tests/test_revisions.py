@@ -0,0 +1,56 @@
+from app.revisions import RevisionStore, apply_brief_delta, brief_delta
+
+GUIDELINES = "\n".join(f"Regel {i}: schrijf kort en concreet." for i in range(40))
+
+def brief(**fields):
+    return {"h1": "AVB voor ondernemers", "content_guidelines": GUIDELINES, **fields}
+
+def test_delta_round_trip():
+    old = brief()
+    new = brief(h1="AVB: bescherm je bedrijf", content_guidelines=GUIDELINES.replace("Regel 7:", "Regel 7 (nieuw):"))
+    delta = brief_delta(old, new)
+    assert set(delta) == {"h1", "content_guidelines"}
+    assert apply_brief_delta(old, delta) == new
+
+def test_small_edits_are_stored_as_deltas_and_rebuild(tmp_path):
+    store = RevisionStore(str(tmp_path / "revisions.sqlite3"))
+    first = brief()
+    second = brief(content_guidelines=GUIDELINES.replace("Regel 3:", "Regel drie:"))
+    third = brief(h1="AVB: bescherm je bedrijf", content_guidelines=second["content_guidelines"])
+    assert [store.save("s1:key", b) for b in (first, second, third)] == [1, 2, 3]
+    # Saving an unchanged brief adds no revision
+    assert store.save("s1:key", third) == 3
+
+    assert [(h["rev"], h["kind"]) for h in store.history("s1:key")] == [(3, "delta"), (2, "delta"), (1, "snapshot")]
+    assert store.get("s1:key", 1) == first
+    assert store.get("s1:key", 2) == second
+    assert store.get("s1:key") == third
+
+def test_other_process_saves_are_picked_up(tmp_path):
+    path = str(tmp_path / "revisions.sqlite3")
+    ours, theirs = RevisionStore(path), RevisionStore(path)
+    ours.save("s1:key", brief())
+    assert ours.latest("s1:key") == (1, brief())
+    theirs.save("s1:key", brief(h1="Ander H1"))
+    assert ours.latest("s1:key") == (2, brief(h1="Ander H1"))
+
+def test_long_chains_get_a_new_snapshot(tmp_path):
+    store = RevisionStore(str(tmp_path / "revisions.sqlite3"), max_chain=2)
+    for i in range(5):
+        store.save("s1:key", brief(h1=f"H1 versie {i}"))
+    assert [h["kind"] for h in reversed(store.history("s1:key"))] == ["snapshot", "delta", "delta", "snapshot", "delta"]
+    assert store.get("s1:key", 4) == brief(h1="H1 versie 3")
+
+def test_diff_lists_changed_fields_only(tmp_path):
+    store = RevisionStore(str(tmp_path / "revisions.sqlite3"))
+    store.save("s1:key", brief())
+    store.save("s1:key", brief(h1="AVB: bescherm je bedrijf"))
+    assert store.diff("s1:key", 1, 2) == {"h1": [("replace", "AVB voor ondernemers", "AVB: bescherm je bedrijf")]}
+
+def test_head_cache_is_bounded_and_bulk_reads_skip_it(tmp_path):
+    store = RevisionStore(str(tmp_path / "revisions.sqlite3"), max_heads=2)
+    for session in ("s1", "s2", "s3"):
+        store.save(f"{session}:key", brief())
+    assert list(store._heads) == ["s2:key", "s3:key"]
+    assert store.latest("s1:key", remember=False) == (1, brief())
+    assert list(store._heads) == ["s2:key", "s3:key"]
@@ -0,0 +1,44 @@
+from app.session_index import SessionIndex, normalize_prefix
+
+SESSIONS = [
+    "3f2a9c10-0000-4000-8000-000000000001",
+    "3f2a9c1f-0000-4000-8000-000000000002",
+    "3f2a9c20-0000-4000-8000-000000000003",
+    "3f2b0000-0000-4000-8000-000000000004",
+]
+
+def index_with_sessions(tmp_path):
+    index = SessionIndex(str(tmp_path / "sessions.sqlite3"))
+    for i, session_id in enumerate(SESSIONS):
+        index.save(session_id, {"step": i})
+    return index
+
+def ids(matches):
+    return [match["session_id"] for match in matches]
+
+def test_short_prefix_or_non_hex_is_rejected():
+    assert normalize_prefix("3f2") is None
+    assert normalize_prefix("zzzz") is None
+    assert normalize_prefix(" 3F2A 9C ") == "3f2a9c"
+
+def test_unique_prefix_finds_one_session_with_state(tmp_path):
+    index = index_with_sessions(tmp_path)
+    matches = index.lookup("3F2B")
+    assert ids(matches) == [SESSIONS[3]]
+    assert matches[0]["state"] == {"step": 3}
+
+def test_colliding_prefix_returns_every_match_in_order(tmp_path):
+    index = index_with_sessions(tmp_path)
+    assert ids(index.lookup("3f2a")) == SESSIONS[:3]
+    assert ids(index.lookup("3f2a9c1")) == SESSIONS[:2]
+    assert ids(index.lookup("3f2a", limit=2)) == SESSIONS[:2]
+
+def test_prefix_ending_in_f_does_not_spill_into_the_next_digit(tmp_path):
+    index = index_with_sessions(tmp_path)
+    assert ids(index.lookup("3f2a9c1f")) == [SESSIONS[1]]
+    assert index.lookup("3f2a9c2f") == []
+
+def test_saving_again_replaces_the_state(tmp_path):
+    index = index_with_sessions(tmp_path)
+    index.save(SESSIONS[0], {"step": 9})
+    assert index.lookup(SESSIONS[0])[0]["state"] == {"step": 9}
@@ -0,0 +1,40 @@
+import asyncio
+import random
+
+import httpx
+
+from app.fake_apis import create_fake_api_app
+from app.sharepoint import DONE, FAILED, SharePointUploader, missing_spans, parse_ranges
+
+def test_missing_spans_cover_only_expected_ranges():
+    expected = parse_ranges(["0-99", "250-"], 400)
+    assert expected == [(0, 100), (250, 400)]
+    assert missing_spans(400, expected, chunk_size=128) == [(0, 100), (250, 256), (256, 384), (384, 400)]
+
+def test_resume_after_failed_chunk_sends_only_missing_bytes(tmp_path):
+    fake = create_fake_api_app(latency=0, upload_failure_rate=0.3, seed=3)
+    data = random.Random(0).randbytes(64 * 1024)
+
+    async def upload():
+        uploader = SharePointUploader(
+            "http://fake/drive", "token", tmp_path, chunk_size=4096, attempts=1,
+            transport=httpx.ASGITransport(app=fake)
+        )
+        job_id = uploader.submit("brief.docx", "/Content Briefs", data)
+        await asyncio.gather(*uploader._tasks.values())
+        first = uploader.status(job_id)
+        resumes = 0
+        while uploader.status(job_id)["status"] == FAILED:
+            resumes += 1
+            uploader.resume(job_id)
+            await asyncio.gather(*uploader._tasks.values())
+        await uploader.aclose()
+        return first, uploader.status(job_id), resumes
+
+    first, job, resumes = asyncio.run(upload())
+    assert first["status"] == FAILED and first["error"].startswith("bytes ")
+    assert job["status"] == DONE and resumes >= 1
+    assert fake.state.files["Content Briefs/brief.docx"] == data
+    # Accepted chunks were never sent again
+    assert fake.state.stats["upload_bytes"] == len(data)
+    assert not (tmp_path / f"{job['id']}.bin").exists()